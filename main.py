@@ -1,30 +1,247 @@
 import sys
-from PyQt5.QtWidgets import QInputDialog , QMessageBox, QFileDialog, QApplication, QWidget, QLabel, QPushButton, QVBoxLayout, QHBoxLayout, QComboBox
+from PyQt5.QtWidgets import QInputDialog , QMessageBox, QFileDialog, QApplication, QWidget, QLabel, QPushButton, QVBoxLayout, QHBoxLayout, QComboBox, QDoubleSpinBox, QSlider, QProgressDialog
 import serial
-import threading
 import pyqtgraph as pg
 from PyQt5.QtGui import QIcon
-from PyQt5.QtCore import Qt, QTimer, QPointF
+from PyQt5.QtCore import Qt, QTimer, QRectF
 import os
+import time
 from pyqtgraph.exporters import ImageExporter
 import numpy as np
-from scipy.fftpack import fft
-from scipy.signal import butter, lfilter
+from scope.acquisition import BACKENDS, AcquisitionManager, Channel
+from scope.capture import CAPTURE_EXTENSIONS, load_traces
+from scope.decimation import Decimator, minmax_decimate, visible_range
+from scope.export import EXPORT_EXTENSIONS, ExportJob, export_traces, snapshot
+from scope.filters import ButterworthStage, FilterChain, MovingAverageStage
+from scope.hover import nearest_sample
+from scope.instrumentation import RateMeter, StageTimer
+from scope.measurements import MEASUREMENTS, MeasurementEngine
+from scope.persistence import PersistenceMap
+from scope.recorder import StreamRecorder
+from scope.sample_buffer import SampleBuffer, TraceBuffer
+from scope.segments import SegmentStore
+from scope.spectrum import AVERAGING_MODES, WINDOWS, SpectrumAnalyzer
+from scope.trace import Trace
+from scope.trigger import TRIGGER_MODES, TRIGGER_TYPES, TriggerEngine
 # Get the directory path of the current script
 dir_path = os.path.dirname(os.path.realpath(__file__))
 
+# Selectable acquisition memory depths (number of samples kept in memory)
+MEMORY_DEPTHS = {"1k": 1000, "10k": 10000, "100k": 100000, "1M": 1000000, "10M": 10000000}
+
+# Trigger frame lengths (samples), pre-trigger fractions and comparator hysteresis (V)
+FRAME_LENGTHS = ["500", "1000", "5000", "10000", "100000"]
+PRE_TRIGGER = {"10%": 0.1, "25%": 0.25, "50%": 0.5, "75%": 0.75, "90%": 0.9}
+TRIGGER_HYSTERESIS = 0.05
+
+# Segmented memory: selectable segment counts, memory budget and segments drawn by the overlay view
+SEGMENT_COUNTS = ["100", "1000", "10000", "100000"]
+SEGMENT_BUDGET = 256 << 20
+OVERLAY_SEGMENTS = 32
+
+# Persistence display: fading time constants and voltage bins
+PERSISTENCE_TIMES = {"0.3 s": 0.3, "1 s": 1.0, "5 s": 5.0, "Infinite": np.inf}
+PERSISTENCE_ROWS = 256
+
+# Interleaved channels per serial port and the pen of each displayed channel
+CHANNELS_PER_PORT = ["1", "2", "3", "4"]
+CHANNEL_PENS = ['y', 'm', 'w', (255, 140, 0), (0, 200, 0), (255, 105, 180), (160, 160, 255), (200, 200, 0)]
+
+# Seconds between refreshes of the performance overlay
+STATS_INTERVAL = 0.25
+# Display stages timed for the performance overlay, in the order they run
+DISPLAY_STAGES = ["refresh", "filter", "spectrum", "trigger", "decimate", "draw", "measure"]
+
+# Export file types and milliseconds between progress updates of running exports
+EXPORT_FILTERS = ("Text Files (*.txt);;CSV Files (*.csv);;Capture Files (*.scp);;NumPy Archives (*.npz);;"
+                  "WAV Files (*.wav);;HDF5 Files (*.h5 *.hdf5);;PNG Files (*.png);;All Files (*)")
+EXPORT_INTERVAL = 100
+
+# Simulated boards (see scope/simulator.py), selectable without hardware
+SIMULATED_PORTS = ["sim://sine", "sim://square", "sim://burst", "sim://glitch?noise=0.02", "sim://noise",
+                   "sim://square?errors=0.001&dropouts=0.001"]
+
+
+def persistence_image():
+    """Heat map item for a :class:`PersistenceMap`, transparent where nothing was hit."""
+    lut = pg.colormap.get('inferno').getLookupTable(0.0, 1.0, 256, alpha=True)
+    lut[0, 3] = 0
+    image = pg.ImageItem()
+    image.setLookupTable(lut)
+    image.setZValue(-1)  # Under the curves
+    return image
+
+
+def fit_persistence(frames, t0, dt, columns, persistence):
+    """A :class:`PersistenceMap` for ``frames`` with room above and below their range, or None."""
+    low, high = np.nanmin(frames), np.nanmax(frames)
+    if not np.isfinite(low):
+        return None
+    margin = 0.25 * (high - low) or 0.5
+    return PersistenceMap(frames.shape[1], t0, dt, (low - margin, high + margin), columns=columns,
+                          rows=PERSISTENCE_ROWS, persistence=persistence)
+
+
+class HistoryBrowser(QWidget):
+    """Window to scrub through, overlay and save the segments of the segmented memory."""
+
+    def __init__(self):
+        super().__init__()
+        self.setWindowTitle("Segment History")
+        self.setGeometry(150, 150, 900, 500)
+        self.store = None  # Segment store shown, live or loaded from a file
+        self.follow = True  # Keep showing the newest segment as new ones arrive
+
+        layout = QVBoxLayout()
+        self.plot_widget = pg.PlotWidget()
+        self.plot_widget.setBackground('#000')
+        self.plot_widget.showGrid(x=True, y=True, alpha=0.5)
+        self.plot_widget.setLabel('left', 'Voltage', units='V')
+        self.plot_widget.setLabel('bottom', 'Time from trigger', units='s')
+        self.overlay_curves = [self.plot_widget.plot(pen=(255, 255, 0, 60), connect='finite')
+                               for _ in range(OVERLAY_SEGMENTS - 1)]
+        self.curve = self.plot_widget.plot(pen='y', connect='finite')  # Selected segment, drawn on top
+        self.image = persistence_image()
+        self.plot_widget.addItem(self.image)
+        self.persistence = None  # Hits of the segments up to persistence_end
+        self.persistence_end = 0
+        layout.addWidget(self.plot_widget)
+
+        self.slider = QSlider(Qt.Horizontal)
+        layout.addWidget(self.slider)
+        controls = QHBoxLayout()
+        self.view_select = QComboBox()
+        # Overlay also draws the segments before the selected one, Persistence all of them as a heat map
+        self.view_select.addItems(["Segment", "Overlay", "Persistence"])
+        self.info_label = QLabel("No segments")
+        self.save_btn = QPushButton("Save")
+        self.load_btn = QPushButton("Load")
+        controls.addWidget(self.view_select)
+        controls.addWidget(self.info_label, 1)
+        controls.addWidget(self.save_btn)
+        controls.addWidget(self.load_btn)
+        layout.addLayout(controls)
+        self.setLayout(layout)
+
+        self.slider.valueChanged.connect(self.show_segment)
+        self.view_select.currentTextChanged.connect(self.show_segment)
+        self.save_btn.clicked.connect(self.save_segments)
+        self.load_btn.clicked.connect(self.load_segments)
+
+    def set_store(self, store):
+        self.store = store
+        self.follow = True
+        self.persistence = None
+        self.refresh()
+        self.show_segment()
+
+    def refresh(self):
+        """Take in the segments stored since the last call."""
+        store = self.store
+        if store is None or len(store) == 0:
+            self.slider.setRange(0, 0)
+            return
+        self.follow = self.slider.value() >= self.slider.maximum()
+        self.slider.blockSignals(True)  # Draw once, below
+        self.slider.setRange(store.first_index, store.total - 1)
+        self.slider.blockSignals(False)
+        if self.follow:
+            self.slider.setValue(store.total - 1)
+        self.show_segment()
+
+    def show_segment(self):
+        """Draw the selected segment, and the ones before it in the overlay view."""
+        store = self.store
+        for curve in self.overlay_curves + [self.curve]:
+            curve.setData([], [])
+        view = self.view_select.currentText()
+        self.image.setVisible(view == "Persistence")
+        if store is None or len(store) == 0:
+            self.info_label.setText("No segments")
+            return
+        selected = min(max(self.slider.value(), store.first_index), store.total - 1)
+        width = max(int(self.plot_widget.getViewBox().width()), 100)
+        if view == "Persistence":
+            self.show_persistence(store, selected + 1, width)
+        elif view == "Overlay":
+            first = max(selected - len(self.overlay_curves), store.first_index)
+            for curve, i in zip(self.overlay_curves, range(first, selected)):
+                trace, _ = store.segment(i)
+                x, y, _ = minmax_decimate(trace, 0, len(trace), width)
+                curve.setData(x, y)
+        trace, info = store.segment(selected)
+        x, y, _ = minmax_decimate(trace, 0, len(trace), width)
+        self.curve.setData(x, y)
+        stored = time.strftime("%H:%M:%S", time.localtime(info["wall"])) if info["wall"] else "-"
+        self.info_label.setText(
+            f"Segment {selected} ({len(store)} of up to {store.capacity}, {store.nbytes / 1e6:.0f} MB), "
+            f"trigger at t = {info['time']:.6f} s, stored {stored}"
+        )
+
+    def show_persistence(self, store, end, width):
+        """Draw the hits of every segment held up to ``end``, adding only the new ones when possible."""
+        if self.persistence is None or end < self.persistence_end:
+            trace, _ = store.segment(store.first_index)
+            self.persistence = fit_persistence(store.values(store.first_index, end), trace.t0, store.dt, width,
+                                               np.inf)
+            self.persistence_end = store.first_index
+            if self.persistence is None:
+                return
+        self.persistence.add(store.values(self.persistence_end, end))
+        self.persistence_end = end
+        self.image.setImage(self.persistence.intensity(), levels=(0, 1), autoLevels=False)
+        self.image.setRect(QRectF(*self.persistence.rect))  # Needs the image size
+
+    def save_segments(self):
+        if self.store is None or len(self.store) == 0:
+            return
+        file_path, _ = QFileDialog.getSaveFileName(self, "Save Segments", dir_path, "Segments (*.npz)")
+        if file_path:
+            self.store.save(file_path)
+            print(f"Segments saved as {file_path}")
+
+    def load_segments(self):
+        file_path, _ = QFileDialog.getOpenFileName(self, "Load Segments", dir_path, "Segments (*.npz)")
+        if file_path:
+            try:
+                self.set_store(SegmentStore.load(file_path))
+            except (OSError, KeyError, ValueError) as e:
+                print(f"Failed to load segments: {e}")
+
 
 class OscilloscopeUI(QWidget):
     def __init__(self):
         super().__init__()
         self.initUI()
 
-        # Initialize serial connection and data storage
-        self.ser = None
-        self.data = []
-        self.timestamps = []
+        # Initialize acquisition and data storage
+        self.acquisition = None  # Serial readers, one per port
+        self.channels = []  # Displayed channels; triggering, filtering and the FFT use the first
+        self.channel_curves = []  # (curve, decimator) of every further channel
+        self.recorders = []  # One stream recorder per port while recording
+        self.exports = []  # (job, progress dialog, path) of the exports writing in the background
+        self.export_timer = QTimer()
+        self.export_timer.timeout.connect(self.update_exports)
+        self.spectrum = None  # Live spectrum analyzer while the FFT view is shown
+        self.decimator = Decimator()  # Min/max envelope of the visible range
+        self.filter_chain = None  # Streaming filter selected with the Filtering button
+        self.filtered = None  # Filter output, on the same sample indices as self.buffer
+        self.filtered_source = None
+        self.filter_decimator = Decimator()
+        self.trigger = None  # Trigger engine, None when free-running
+        self.trigger_frame = None  # Latest triggered frame shown on the plot
+        self.pulse_width = (0.0, float('inf'))  # Pulse width trigger bounds in seconds
+        self.measurements = None  # Automatic measurements while the Measure button is checked
+        self.segments = None  # Triggered segments while the Segmented button is checked
+        self.history = HistoryBrowser()
+        self.persistence = None  # Hit histogram of the triggered frames while Persistence is checked
+        self.stage_timer = StageTimer()  # Time spent in each display stage
+        self.last_tick = None  # When the display was last refreshed
+        self.cpu_meter = RateMeter()  # CPU seconds of the whole process per second
+        self.rate_meters = {}  # Samples per second of each reader
+        self.stats_updated = 0.0
         self.is_running = False
-        self.data_lock = threading.Lock()  # Lock for thread-safe data access
+        self.show_channels([Channel("CH1", SampleBuffer(MEMORY_DEPTHS[self.depth_select.currentText()], lod=True))])
 
     def initUI(self):
         self.setWindowTitle("EPT'Scope")
@@ -127,11 +344,25 @@ class OscilloscopeUI(QWidget):
         self.plot_widget.showGrid(x=True, y=True, alpha=0.5)  # Add transparency to grid lines
         self.plot_widget.setLabel('left', 'Voltage', units='V')
         self.plot_widget.setLabel('bottom', 'Time', units='s')
-        self.plot_curve = self.plot_widget.plot(pen='y', width=2)  # Thicker line for better visibility
+        self.plot_curve = self.plot_widget.plot(pen='y', width=2, connect='finite')  # Thicker line, broken at gaps
+        self.filter_curve = self.plot_widget.plot(pen='c', connect='finite')  # Live filtered trace
+        # Performance overlay, in screen pixels at the top left of the plot
+        self.stats_overlay = pg.TextItem(color='w', fill=(0, 0, 0, 160), anchor=(0, 0))
+        self.stats_overlay.setParentItem(self.plot_widget.getViewBox())
+        self.stats_overlay.setPos(5, 5)
+        self.stats_overlay.hide()
+        self.persistence_image = persistence_image()
+        self.persistence_image.hide()
+        self.plot_widget.addItem(self.persistence_image)
 
         # Enable hover events on the plot
         self.plot_widget.setMouseEnabled(x=True, y=True)
-        self.plot_widget.scene().sigMouseMoved.connect(self.mouse_moved)
+        # Mouse moves are coalesced to at most one lookup per display frame
+        self.mouse_proxy = pg.SignalProxy(self.plot_widget.scene().sigMouseMoved, rateLimit=60,
+                                          slot=self.mouse_moved)
+
+        # Re-decimate for the new range when the user pans or zooms
+        self.plot_widget.getViewBox().sigXRangeChanged.connect(self.update_plot)
 
         # Add a label to display hovered point coordinates
         self.hover_label = QLabel("Hover over the curve to see data points")
@@ -140,24 +371,140 @@ class OscilloscopeUI(QWidget):
         # Add cursors for measurements
         self.add_cursors()
 
+        # Spectrum plot shown next to the time-domain trace in FFT mode
+        self.spectrum_widget = pg.PlotWidget()
+        self.spectrum_widget.setBackground('#000')
+        self.spectrum_widget.showGrid(x=True, y=True, alpha=0.5)
+        self.spectrum_widget.setLabel('left', 'Amplitude', units='V')
+        self.spectrum_widget.setLabel('bottom', 'Frequency', units='Hz')
+        self.spectrum_curve = self.spectrum_widget.plot(pen='r')
+        self.spectrum_widget.hide()
+
         left_layout = QVBoxLayout()
         left_layout.addWidget(self.plot_widget)
+        left_layout.addWidget(self.spectrum_widget)
         left_layout.addWidget(self.hover_label)
 
+        # Link statistics for the binary protocol
+        self.status_label = QLabel("")
+        self.status_label.setAlignment(Qt.AlignCenter)
+        left_layout.addWidget(self.status_label)
+
+        # Automatic measurements of the visible window or the latest triggered frame
+        self.measure_label = QLabel("")
+        self.measure_label.setAlignment(Qt.AlignCenter)
+        self.measure_label.hide()
+        left_layout.addWidget(self.measure_label)
+
         # Right Panel - Controls
         controls_layout = QVBoxLayout()
 
         # COM Port and Baud Rate Selection
         controls_layout.addWidget(QLabel("COM N°:"))
         self.com_select = QComboBox()
-        self.com_select.addItems(["COM1", "COM2", "COM3", "COM6"])  # Example COM ports
+        self.com_select.addItems(["COM1", "COM2", "COM3", "COM6"] + SIMULATED_PORTS)  # Example COM ports
+        self.com_select.setEditable(True)  # Any port name or sim:// URL
         controls_layout.addWidget(self.com_select)
 
+        controls_layout.addWidget(QLabel("COM N° (second board):"))
+        self.com2_select = QComboBox()
+        self.com2_select.addItems(["None", "COM1", "COM2", "COM3", "COM6"] + SIMULATED_PORTS)  # Optional second device
+        self.com2_select.setEditable(True)
+        controls_layout.addWidget(self.com2_select)
+
+        controls_layout.addWidget(QLabel("Channels per Port:"))
+        self.channels_select = QComboBox()
+        self.channels_select.addItems(CHANNELS_PER_PORT)  # Channels interleaved in each stream
+        controls_layout.addWidget(self.channels_select)
+
         controls_layout.addWidget(QLabel("Baud Rate:"))
         self.baud_select = QComboBox()
         self.baud_select.addItems(["9600", "115200", "250000"])  # Example baud rates
         controls_layout.addWidget(self.baud_select)
 
+        controls_layout.addWidget(QLabel("Protocol:"))
+        self.protocol_select = QComboBox()
+        self.protocol_select.addItems(["ASCII", "Binary"])  # ASCII lines or framed ADC codes
+        controls_layout.addWidget(self.protocol_select)
+
+        controls_layout.addWidget(QLabel("Backend:"))
+        self.backend_select = QComboBox()
+        self.backend_select.addItems(list(BACKENDS))  # Read ports in this process or in worker processes
+        controls_layout.addWidget(self.backend_select)
+
+        controls_layout.addWidget(QLabel("Sample Rate (Hz):"))
+        self.rate_select = QComboBox()
+        self.rate_select.setEditable(True)  # Must match the rate the firmware samples at
+        self.rate_select.addItems(["100", "1000", "10000", "100000", "1000000"])
+        controls_layout.addWidget(self.rate_select)
+
+        controls_layout.addWidget(QLabel("Memory Depth:"))
+        self.depth_select = QComboBox()
+        self.depth_select.addItems(list(MEMORY_DEPTHS))
+        controls_layout.addWidget(self.depth_select)
+
+        # Trigger Settings
+        controls_layout.addWidget(QLabel("Trigger:"))
+        trigger_layout = QHBoxLayout()
+        self.trigger_select = QComboBox()
+        self.trigger_select.addItems(["Off"] + list(TRIGGER_TYPES))
+        self.trigger_mode_select = QComboBox()
+        self.trigger_mode_select.addItems(list(TRIGGER_MODES))
+        trigger_layout.addWidget(self.trigger_select)
+        trigger_layout.addWidget(self.trigger_mode_select)
+        controls_layout.addLayout(trigger_layout)
+
+        trigger_level_layout = QHBoxLayout()
+        self.trigger_level = QDoubleSpinBox()
+        self.trigger_level.setRange(-100.0, 100.0)
+        self.trigger_level.setSingleStep(0.05)
+        self.trigger_level.setDecimals(3)
+        self.trigger_level.setSuffix(" V")
+        self.holdoff_select = QDoubleSpinBox()
+        self.holdoff_select.setRange(0.0, 10000.0)
+        self.holdoff_select.setDecimals(3)
+        self.holdoff_select.setPrefix("Holdoff ")
+        self.holdoff_select.setSuffix(" ms")
+        trigger_level_layout.addWidget(self.trigger_level)
+        trigger_level_layout.addWidget(self.holdoff_select)
+        controls_layout.addLayout(trigger_level_layout)
+
+        frame_layout = QHBoxLayout()
+        self.frame_select = QComboBox()
+        self.frame_select.addItems(FRAME_LENGTHS)  # Samples per triggered frame
+        self.frame_select.setCurrentText("1000")
+        self.pre_trigger_select = QComboBox()
+        self.pre_trigger_select.addItems(list(PRE_TRIGGER))  # Part of the frame before the trigger
+        self.pre_trigger_select.setCurrentText("50%")
+        self.arm_btn = QPushButton("Arm")
+        frame_layout.addWidget(self.frame_select)
+        frame_layout.addWidget(self.pre_trigger_select)
+        frame_layout.addWidget(self.arm_btn)
+        controls_layout.addLayout(frame_layout)
+
+        segments_layout = QHBoxLayout()
+        self.segments_btn = QPushButton("Segmented")
+        self.segments_btn.setCheckable(True)  # Keep every triggered frame in segmented memory
+        self.segments_select = QComboBox()
+        self.segments_select.addItems(SEGMENT_COUNTS)  # Segments kept, within the memory budget
+        self.segments_select.setCurrentText("1000")
+        self.history_btn = QPushButton("History")
+        segments_layout.addWidget(self.segments_btn)
+        segments_layout.addWidget(self.segments_select)
+        segments_layout.addWidget(self.history_btn)
+        controls_layout.addLayout(segments_layout)
+
+        persistence_layout = QHBoxLayout()
+        self.persistence_btn = QPushButton("Persistence")
+        self.persistence_btn.setCheckable(True)  # Intensity-graded display of every triggered frame
+        self.persistence_btn.setEnabled(False)  # Needs aligned frames, so only while triggering
+        self.persistence_select = QComboBox()
+        self.persistence_select.addItems(list(PERSISTENCE_TIMES))  # How long hits take to fade
+        self.persistence_select.setCurrentText("1 s")
+        persistence_layout.addWidget(self.persistence_btn)
+        persistence_layout.addWidget(self.persistence_select)
+        controls_layout.addLayout(persistence_layout)
+
         # Start and Pause Buttons
         self.start_btn = QPushButton("Start")
         self.start_btn.setIcon(QIcon(os.path.join(dir_path, "icon", "start_icon.png")))
@@ -181,12 +528,26 @@ class OscilloscopeUI(QWidget):
         # Additional Buttons
         self.fft_btn = QPushButton("FFT")
         self.fft_btn.setIcon(QIcon(os.path.join(dir_path, "icon", "fft_icon.png")))
+        self.fft_btn.setCheckable(True)  # Toggles the live spectrum view
+        self.fft_size_select = QComboBox()
+        self.fft_size_select.addItems(["1024", "4096", "16384", "65536"])
+        self.fft_size_select.setCurrentText("4096")
+        self.fft_window_select = QComboBox()
+        self.fft_window_select.addItems(list(WINDOWS))
+        self.fft_averaging_select = QComboBox()
+        self.fft_averaging_select.addItems(list(AVERAGING_MODES))
         self.filter_btn = QPushButton("Filtering")
         self.filter_btn.setIcon(QIcon(os.path.join(dir_path, "icon", "filter_icon.png")))
         self.export_btn = QPushButton("Export")
         self.export_btn.setIcon(QIcon(os.path.join(dir_path, "icon", "export_icon.png")))
         self.open_btn = QPushButton("Open Signal")
         self.open_btn.setIcon(QIcon(os.path.join(dir_path, "icon", "open_icon.png")))
+        self.measure_btn = QPushButton("Measure")
+        self.measure_btn.setCheckable(True)  # Toggles the automatic measurements panel
+        self.stats_btn = QPushButton("Stats")
+        self.stats_btn.setCheckable(True)  # Toggles the performance overlay
+        self.record_btn = QPushButton("Record")
+        self.record_btn.setCheckable(True)  # Stream samples to disk while acquiring
         self.clear_btn = QPushButton("Clear")
         self.clear_btn.setIcon(QIcon(os.path.join(dir_path, "icon", "clear_icon.png")))  # Add an icon if available
         controls_layout.addWidget(self.clear_btn)
@@ -194,9 +555,17 @@ class OscilloscopeUI(QWidget):
         # Connect the Clear button to its function
         self.clear_btn.clicked.connect(self.clear_screen)
         controls_layout.addWidget(self.fft_btn)
+        fft_layout = QHBoxLayout()
+        fft_layout.addWidget(self.fft_size_select)
+        fft_layout.addWidget(self.fft_window_select)
+        fft_layout.addWidget(self.fft_averaging_select)
+        controls_layout.addLayout(fft_layout)
         controls_layout.addWidget(self.filter_btn)
+        controls_layout.addWidget(self.measure_btn)
+        controls_layout.addWidget(self.stats_btn)
         controls_layout.addWidget(self.export_btn)
         controls_layout.addWidget(self.open_btn)
+        controls_layout.addWidget(self.record_btn)
 
         # Add stretch to push buttons to the top
         controls_layout.addStretch()
@@ -214,19 +583,39 @@ class OscilloscopeUI(QWidget):
         self.zoom_out_btn.clicked.connect(self.zoom_out)
         self.export_btn.clicked.connect(self.export_data)
         self.open_btn.clicked.connect(self.open_signal)
-        self.fft_btn.clicked.connect(self.compute_fft)  # Connect FFT button
+        self.record_btn.toggled.connect(self.toggle_recording)
+        self.trigger_select.currentTextChanged.connect(self.select_trigger)
+        self.trigger_mode_select.currentTextChanged.connect(self.configure_trigger)
+        self.trigger_level.valueChanged.connect(self.configure_trigger)
+        self.holdoff_select.valueChanged.connect(self.configure_trigger)
+        self.frame_select.currentTextChanged.connect(self.configure_trigger)
+        self.pre_trigger_select.currentTextChanged.connect(self.configure_trigger)
+        self.arm_btn.clicked.connect(self.arm_trigger)
+        self.segments_btn.toggled.connect(self.configure_segments)
+        self.segments_select.currentTextChanged.connect(self.configure_segments)
+        self.history_btn.clicked.connect(self.show_history)
+        self.persistence_btn.toggled.connect(self.toggle_persistence)
+        self.persistence_select.currentTextChanged.connect(self.set_persistence_time)
+        self.fft_btn.toggled.connect(self.compute_fft)  # Connect FFT button
+        self.fft_size_select.currentTextChanged.connect(self.reset_spectrum)
+        self.fft_window_select.currentTextChanged.connect(self.reset_spectrum)
+        self.fft_averaging_select.currentTextChanged.connect(self.reset_spectrum)
         self.filter_btn.clicked.connect(self.apply_filter)
-    def apply_filter(self):
-        """Apply a linear filter to the signal."""
-        if len(self.data) == 0:
-            return
+        self.measure_btn.toggled.connect(self.toggle_measurements)
+        self.stats_btn.toggled.connect(self.toggle_stats)
 
+        # Refresh the plot periodically while acquiring
+        self.timer = QTimer()
+        self.timer.timeout.connect(self.update_plot)
+
+    def apply_filter(self):
+        """Choose the linear filter applied live to the signal."""
         # Ask the user to choose a filter type
         filter_type, ok = QInputDialog.getItem(
             self,
             "Choose Filter",
             "Select a filter type:",
-            ["Moving Average", "Low-Pass Filter"],
+            ["Moving Average", "Low-Pass Filter", "None"],
             0,
             False,
         )
@@ -243,34 +632,83 @@ class OscilloscopeUI(QWidget):
                     100,  # Maximum value
                 )
                 if ok:
-                    filtered_data = self.moving_average(self.data, window_size)
-                    self.plot_curve.setData(self.timestamps[:len(filtered_data)], filtered_data)
+                    self.set_filter(FilterChain([MovingAverageStage(window_size)]))
 
             elif filter_type == "Low-Pass Filter":
                 # Apply low-pass filter
+                sampling_rate = 1.0 / self.buffer.dt
                 cutoff_freq, ok = QInputDialog.getDouble(
                     self,
                     "Low-Pass Filter",
                     "Enter cutoff frequency (Hz):",
-                    1.0,  # Default value
-                    0.1,  # Minimum value
-                    1000.0,  # Maximum value
+                    min(1.0, 0.25 * sampling_rate),  # Default value
+                    0.001,  # Minimum value
+                    0.499 * sampling_rate,  # Maximum value, below Nyquist
+                    3,  # Decimals
                 )
                 if ok:
-                    sampling_rate = 1 / (self.timestamps[1] - self.timestamps[0]) if len(self.timestamps) > 1 else 1000
-                    filtered_data = self.low_pass_filter(self.data, cutoff_freq, sampling_rate)
-                    self.plot_curve.setData(self.timestamps[:len(filtered_data)], filtered_data)
+                    self.set_filter(FilterChain([ButterworthStage('low', 5, cutoff_freq, sampling_rate)]))
 
-    def moving_average(self, data, window_size=5):
-        """Apply a moving average filter to the signal."""
-        return np.convolve(data, np.ones(window_size) / window_size, mode='valid')
+            else:
+                self.set_filter(None)
+
+    def set_filter(self, chain):
+        """Replace the live filter; the current buffer is filtered from its oldest sample."""
+        self.filter_chain = chain
+        self.reset_filter()
+        self.update_filter(limit=None)
+        self.filter_decimator.invalidate()
+        self.update_plot()
+
+    def reset_filter(self):
+        """Restart filtering, e.g. after the sample buffer was replaced."""
+        self.filter_curve.setData([], [])
+        if self.filter_chain is None:
+            self.filtered = None
+            return
+        self.filter_chain.reset()
+        self.filtered = SampleBuffer(self.buffer.capacity, dt=self.buffer.dt, t0=self.buffer.t0)
+        self.filtered.clear(self.buffer.first_index)
+        self.filtered_source = self.buffer
+
+    def update_filter(self, limit=1 << 20):
+        """Filter only the samples that arrived since the last call.
+
+        At most ``limit`` samples are processed per call so a backlog is
+        worked off over several refreshes instead of stalling one.
+        """
+        if self.filter_chain is None:
+            return
+        if self.filtered_source is not self.buffer:
+            self.reset_filter()  # The sample buffer was replaced
+        with self.data_lock:
+            start = self.filtered.total
+            if start < self.buffer.first_index:
+                # Fell behind by more than the buffer holds: continue from the oldest sample
+                start = self.buffer.first_index
+            stop = self.buffer.total if limit is None else min(self.buffer.total, start + limit)
+            block = np.array(self.buffer.read(start, stop).values, dtype=np.float64)
+        if start != self.filtered.total:
+            self.filter_chain.reset()
+            self.filtered.clear(start)
+        if len(block):
+            self.filtered.extend(self.filter_chain.process(block))
+
+    def show_channels(self, channels):
+        """Display ``channels``; the first one is triggered on, filtered and analysed."""
+        for curve, _ in self.channel_curves:
+            self.plot_widget.removeItem(curve)
+        self.channels = channels
+        self.buffer = channels[0].buffer
+        self.data_lock = channels[0].lock  # Guards self.buffer; every channel has its own lock
+        self.channel_curves = [
+            (self.plot_widget.plot(pen=CHANNEL_PENS[i % len(CHANNEL_PENS)], connect='finite'), Decimator())
+            for i in range(1, len(channels))
+        ]
+        self.decimator.invalidate()
+        if self.measurements is not None:
+            self.measurements.reset()
 
-    def low_pass_filter(self, data, cutoff_freq, sampling_rate, order=5):
-        """Apply a low-pass filter to the signal."""
-        nyquist_freq = 0.5 * sampling_rate
-        normal_cutoff = cutoff_freq / nyquist_freq
-        b, a = butter(order, normal_cutoff, btype='low', analog=False)
-        return lfilter(b, a, data)
     def clear_screen(self):
         """Clear the plot and reset data."""
         # Ask for confirmation before clearing
@@ -283,14 +721,21 @@ class OscilloscopeUI(QWidget):
         )
 
         if reply == QMessageBox.Yes:
-            # Reset data and timestamps
-            with self.data_lock:
-                self.data = []
-                self.timestamps = []
+            # Drop the samples; numbering and timestamps continue with the acquisition
+            for channel in self.channels:
+                with channel.lock:
+                    channel.buffer.clear()
 
             # Clear the plot
             self.plot_widget.clear()
-            self.plot_curve = self.plot_widget.plot(pen='y', width=2)  # Reinitialize the plot curve
+            self.plot_curve = self.plot_widget.plot(pen='y', width=2, connect='finite')  # Reinitialize the plot curve
+            self.filter_curve = self.plot_widget.plot(pen='c', connect='finite')
+            self.plot_widget.addItem(self.persistence_image)
+            self.persistence = None
+            self.sync_persistence_view()
+            self.channel_curves = []
+            self.show_channels(self.channels)
+            self.reset_filter()
 
             # Reset cursors (optional)
             self.v_cursor.setPos(0)
@@ -299,71 +744,454 @@ class OscilloscopeUI(QWidget):
             print("Screen cleared.")
 
     def start_signal(self):
-        # Get COM port and baud rate
-        com_port = self.com_select.currentText()
+        # Get COM ports and baud rate
+        com_ports = [self.com_select.currentText()]
+        if self.com2_select.currentText() not in ("None", com_ports[0]):
+            com_ports.append(self.com2_select.currentText())
         baud_rate = int(self.baud_select.currentText())
 
-        # Open serial connection
         try:
-            self.ser = serial.Serial(com_port, baud_rate, timeout=1)
-            self.is_running = True
-            self.data = []  # Reset data buffer
-            self.timestamps = []  # Reset timestamps
-            self.timer.start(50)  # Update graph every 50ms
-
-            # Start a new thread to continuously read from the serial port
-            threading.Thread(target=self.read_data, daemon=True).start()
+            sample_rate = float(self.rate_select.currentText())
+        except ValueError:
+            print("Invalid sample rate.")
+            return
+
+        if self.acquisition is not None:
+            self.pause_signal()
+
+        # Open one reader per serial port, each filling its own channel buffers
+        acquisition = AcquisitionManager(self.backend_select.currentText())
+        try:
+            for com_port in com_ports:
+                acquisition.add_serial(com_port, baud_rate, sample_rate, MEMORY_DEPTHS[self.depth_select.currentText()],
+                                       channels=int(self.channels_select.currentText()),
+                                       binary=self.protocol_select.currentText() == "Binary")
+            acquisition.start()
+        except ValueError as e:
+            print(f"Invalid channel configuration: {e}")
+            acquisition.close()
+            return
         except serial.SerialException as e:
             print(f"Failed to open serial port: {e}")
+            acquisition.close()
+            return
+
+        previous, self.acquisition = self.acquisition, acquisition
+        self.is_running = True
+        self.show_channels(acquisition.channels)
+        if previous is not None:
+            previous.close()  # Its channels are no longer displayed
+        self.reset_spectrum()
+        self.reset_filter()
+        self.configure_trigger()
+        self.timer.start(50)  # Update graph every 50ms
 
     def pause_signal(self):
         self.is_running = False
         self.timer.stop()
 
-        if self.ser and self.ser.isOpen():
-            self.ser.close()
-
-    def read_data(self):
-        max_data_points = 1000  # Limit the number of data points
-        start_time = QTimer.currentTime()  # Record the start time
-        while self.is_running:
-            if self.ser and self.ser.isOpen():
+        self.record_btn.setChecked(False)
+        if self.acquisition is not None:
+            self.acquisition.stop()
+
+    def toggle_recording(self, checked):
+        """Start or stop streaming the acquired samples to disk, one file series per port."""
+        if not checked:
+            if self.acquisition is not None:
+                for reader in self.acquisition.readers:
+                    reader.recorder = None
+            recorders, self.recorders = self.recorders, []
+            for recorder in recorders:
+                recorder.stop()
+                print(f"Recorded {recorder.samples_written} samples to {len(recorder.files)} file(s)")
+            return
+        if not self.is_running or self.acquisition is None:
+            print("Start the acquisition before recording.")
+            self.record_btn.setChecked(False)
+            return
+        directory = QFileDialog.getExistingDirectory(self, "Record To", dir_path)
+        if not directory:
+            self.record_btn.setChecked(False)
+            return
+        for reader in self.acquisition.readers:
+            recorder = StreamRecorder(directory, reader.sample_rate,
+                                      prefix=f"capture_{os.path.basename(reader.port)}",
+                                      channels=len(reader.channels))
+            recorder.start()
+            reader.recorder = recorder
+            self.recorders.append(recorder)
+        print(f"Recording to {directory}")
+
+    def update_status(self):
+        """Show clock and decoder statistics."""
+        status = []
+        if self.acquisition is not None:
+            for reader in self.acquisition.readers:
+                stats = reader.statistics()
+                status.append(f"{reader.port} drift: {stats['drift_ppm']:+.1f} ppm")
+                if stats['gaps']:
+                    status.append(f"{stats['gaps']} gaps ({stats['samples_missing']} samples missing)")
+                if 'frames_ok' in stats:
+                    status.append(
+                        f"Frames: {stats['frames_ok']} ok, {stats['frames_corrupt']} corrupt, "
+                        f"{stats['frames_dropped']} dropped"
+                    )
+                if stats['invalid_lines']:
+                    status.append(f"{stats['invalid_lines']} invalid lines")
+        if self.trigger is not None:
+            state = "armed" if self.trigger.armed else "stopped"
+            status.append(f"Trigger {state}: {self.trigger.triggers} triggers")
+        if self.segments is not None:
+            status.append(f"Segments: {len(self.segments)}/{self.segments.capacity}")
+        if self.recorders:
+            status.append(
+                f"Recording: {sum(r.bytes_written for r in self.recorders) / 1e6:.1f} MB, "
+                f"queue {sum(r.queue_depth for r in self.recorders)}, "
+                f"{sum(r.blocks_dropped for r in self.recorders)} blocks dropped"
+            )
+        self.status_label.setText(", ".join(status))
+
+    def toggle_stats(self, checked):
+        """Show or hide the performance overlay."""
+        self.stats_overlay.setVisible(checked)
+        if checked:
+            self.stats_updated = 0.0
+            self.update_stats()
+
+    def update_stats(self):
+        """Show acquisition rates and the time spent in each display stage."""
+        now = time.monotonic()
+        if not self.stats_btn.isChecked() or now - self.stats_updated < STATS_INTERVAL:
+            return
+        self.stats_updated = now
+        cpu = self.cpu_meter.update(time.process_time(), now)
+        lines = []
+        if self.acquisition is not None:
+            for reader in self.acquisition.readers:
+                stats = reader.statistics()
+                meter = self.rate_meters.setdefault(reader.port, RateMeter())
+                rate = meter.update(reader.channels[0].buffer.total, now)
+                lines.append(
+                    f"{reader.port}: {pg.siFormat(rate, suffix='S/s')}, "
+                    f"{stats['samples_missing'] + stats['invalid_lines']} samples lost, "
+                    f"backlog {stats['backlog_bytes']} B, parse {stats['parse_ms']:.3f} ms, "
+                    f"lock {stats['lock_ms']:.3f} ms"
+                )
+        if self.recorders:
+            lines.append(f"Recorder queue: {sum(r.queue_depth for r in self.recorders)} blocks")
+        timings = self.stage_timer.summary()
+        if "frame" in timings:
+            frame = timings["frame"]
+            line = f"Frame {frame['mean'] * 1e3:.2f} ms (max {frame['max'] * 1e3:.2f} ms)"
+            if "interval" in timings:
+                line += f", every {timings['interval']['mean'] * 1e3:.1f} ms"
+            lines.append(line + f", process CPU {cpu * 100:.0f} %")
+        for name in DISPLAY_STAGES:
+            if name in timings:
+                stage = timings[name]
+                lines.append(f"  {name}: {stage['mean'] * 1e3:.3f} ms (CPU {stage['cpu'] * 1e3:.3f} ms)")
+        self.stats_overlay.setText("\n".join(lines))
+
+    def select_trigger(self, trigger_type):
+        """Ask for the pulse width bounds when the pulse width trigger is chosen."""
+        if trigger_type == "Pulse Width":
+            min_width, ok = QInputDialog.getDouble(
+                self, "Pulse Width Trigger", "Minimum pulse width (ms):", 0.0, 0.0, 1e6, 3)
+            if ok:
+                max_width, ok = QInputDialog.getDouble(
+                    self, "Pulse Width Trigger", "Maximum pulse width (ms):", max(min_width, 1.0), min_width, 1e6, 3)
+            if ok:
+                self.pulse_width = (min_width / 1000, max_width / 1000)
+        self.configure_trigger()
+
+    def configure_trigger(self):
+        """Rebuild the trigger engine from the trigger controls."""
+        trigger_type = self.trigger_select.currentText()
+        self.trigger_frame = None
+        self.persistence = None  # Frames triggered differently do not line up with the old hits
+        self.persistence_btn.setEnabled(trigger_type != "Off")
+        if trigger_type == "Off":
+            self.persistence_btn.setChecked(False)
+        self.sync_persistence_view()
+        self.decimator.invalidate()
+        self.filter_decimator.invalidate()
+        if self.measurements is not None:
+            self.measurements.reset()  # Statistics of free-running and triggered windows do not mix
+        if trigger_type == "Off":
+            self.trigger = None
+            self.configure_segments()
+            return
+        frame_length = min(int(self.frame_select.currentText()), self.buffer.capacity)
+        pre_samples = int(frame_length * PRE_TRIGGER[self.pre_trigger_select.currentText()])
+        dt = self.buffer.dt
+        self.trigger = TriggerEngine(
+            trigger_type,
+            mode=self.trigger_mode_select.currentText(),
+            level=self.trigger_level.value(),
+            hysteresis=TRIGGER_HYSTERESIS,
+            pre_samples=pre_samples,
+            post_samples=frame_length - pre_samples,
+            holdoff=int(round(self.holdoff_select.value() / 1000 / dt)),
+            pulse_min=self.pulse_width[0] / dt,
+            pulse_max=self.pulse_width[1] / dt,
+        )
+        self.configure_segments()
+
+    def arm_trigger(self):
+        """Re-arm the trigger for another single-shot capture."""
+        if self.trigger is not None:
+            self.trigger.arm()
+
+    def configure_segments(self):
+        """Set up segmented memory for the current trigger frames.
+
+        The stored segments are kept while the frame geometry and the
+        segment count stay the same, so the trigger level or mode can be
+        changed without losing the history.
+        """
+        if not self.segments_btn.isChecked():
+            self.segments = None
+        elif self.trigger is not None:
+            length = self.trigger.frame_length
+            pre_samples = self.trigger.pre_samples
+            max_segments = int(self.segments_select.currentText())
+            store = self.segments
+            if store is None or (store.length, store.pre_samples, store.dt, store.max_segments) != (
+                    length, pre_samples, self.buffer.dt, max_segments):
                 try:
-                    line = self.ser.readline()
-                    if line:
-                        try:
-                            voltage = float(line.strip())
-                            timestamp = (QTimer.currentTime() - start_time) / 1000  # Convert to seconds
-                            with self.data_lock:  # Acquire lock before modifying data
-                                self.timestamps.append(timestamp)
-                                self.data.append(voltage)
-                                if len(self.data) > max_data_points:
-                                    self.timestamps.pop(0)  # Remove the oldest timestamp
-                                    self.data.pop(0)  # Remove the oldest data point
-                        except ValueError:
-                            print("Invalid data received from serial port.")
-                except serial.SerialException as e:
-                    print(f"Serial port error: {e}")
-                    self.is_running = False
-                    self.timer.stop()
-                    if self.ser and self.ser.isOpen():
-                        self.ser.close()
+                    self.segments = SegmentStore(length, self.buffer.dt, pre_samples, max_segments, SEGMENT_BUDGET)
+                except ValueError as e:
+                    print(f"Segmented memory unavailable: {e}")
+                    self.segments = None
+        if self.history.store is not self.segments and (self.segments is not None or self.history.isHidden()):
+            self.history.set_store(self.segments)
+
+    def show_history(self):
+        if self.history.store is None:
+            self.history.set_store(self.segments)
+        self.history.refresh()  # Segments stored while the window was hidden
+        self.history.show()
+        self.history.raise_()
+
+    def update_trigger(self):
+        """Scan the new samples, keep the latest complete frame and store them all when segmented."""
+        with self.data_lock:  # Scanning is vectorized over the samples received since the last tick
+            frames = self.trigger.process(self.buffer)
+            t0 = self.buffer.t0
+        if frames:
+            self.trigger_frame = frames[-1]
+            if self.segments is not None:
+                self.segments.add_frames(frames, t0, time.time())
+                if self.history.isVisible() and self.history.store is self.segments:
+                    self.history.refresh()
+            if self.persistence_btn.isChecked():
+                self.update_persistence(frames)
+
+    def toggle_persistence(self, checked):
+        """Switch between the latest frame and the intensity-graded display of all frames."""
+        self.persistence = None
+        self.sync_persistence_view()
+        if not checked:
+            self.persistence_image.clear()
+
+    def sync_persistence_view(self):
+        """Show the heat map in place of the first channel's trace once it holds a frame."""
+        shown = self.persistence_btn.isChecked() and self.persistence is not None and self.persistence.frames > 0
+        self.persistence_image.setVisible(shown)
+        self.plot_curve.setVisible(not shown)
+
+    def set_persistence_time(self, text):
+        if self.persistence is not None:
+            self.persistence.persistence = PERSISTENCE_TIMES[text]
+
+    def update_persistence(self, frames):
+        """Accumulate the triggered frames into the hit histogram."""
+        frames = [frame for frame in frames if not frame.forced]
+        if not frames:
+            return
+        values = np.stack([frame.trace.values for frame in frames])
+        trace = frames[0].trace
+        pm = self.persistence
+        if pm is None or (pm.length, pm.t0, pm.dt) != (values.shape[1], trace.t0, trace.dt):
+            width = max(int(self.plot_widget.getViewBox().width()), 100)
+            persistence = PERSISTENCE_TIMES[self.persistence_select.currentText()]
+            pm = fit_persistence(values, trace.t0, trace.dt, width, persistence)
+            if pm is None:
+                return
+            self.persistence = pm
+        pm.add(values)
+        self.sync_persistence_view()
+
+    def draw_persistence(self):
+        """Fade and show the hit histogram."""
+        if self.persistence is None or not self.persistence_btn.isChecked():
+            return
+        self.persistence.decay()
+        self.persistence_image.setImage(self.persistence.intensity(), levels=(0, 1), autoLevels=False)
+        self.persistence_image.setRect(QRectF(*self.persistence.rect))  # Needs the image size
 
     def update_plot(self):
-        with self.data_lock:  # Acquire lock before accessing data
-            if self.data:
-                # Smooth the signal using a moving average
-                smoothed_data = self.moving_average(self.data, window_size=5)
-                self.plot_curve.setData(self.timestamps[:len(smoothed_data)], smoothed_data)  # Update the plot
+        """Refresh the display, timing every stage for the performance overlay."""
+        now = time.perf_counter()
+        if self.last_tick is not None:
+            # Includes painting and event handling, which happen between refreshes
+            self.stage_timer.record("interval", now - self.last_tick)
+        self.last_tick = now
+        with self.stage_timer.stage("frame"):
+            self.redraw()
+        self.update_stats()
+
+    def redraw(self):
+        timer = self.stage_timer
+        with timer.stage("refresh"):
+            if self.acquisition is not None:
+                self.acquisition.refresh()  # Take in what the readers stored since the last refresh
+        if self.is_running and any(reader.error is not None for reader in self.acquisition.readers):
+            self.pause_signal()  # A serial port failed
+        self.update_status()
+        with timer.stage("filter"):
+            self.update_filter()
+        with timer.stage("spectrum"):
+            self.update_spectrum()
+        view_box = self.plot_widget.getViewBox()
+        if view_box.state['autoRange'][0]:
+            x_min, x_max = -np.inf, np.inf  # Follow the whole buffer
+        else:
+            x_min, x_max = view_box.viewRange()[0]
+        width = max(int(view_box.width()), 100)  # Plot width in pixels
+
+        if self.trigger is not None:
+            # Show the latest triggered frame, with t = 0 at the trigger point
+            with timer.stage("trigger"):
+                self.update_trigger()
+            frame = self.trigger_frame
+            if frame is None:
+                return
+            with timer.stage("decimate"):
+                first = frame.index - self.trigger.pre_samples
+                result = self.decimator.update(frame.trace, x_min, x_max, width, ('frame', frame.index), first)
+                filtered_result = None
+                if self.filtered is not None:
+                    values = self.filtered.read(first, first + len(frame.trace)).values
+                    if len(values) == len(frame.trace):
+                        filtered_result = self.filter_decimator.update(
+                            Trace(frame.trace.t0, frame.trace.dt, values), x_min, x_max, width,
+                            ('frame', frame.index), first)
+                channel_results = [self.decimate_frame(channel, decimator, frame, x_min, x_max, width)
+                                   for channel, (_, decimator) in zip(self.channels[1:], self.channel_curves)]
+        else:
+            with timer.stage("decimate"):
+                with self.data_lock:  # The envelope is built from the buffer in one vectorized pass
+                    result = self.decimate(self.buffer, self.decimator, x_min, x_max, width)
+                # Only the GUI thread writes the filtered buffer, no lock needed
+                filtered_result = None
+                if self.filtered is not None:
+                    filtered_result = self.decimate(self.filtered, self.filter_decimator, x_min, x_max, width)
+                channel_results = []
+                for channel, (_, decimator) in zip(self.channels[1:], self.channel_curves):
+                    with channel.lock:  # Each channel only waits on its own reader
+                        channel_results.append(self.decimate(channel.buffer, decimator, x_min, x_max, width))
+
+        with timer.stage("draw"):
+            if result is not None:
+                x, y, decimated = result
+                if not decimated and len(y) >= 5:
+                    # Smooth the signal using a moving average when every sample is drawn
+                    y = self.moving_average(y, window_size=5)
+                    x = x[:len(y)]
+                self.plot_curve.setData(x, y)  # Update the plot
 
                 # Auto-scale the y-axis based on the signal's min and max values
-                self.auto_scale_y_axis(smoothed_data)
+                self.auto_scale_y_axis(y)
+
+            if filtered_result is not None:
+                self.filter_curve.setData(filtered_result[0], filtered_result[1])
+
+            for (curve, _), channel_result in zip(self.channel_curves, channel_results):
+                if channel_result is not None:
+                    curve.setData(channel_result[0], channel_result[1])
+
+            if self.trigger is not None:
+                self.draw_persistence()
+
+        with timer.stage("measure"):
+            self.update_measurements(x_min, x_max)
+
+    def decimate(self, buffer, decimator, x_min, x_max, width):
+        """Return the decimated visible part of ``buffer``, or None if unchanged or empty."""
+        if len(buffer) == 0:
+            return None
+        return decimator.update(buffer.trace(), x_min, x_max, width, (id(buffer), buffer.total),
+                                buffer.first_index, buffer.lod)
+
+    def toggle_measurements(self, checked):
+        """Show or hide the automatic measurements panel."""
+        self.measurements = MeasurementEngine() if checked else None
+        self.measure_label.setVisible(checked)
+        if checked:
+            self.update_plot()
+
+    def update_measurements(self, x_min, x_max):
+        """Measure the latest triggered frame, or the visible part of the buffer."""
+        if self.measurements is None:
+            return
+        if self.trigger is not None:
+            frame = self.trigger_frame
+            if frame is None:
+                return
+            trace, key = frame.trace, ('frame', frame.index)
+        else:
+            with self.data_lock:  # Copy no more than the measurement budgets can use
+                trace = self.buffer.trace()
+                i0, i1 = visible_range(trace, x_min, x_max)
+                i0 = max(i0, i1 - self.measurements.window_samples)
+                trace = Trace(trace.t0 + i0 * trace.dt, trace.dt, np.array(trace.values[i0:i1]))
+                key = (id(self.buffer), self.buffer.total, i0, i1)
+        if len(trace) == 0:
+            return
+        results = self.measurements.update(trace, key)
+
+        lines = []
+        for name, unit in MEASUREMENTS.items():
+            if name not in results:
+                continue
+            stats = self.measurements.statistics(name)
+            if unit == "%":
+                text = f"{name}: {results[name]:.1f} %"
+                if stats is not None:
+                    text += f" (min {stats[0]:.1f}, max {stats[1]:.1f}, avg {stats[2]:.1f}, σ {stats[3]:.2f})"
+            else:
+                text = f"{name}: {pg.siFormat(results[name], precision=4, suffix=unit)}"
+                if stats is not None:
+                    text += " (min {}, max {}, avg {}, σ {})".format(*(pg.siFormat(v, precision=4, suffix=unit) for v in stats))
+            lines.append(text)
+        if self.measurements.limited:
+            # Over budget: these groups only looked at the newest part of the window
+            lines.append(f"Newest samples only: {', '.join(sorted(self.measurements.limited))}")
+        lines.append(f"Statistics over the last {min(self.measurements.acquisitions, self.measurements.history)} "
+                     f"acquisitions")
+        self.measure_label.setText("\n".join(lines))
+
+    def decimate_frame(self, channel, decimator, frame, x_min, x_max, width):
+        """Decimate the part of another channel acquired during a triggered frame."""
+        # Channels of different boards share the timebase, not the sample indices
+        trigger_time = self.buffer.t0 + frame.index * self.buffer.dt
+        buffer = channel.buffer
+        start = int(np.ceil((trigger_time + frame.trace.t0 - buffer.t0) / buffer.dt))
+        stop = int(np.floor((trigger_time + frame.trace.t_end - buffer.t0) / buffer.dt)) + 1
+        with channel.lock:
+            start = max(start, buffer.first_index)
+            trace = buffer.read(start, stop)
+            if len(trace) == 0:
+                return None
+            return decimator.update(Trace(trace.t0 - trigger_time, trace.dt, trace.values), x_min, x_max, width,
+                                    ('frame', frame.index, len(trace)), start)
 
     def auto_scale_y_axis(self, data):
         """Auto-scale the y-axis based on the signal's min and max values."""
-        if len(data) > 0:
-            min_val = min(data)
-            max_val = max(data)
+        if len(data) > 0 and not np.all(np.isnan(data)):
+            min_val = np.nanmin(data)
+            max_val = np.nanmax(data)
             margin = 0.1 * (max_val - min_val)  # Add 10% margin
             self.plot_widget.setYRange(min_val - margin, max_val + margin)
 
@@ -391,74 +1219,130 @@ class OscilloscopeUI(QWidget):
         h_pos = self.h_cursor.pos().y()
         self.plot_widget.setTitle(f"Vertical Cursor: {v_pos:.3f} s, Horizontal Cursor: {h_pos:.3f} V")
 
-    def compute_fft(self):
-        """Compute and display the FFT of the signal."""
-        if len(self.data) > 0:
-            # Compute FFT
-            N = len(self.data)
-            T = self.timestamps[1] - self.timestamps[0]  # Sampling interval
-            yf = fft(self.data)
-            xf = np.linspace(0.0, 1.0 / (2.0 * T), N // 2)
+    def compute_fft(self, checked=True):
+        """Show or hide the live spectrum of the signal."""
+        if not checked:
+            self.spectrum = None
+            self.spectrum_widget.hide()
+            return
+        self.spectrum_widget.show()
+        self.reset_spectrum()
 
-            # Plot FFT
-            self.plot_widget.clear()
-            self.plot_widget.plot(xf, 2.0 / N * np.abs(yf[:N // 2]), pen='r')
-            self.plot_widget.setLabel('left', 'Amplitude')
-            self.plot_widget.setLabel('bottom', 'Frequency', units='Hz')
+    def reset_spectrum(self):
+        """Restart the spectrum analyzer with the selected settings."""
+        if not self.fft_btn.isChecked():
+            return
+        # Frames cannot be longer than the buffer holds
+        frame_size = int(self.fft_size_select.currentText())
+        while frame_size > 16 and frame_size > self.buffer.capacity:
+            frame_size //= 2
+        self.spectrum = SpectrumAnalyzer(frame_size, window_name=self.fft_window_select.currentText(),
+                                         averaging=self.fft_averaging_select.currentText())
+        self.update_spectrum()
+
+    def update_spectrum(self):
+        """Analyse the frames received since the last refresh."""
+        if self.spectrum is None:
+            return
+        with self.data_lock:  # Only the new frames are copied, at most a few per refresh
+            frames = self.spectrum.collect(self.buffer)
+            dt = self.buffer.dt
+        if frames is not None:
+            freqs, amplitude = self.spectrum.update(*frames, dt)
+            self.spectrum_curve.setData(freqs, amplitude)
 
     def export_data(self):
         # Open a file dialog to select the save location and filename
         options = QFileDialog.Options()
-        file_path, _ = QFileDialog.getSaveFileName(self, "Save Data", dir_path,
-                                                   "Text Files (*.txt);;PNG Files (*.png);;All Files (*)", options=options)
+        file_path, _ = QFileDialog.getSaveFileName(self, "Save Data", dir_path, EXPORT_FILTERS, options=options)
 
-        if file_path:
-            if file_path.endswith(".txt"):
-                # Save signal data to a text file (timestamp and value)
-                with open(file_path, "w") as file:
-                    with self.data_lock:  # Acquire lock before accessing data
-                        for timestamp, voltage in zip(self.timestamps, self.data):
-                            file.write(f"{timestamp} {voltage}\n")
-                print(f"Signal data exported as {file_path}")
-            elif file_path.endswith(".png"):
-                # Save the graph as an image
-                exporter = ImageExporter(self.plot_widget.plotItem)
-                exporter.parameters()['width'] = 3000  # Higher width in pixels
-                exporter.parameters()['height'] = 2000  # Higher height in pixels
-                exporter.export(file_path)
+        if not file_path:
+            return
+        if file_path.lower().endswith(".png"):
+            # Render the graph here, encode and write the image in the background
+            exporter = ImageExporter(self.plot_widget.plotItem)
+            exporter.parameters()['width'] = 3000  # Higher width in pixels
+            exporter.parameters()['height'] = 2000  # Higher height in pixels
+            image = exporter.export(toBytes=True)
+
+            def write(progress, cancelled):
+                if not image.save(file_path):
+                    raise OSError("could not write the image")
+            job = ExportJob(write)
+        elif file_path.lower().endswith(EXPORT_EXTENSIONS) and self.channels:
+            # Copy the samples under the locks, then write without holding them
+            traces = snapshot(self.channels)
+            names = [channel.name for channel in self.channels]
+            job = ExportJob(lambda progress, cancelled: export_traces(file_path, traces, names, progress=progress,
+                                                                      cancelled=cancelled))
+        elif self.channels:
+            print("Unsupported file format. Please use .txt, .csv, .scp, .npz, .wav, .h5 or .png.")
+            return
+        else:
+            print("No signal to export yet.")
+            return
+        self.start_export(job.start(), file_path)
+
+    def start_export(self, job, file_path):
+        """Show the progress of a background export, cancelled from its dialog."""
+        dialog = QProgressDialog(f"Exporting {os.path.basename(file_path)}...", "Cancel", 0, 1000, self)
+        dialog.setWindowTitle("Export")
+        dialog.setMinimumDuration(500)  # Quick exports finish without showing it
+        dialog.setAutoClose(False)
+        dialog.setAutoReset(False)
+        dialog.canceled.connect(job.cancel)
+        self.exports.append((job, dialog, file_path))
+        if not self.export_timer.isActive():
+            self.export_timer.start(EXPORT_INTERVAL)
+
+    def update_exports(self):
+        # Polled while exports run, like the plot timer polls the acquisition
+        for job, dialog, file_path in list(self.exports):
+            if job.is_running:
+                dialog.setValue(int(job.progress * 1000))
+                continue
+            self.exports.remove((job, dialog, file_path))
+            dialog.close()
+            if job.error is not None:
+                print(f"Failed to export {file_path}: {job.error}")
+            elif job.cancelled and not job.completed:
+                print(f"Export of {file_path} cancelled")
+            elif file_path.lower().endswith(".png"):
                 print(f"Graph exported as {file_path}")
             else:
-                print("Unsupported file format. Please use .txt or .png.")
+                print(f"Signal data exported as {file_path}")
+        if not self.exports:
+            self.export_timer.stop()
 
     def open_signal(self):
-        # Open a file dialog to select a .txt file
+        # Open a file dialog to select a .txt or .scp file
         options = QFileDialog.Options()
         file_path, _ = QFileDialog.getOpenFileName(self, "Open Signal Data", dir_path,
-                                                  "Text Files (*.txt);;All Files (*)", options=options)
+                                                  "Signal Files (*.txt *.scp);;Text Files (*.txt);;"
+                                                  "Capture Files (*.scp);;All Files (*)", options=options)
 
-        if file_path and file_path.endswith(".txt"):
+        if file_path and file_path.endswith(CAPTURE_EXTENSIONS):
             try:
-                with open(file_path, "r") as file:
-                    # Read the signal data from the file
-                    timestamps = []
-                    data = []
-                    for line in file.readlines():
-                        parts = line.strip().split()
-                        if len(parts) == 2:
-                            timestamps.append(float(parts[0]))  # First column: timestamp
-                            data.append(float(parts[1]))  # Second column: value
-
-                # Plot the signal data
-                with self.data_lock:  # Acquire lock before modifying data
-                    self.timestamps = timestamps  # Replace current timestamps
-                    self.data = data  # Replace current data
-                self.plot_curve.setData(self.timestamps, self.data)  # Update the plot
-                self.auto_scale_y_axis(data)  # Auto-scale the y-axis
+                # Binary captures are memory-mapped and text captures parsed in vectorized chunks
+                traces = load_traces(file_path)
+
+                # Plot the signal data, one channel per recorded channel
+                name = os.path.basename(file_path)
+                self.show_channels([
+                    Channel(f"{name} CH{i + 1}" if len(traces) > 1 else name, TraceBuffer(trace))
+                    for i, trace in enumerate(traces)
+                ])  # Replace current data
+                self.plot_widget.getViewBox().enableAutoRange(x=True)
+                self.reset_spectrum()
+                self.reset_filter()
+                self.update_filter(limit=None)
+                self.configure_trigger()
+                self.update_plot()  # Update the plot and auto-scale the y-axis
                 print(f"Signal data loaded from {file_path}")
             except Exception as e:
                 print(f"Error loading signal data: {e}")
         else:
-            print("Unsupported file format. Please select a .txt file.")
+            print("Unsupported file format. Please select a .txt or .scp file.")
 
     def zoom_in(self):
         self.plot_widget.getViewBox().scaleBy((0.9, 0.9))  # Zoom in by 10%
@@ -466,42 +1350,51 @@ class OscilloscopeUI(QWidget):
     def zoom_out(self):
         self.plot_widget.getViewBox().scaleBy((1.1, 1.1))  # Zoom out by 10%
 
-    def mouse_moved(self, pos):
-        """Handle mouse movement over the plot."""
-        if len(self.data) == 0 or len(self.timestamps) == 0:
+    def mouse_moved(self, event):
+        """Show the sample nearest to the mouse, measured in screen pixels."""
+        pos = event[0]  # SignalProxy passes the latest signal arguments
+        view_box = self.plot_widget.plotItem.vb
+        if not view_box.sceneBoundingRect().contains(pos):
             return
 
         # Convert mouse position to plot coordinates
-        mouse_point = self.plot_widget.plotItem.vb.mapSceneToView(pos)
+        mouse_point = view_box.mapSceneToView(pos)
         x_mouse = mouse_point.x()
         y_mouse = mouse_point.y()
-
-        # Find the nearest data point
-        nearest_index = self.find_nearest_point(x_mouse, y_mouse)
-        if nearest_index is not None:
-            x_nearest = self.timestamps[nearest_index]
-            y_nearest = self.data[nearest_index]
-            self.hover_label.setText(f"Time: {x_nearest:.3f} s, Voltage: {y_nearest:.3f} V")
-
-    def find_nearest_point(self, x_mouse, y_mouse):
-        """Find the index of the nearest data point to the mouse cursor."""
-        if len(self.timestamps) == 0 or len(self.data) == 0:
-            return None
-
-        # Calculate the distance between the mouse position and each data point
-        distances = np.sqrt((np.array(self.timestamps) - x_mouse) ** 2 + (np.array(self.data) - y_mouse) ** 2)
-        nearest_index = np.argmin(distances)
-
-        # Check if the nearest point is within a reasonable distance
-        if distances[nearest_index] < 0.1:  # Adjust threshold as needed
-            return nearest_index
-        return None
+        pixel_size = view_box.viewPixelSize()
+
+        # Find the nearest data point among the displayed traces
+        best = None
+        if self.trigger is not None:
+            if self.trigger_frame is not None:
+                trace = self.trigger_frame.trace
+                found = nearest_sample(trace, x_mouse, y_mouse, pixel_size)
+                if found is not None:
+                    best = (found[1], self.channels[0].name, trace.t0 + found[0] * trace.dt,
+                            trace.values[found[0]])
+        else:
+            for channel in self.channels:
+                with channel.lock:  # Only a few pixels' worth of samples are examined
+                    trace = channel.buffer.trace()
+                    found = nearest_sample(trace, x_mouse, y_mouse, pixel_size)
+                    if found is not None and (best is None or found[1] < best[0]):
+                        best = (found[1], channel.name, trace.t0 + found[0] * trace.dt,
+                                float(trace.values[found[0]]))
+        if best is not None:
+            _, name, x_nearest, y_nearest = best
+            prefix = f"{name}: " if len(self.channels) > 1 else ""
+            self.hover_label.setText(f"{prefix}Time: {x_nearest:.9g} s, Voltage: {y_nearest:.3f} V")
 
     def closeEvent(self, event):
         # Ensure the serial port is closed when the application exits
         self.is_running = False
-        if self.ser and self.ser.isOpen():
-            self.ser.close()
+        if self.acquisition is not None:
+            self.acquisition.close()
+        for recorder in self.recorders:
+            recorder.stop()  # Flush what is still queued
+        for job, _, _ in self.exports:
+            job.join()  # Finish writing rather than leave a partial file
+        self.history.close()
         event.accept()
 
 
@@ -509,4 +1402,4 @@ if __name__ == "__main__":
     app = QApplication(sys.argv)
     oscilloscope = OscilloscopeUI()
     oscilloscope.show()
-    sys.exit(app.exec_())
\ No newline at end of file
+    sys.exit(app.exec_())
\ No newline at end of file
@@ -0,0 +1,5 @@
+"""Acquisition and signal-processing core for EPT'Scope.
+
+Nothing in this package imports PyQt5 or pyqtgraph; the GUI in ``main.py``
+is built on top of it.
+"""
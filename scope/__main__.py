@@ -0,0 +1,57 @@
+"""Command-line capture: ``python -m scope SOURCE -o OUTPUT (-n SAMPLES | -t SECONDS)``."""
+import argparse
+import sys
+
+from scope.capture import capture, filter_traces, save_spectrum, save_traces, spectrum
+from scope.capture_file import SUPPORTED_DTYPES
+
+# Command-line names of the trigger types
+TRIGGERS = {"rising": "Rising Edge", "falling": "Falling Edge", "level": "Level"}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m scope",
+        description="Capture from a serial port or a capture file without the GUI.",
+    )
+    parser.add_argument("source", help="serial port (e.g. COM3, /dev/ttyACM0) or a .txt/.scp capture file")
+    parser.add_argument("-o", "--output", required=True, help="output file, .scp (binary), .csv, .txt, .npz, .wav or .h5")
+    length = parser.add_mutually_exclusive_group(required=True)
+    length.add_argument("-n", "--samples", type=int, help="number of samples to capture")
+    length.add_argument("-t", "--seconds", type=float, help="duration to capture")
+    parser.add_argument("-r", "--rate", type=float, help="device sample rate in Hz (serial ports)")
+    parser.add_argument("-b", "--baud", type=int, default=115200)
+    parser.add_argument("-c", "--channels", type=int, default=1, help="interleaved channels in the stream")
+    parser.add_argument("--binary", action="store_true", help="framed binary protocol instead of ASCII lines")
+    parser.add_argument("--trigger", choices=list(TRIGGERS), help="capture the first triggered frame")
+    parser.add_argument("--level", type=float, default=0.0, help="trigger level in volts")
+    parser.add_argument("--pre", type=float, default=0.5, help="part of the frame before the trigger")
+    parser.add_argument("--filter", help="e.g. lowpass:100, highpass:1, movavg:5, or several comma-separated")
+    parser.add_argument("--fft", metavar="CSV", help="also write the averaged amplitude spectrum to CSV")
+    parser.add_argument("--fft-size", type=int, default=4096)
+    parser.add_argument("--dtype", default="float32", choices=SUPPORTED_DTYPES, help="sample type of .scp, .npz and .h5 output")
+    parser.add_argument("--timeout", type=float, help="give up after this many seconds")
+    args = parser.parse_args(argv)
+
+    try:
+        traces = capture(args.source, samples=args.samples, seconds=args.seconds, sample_rate=args.rate,
+                         baud_rate=args.baud, channels=args.channels, binary=args.binary,
+                         trigger=TRIGGERS.get(args.trigger), level=args.level, pre_trigger=args.pre,
+                         timeout=args.timeout)
+        if args.filter:
+            traces = filter_traces(traces, args.filter)
+        save_traces(args.output, traces, dtype=args.dtype)
+        print(f"Captured {len(traces[0])} samples x {len(traces)} channel(s) at "
+              f"{traces[0].sample_rate:g} Hz to {args.output}")
+        if args.fft:
+            spectra = [spectrum(trace, args.fft_size) for trace in traces]
+            save_spectrum(args.fft, spectra[0][0], [amplitude for _, amplitude in spectra])
+            print(f"Spectrum written to {args.fft}")
+    except (OSError, ValueError, TimeoutError) as e:
+        print(f"Capture failed: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
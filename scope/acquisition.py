@@ -0,0 +1,400 @@
+"""Multi-channel acquisition from one or more serial devices."""
+import multiprocessing
+import queue
+import threading
+import time
+
+import numpy as np
+import serial
+
+from scope.capture_file import lines_have_fields
+from scope.instrumentation import StageTimer
+from scope.protocol import FrameDecoder
+from scope.sample_buffer import SampleBuffer
+from scope.sample_clock import SampleClock
+from scope.shared_ring import SharedRing, SharedRingBuffer
+from scope.simulator import is_simulated, open_simulator
+
+MAX_LINE_BYTES = 1 << 20  # Unterminated ASCII input dropped beyond this
+BACKENDS = ("Thread", "Process")
+
+
+def open_port(port, baud_rate, timeout=0.1, sample_rate=10000.0, channels=1, binary=False):
+    """Open a serial port; a short timeout keeps readers responsive to stop requests.
+
+    ``sim://`` ports open a simulated board streaming at ``sample_rate`` in the
+    given format, see :mod:`scope.simulator`.
+    """
+    if is_simulated(port):
+        try:
+            return open_simulator(port, sample_rate, channels, binary, timeout)
+        except (TypeError, ValueError) as e:  # TypeError for unknown query parameters
+            raise serial.SerialException(f"invalid simulator port {port}: {e}")
+    return serial.Serial(port, baud_rate, timeout=timeout)
+
+
+def parse_lines(block, channels=1):
+    """Parse complete ASCII lines of ``channels`` comma or space separated values.
+
+    Returns ``(rows, rejected)``: an array shaped ``(lines, channels)`` and the
+    number of malformed lines that were skipped.
+    """
+    block = block.replace(b",", b" ")
+    tokens = block.split()
+    if lines_have_fields(block, channels):
+        # Fast path: every line is well formed, convert them all at once
+        try:
+            return np.array(tokens).astype(np.float64).reshape(-1, channels), 0
+        except ValueError:
+            pass
+    rows = []
+    rejected = 0
+    for line in block.splitlines():
+        fields = line.split()
+        if not fields:
+            continue
+        try:
+            if len(fields) != channels:
+                raise ValueError
+            rows.append([float(field) for field in fields])
+        except ValueError:
+            rejected += 1
+    return np.array(rows, dtype=np.float64).reshape(-1, channels), rejected
+
+
+class Channel:
+    """One acquired signal: its sample buffer and the lock guarding it."""
+
+    def __init__(self, name, buffer, clock=None):
+        self.name = name
+        self.buffer = buffer
+        self.clock = clock  # Shared by the channels of one device
+        self.lock = threading.Lock()
+
+
+class SerialReader:
+    """Reads one serial device into the buffers of its channels.
+
+    A device may carry several interleaved channels: ASCII lines hold one
+    value per channel and binary frames hold interleaved samples.  Every
+    channel has its own preallocated buffer and lock, so the readers of
+    different devices and the renderer never wait on a shared lock.
+    """
+
+    def __init__(self, port, baud_rate, sample_rate, capacity, channels=1, binary=False):
+        self.port = port
+        self.baud_rate = baud_rate
+        self.sample_rate = float(sample_rate)
+        self.channel_count = channels
+        self.decoder = FrameDecoder() if binary else None
+        samples_per_frame = 1
+        if binary:
+            if self.decoder.samples_per_frame % channels:
+                raise ValueError("samples per frame must be a multiple of the channel count")
+            samples_per_frame = self.decoder.samples_per_frame // channels
+        self.clock = SampleClock(sample_rate, samples_per_frame=samples_per_frame)
+        self.channels = self._make_channels(capacity)
+        self.recorder = None  # Receives every placed block while recording
+        self.ser = None
+        self.error = None
+        self.invalid_lines = 0
+        self.timer = StageTimer()  # Decoding and buffer lock hold times
+        self.backlog = 0  # Bytes waiting in the driver at the last read
+        self._epoch = None
+        self._aligned = False
+        self._running = False
+        self._thread = None
+
+    @property
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _make_channels(self, capacity):
+        return [Channel(f"{self.port} CH{i + 1}", SampleBuffer(capacity, dt=self.clock.dt, lod=True), self.clock)
+                for i in range(self.channel_count)]
+
+    def statistics(self):
+        """Clock drift, sample gaps, decoder counters and reader timings."""
+        stats = {
+            "drift_ppm": self.clock.drift_ppm,
+            "gaps": len(self.clock.gaps),
+            "samples_missing": self.clock.samples_missing,
+            "invalid_lines": self.invalid_lines,
+            "parse_ms": self.timer.mean("parse") * 1e3,  # Per block read
+            "lock_ms": self.timer.mean("lock") * 1e3,  # Per channel and block
+            "backlog_bytes": self.backlog,
+        }
+        if self.decoder is not None:
+            stats.update(frames_ok=self.decoder.frames_ok, frames_corrupt=self.decoder.frames_corrupt,
+                         frames_dropped=self.decoder.frames_dropped)
+        return stats
+
+    def refresh(self):
+        """Nothing to do: samples are stored directly in the channel buffers."""
+
+    def close(self):
+        self.stop()
+
+    def start(self, epoch):
+        """Open the port and start reading; ``epoch`` is the host time shown as t = 0."""
+        self.ser = open_port(self.port, self.baud_rate, sample_rate=self.sample_rate, channels=self.channel_count,
+                             binary=self.decoder is not None)
+        self._epoch = epoch
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name=f"SerialReader {self.port}", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=1.0):
+        """Stop reading and close the port."""
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        if self.ser and self.ser.isOpen():
+            self.ser.close()
+
+    def _run(self):
+        pending = bytearray()  # ASCII input after the last complete line
+        try:
+            while self._running:
+                if self.decoder is not None:
+                    # Read everything already received, at least one frame
+                    self.backlog = self.ser.in_waiting
+                    chunk = self.ser.read(max(self.backlog, self.decoder.frame_size))
+                    with self.timer.stage("parse"):
+                        seqs, voltages = self.decoder.feed(chunk)
+                    if len(voltages):
+                        # Position frames by sequence number; lost frames become NaN gaps
+                        self._deliver(*self.clock.place_frames(seqs, voltages.reshape(-1, self.channel_count)))
+                else:
+                    self.backlog = self.ser.in_waiting
+                    pending += self.ser.read(max(self.backlog, 1))
+                    end = pending.rfind(b"\n") + 1
+                    if end:
+                        with self.timer.stage("parse"):
+                            rows, rejected = parse_lines(bytes(pending[:end]), self.channel_count)
+                        del pending[:end]
+                        self.invalid_lines += rejected
+                        if len(rows):
+                            # The sample time comes from the sample rate, not from when the line arrived
+                            self._deliver(*self.clock.place_samples(rows))
+                    elif len(pending) > MAX_LINE_BYTES:
+                        self.invalid_lines += 1
+                        del pending[:]
+        except serial.SerialException as e:
+            self.error = e
+            print(f"Serial port error on {self.port}: {e}")
+        except Exception as e:
+            # Report decoding failures instead of silently stopping the reader
+            self.error = e
+            print(f"Acquisition error on {self.port}: {e!r}")
+        finally:
+            self._running = False
+
+    def _deliver(self, first_index, rows):
+        """Store a block of rows, one column per channel, and pass it to the recorder."""
+        self.clock.observe(time.monotonic())
+        self._store(rows)
+        recorder = self.recorder
+        if recorder is not None:
+            recorder.submit(first_index, rows if self.channel_count > 1 else rows[:, 0])
+
+    def _store(self, rows):
+        align = not self._aligned
+        self._aligned = True
+        for i, channel in enumerate(self.channels):
+            with channel.lock, self.timer.stage("lock"):  # Held only for the copy into this channel's ring
+                if align:
+                    # Put sample 0 at its host arrival time so all devices share one timebase
+                    channel.buffer.t0 = self.clock.host_t0 - self._epoch
+                channel.buffer.extend(rows[:, i])
+
+
+class _RingWriter(SerialReader):
+    """Serial reader of the acquisition process, storing into a shared ring."""
+
+    def __init__(self, ring, port, baud_rate, sample_rate, channels, binary):
+        self.ring = ring
+        super().__init__(port, baud_rate, sample_rate, ring.capacity, channels, binary)
+
+    def _make_channels(self, capacity):
+        return []  # The GUI process reads the ring instead
+
+    def _store(self, rows):
+        self.ring.write(rows)
+        self.ring.set_stats(t0=self.clock.host_t0 - self._epoch, **self.statistics())
+
+
+def _acquire(ring_name, port, baud_rate, sample_rate, channels, binary, epoch, stop, messages):
+    """Entry point of the acquisition process."""
+    try:
+        ring = SharedRing(name=ring_name)
+        reader = _RingWriter(ring, port, baud_rate, sample_rate, channels, binary)
+        reader.start(epoch)
+    except (serial.SerialException, OSError) as e:
+        messages.put(str(e))
+        return
+    except Exception as e:
+        # Anything else must reach the parent too, which otherwise waits for its timeout
+        messages.put(repr(e))
+        return
+    messages.put(None)  # Port opened
+    while reader.is_running and not stop.wait(0.1):
+        pass
+    reader.stop()
+    error = reader.error
+    if error is not None:
+        messages.put(str(error) if isinstance(error, (serial.SerialException, OSError)) else repr(error))
+
+
+class ProcessReader:
+    """Reads one serial device in a separate process through shared memory.
+
+    Decoding runs in a ``multiprocessing`` worker that writes the samples
+    into a :class:`~scope.shared_ring.SharedRing`, so neither the GIL nor a
+    busy GUI can slow acquisition down.  This process only maps the ring:
+    :meth:`refresh` copies the samples written since the last call once, to
+    update the channels' level-of-detail index and feed the recorder.  It
+    has the interface of :class:`SerialReader`.
+    """
+
+    def __init__(self, port, baud_rate, sample_rate, capacity, channels=1, binary=False):
+        if binary and FrameDecoder().samples_per_frame % channels:
+            raise ValueError("samples per frame must be a multiple of the channel count")
+        self.port = port
+        self.baud_rate = baud_rate
+        self.sample_rate = float(sample_rate)
+        self.channel_count = channels
+        self.binary = binary
+        self.ring = SharedRing(capacity, channels)
+        self.channels = [Channel(f"{port} CH{i + 1}", SharedRingBuffer(self.ring, i, dt=1.0 / self.sample_rate))
+                         for i in range(channels)]
+        self.recorder = None  # Receives every refreshed block while recording
+        self.error = None
+        self._context = multiprocessing.get_context("spawn")  # Never fork a process running Qt
+        self._stop = self._context.Event()
+        self._messages = self._context.Queue()
+        self._process = None
+        self._read = 0  # Samples per channel taken from the ring so far
+        self.timer = StageTimer()  # Channel lock hold times while taking in samples
+
+    @property
+    def is_running(self):
+        return self._process is not None and self._process.is_alive()
+
+    def statistics(self):
+        stats = self.ring.stats()
+        stats.pop("t0")
+        stats["lock_ms"] = self.timer.mean("lock") * 1e3  # The channel locks are in this process
+        if not self.binary:
+            for key in ("frames_ok", "frames_corrupt", "frames_dropped"):
+                stats.pop(key)
+        return {key: value if key.endswith(("_ppm", "_ms")) else int(value) for key, value in stats.items()}
+
+    def start(self, epoch, timeout=10.0):
+        """Start the acquisition process and wait until it has opened the port."""
+        self._process = self._context.Process(
+            target=_acquire, name=f"Acquisition {self.port}", daemon=True,
+            args=(self.ring.name, self.port, self.baud_rate, self.sample_rate, self.channel_count, self.binary,
+                  epoch, self._stop, self._messages))
+        self._process.start()
+        try:
+            message = self._messages.get(timeout=timeout)
+        except queue.Empty:
+            message = "acquisition process did not start"
+        if message is not None:
+            self.stop()
+            raise serial.SerialException(message)
+
+    def stop(self, timeout=2.0):
+        """Stop the acquisition process; the samples stay readable until :meth:`close`."""
+        self._stop.set()
+        if self._process is not None:
+            self._process.join(timeout)
+            if self._process.is_alive():
+                self._process.terminate()
+            if self._process.exitcode and self.error is None:
+                self.error = f"acquisition process exited with code {self._process.exitcode}"
+            self._process = None
+        self.refresh()
+
+    def refresh(self):
+        """Take in the samples the acquisition process wrote since the last call."""
+        try:
+            message = self._messages.get_nowait()
+            if message is not None:
+                self.error = message  # Already reported by the acquisition process
+        except queue.Empty:
+            pass
+        total = self.ring.total
+        if total == self._read:
+            return
+        first, rows = self.ring.read(self._read, total)
+        t0 = self.ring.stats()["t0"]
+        for i, channel in enumerate(self.channels):
+            with channel.lock, self.timer.stage("lock"):
+                channel.buffer.t0 = t0
+                channel.buffer.ingest(first, rows[:, i])
+        self._read = first + len(rows)
+        recorder = self.recorder
+        if recorder is not None:
+            recorder.submit(first, rows if self.channel_count > 1 else rows[:, 0])
+
+    def close(self):
+        """Stop acquiring and free the shared memory."""
+        self.stop()
+        self.ring.close()
+
+
+class AcquisitionManager:
+    """Runs one reader per serial device and exposes all their channels.
+
+    With the ``"Thread"`` backend every device is read by a thread of this
+    process; with ``"Process"`` by its own process through shared memory.
+    """
+
+    def __init__(self, backend="Thread"):
+        if backend not in BACKENDS:
+            raise ValueError(f"unknown acquisition backend {backend!r}")
+        self.backend = backend
+        self.readers = []
+        self.epoch = None
+
+    @property
+    def channels(self):
+        return [channel for reader in self.readers for channel in reader.channels]
+
+    @property
+    def is_running(self):
+        return any(reader.is_running for reader in self.readers)
+
+    def add_serial(self, port, baud_rate, sample_rate, capacity, channels=1, binary=False):
+        """Add a device carrying ``channels`` interleaved channels."""
+        reader_class = ProcessReader if self.backend == "Process" else SerialReader
+        reader = reader_class(port, baud_rate, sample_rate, capacity, channels, binary)
+        self.readers.append(reader)
+        return reader
+
+    def start(self):
+        """Open every port and start reading; nothing is left open if one fails."""
+        self.epoch = time.monotonic()
+        try:
+            for reader in self.readers:
+                reader.start(self.epoch)
+        except (serial.SerialException, OSError):
+            self.stop()
+            raise
+
+    def stop(self):
+        for reader in self.readers:
+            reader.stop()
+
+    def refresh(self):
+        """Bring the channels up to date; call from the GUI thread before drawing."""
+        for reader in self.readers:
+            reader.refresh()
+
+    def close(self):
+        """Stop acquiring and release the channel memory."""
+        for reader in self.readers:
+            reader.close()
@@ -0,0 +1,234 @@
+"""Benchmarks of the acquisition, display and signal processing paths.
+
+``python -m scope.bench`` measures, without hardware or a display:
+
+* parse: ASCII line parsing and binary frame decoding throughput;
+* stream: end-to-end reading from a simulated board as fast as it goes,
+  with the reader's parse and lock hold times and any lost samples;
+* render: min/max decimation and curve drawing time versus point count;
+* fft, filter: spectrum and Butterworth filter latency versus block size.
+
+Samples come from a synthetic signal or from a capture file (``--input``).
+``--json`` writes the results so runs can be compared over time.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from scope.acquisition import SerialReader, parse_lines
+from scope.capture import load_traces
+from scope.decimation import Decimator
+from scope.instrumentation import StageTimer
+from scope.protocol import DEFAULT_GAIN, FrameDecoder, encode_frames
+from scope.sample_buffer import SampleBuffer
+from scope.simulator import SignalGenerator
+
+BENCHMARKS = ("parse", "stream", "render", "fft", "filter")
+SAMPLE_RATE = 1e6  # Nominal rate of the synthetic signal
+
+
+def measure(function, min_time=0.2, min_runs=3, max_runs=1000):
+    """Run ``function`` repeatedly; returns ``{"mean", "max", "cpu", "runs"}`` in seconds."""
+    timer = StageTimer(history=max_runs)
+    start = time.perf_counter()
+    runs = 0
+    while runs < min_runs or (runs < max_runs and time.perf_counter() - start < min_time):
+        with timer.stage("run"):
+            function()
+        runs += 1
+    return timer.summary()["run"]
+
+
+def signal(n, path=None):
+    """``n`` samples of the capture at ``path``, repeated as needed, or of a noisy sine."""
+    if path is None:
+        return SignalGenerator("sine", SAMPLE_RATE, frequency=1000.0, noise=0.01, seed=0).generate(n)[:, 0]
+    values = np.nan_to_num(np.asarray(load_traces(path)[0].values, dtype=np.float64))
+    return np.resize(values, n)
+
+
+def bench_parse(values, block_lines=8192):
+    """Samples per second through :func:`parse_lines` and :class:`FrameDecoder`."""
+    lines = [(("%.4f\n" * block_lines) % tuple(values[i:i + block_lines])).encode()
+             for i in range(0, len(values) - block_lines + 1, block_lines)]
+    codes = np.clip(np.round(values / DEFAULT_GAIN), 0, 4095).astype(np.uint16)
+    decoder = FrameDecoder()
+    frames = codes[:len(codes) // decoder.samples_per_frame * decoder.samples_per_frame]
+    stream = encode_frames(0, frames.reshape(-1, decoder.samples_per_frame))
+
+    def ascii():
+        for block in lines:
+            parse_lines(block)
+
+    def binary(chunk=1 << 16):
+        decoder.reset()
+        for i in range(0, len(stream), chunk):
+            decoder.feed(stream[i:i + chunk])
+
+    results = []
+    for name, function, samples in (("ascii", ascii, len(lines) * block_lines), ("binary", binary, len(frames))):
+        timing = measure(function)
+        results.append({"format": name, "samples": samples, "ms": timing["mean"] * 1e3,
+                        "samples_per_s": samples / timing["mean"]})
+    return results
+
+
+def bench_stream(seconds=2.0, channels=1, errors=0.0):
+    """End-to-end throughput of a :class:`SerialReader` on an unthrottled simulated board.
+
+    The simulator produces the data on the reader's thread, so the rate
+    includes generating it and is a lower bound for a real device.
+    """
+    results = []
+    for binary in (False, True):
+        port = f"sim://sine?realtime=0&frequency=1000&errors={errors}"
+        reader = SerialReader(port, 0, SAMPLE_RATE, 1 << 22, channels, binary)
+        start = time.perf_counter()
+        reader.start(time.monotonic())
+        time.sleep(seconds)
+        reader.stop()
+        elapsed = time.perf_counter() - start
+        stats = reader.statistics()
+        timings = reader.timer.summary()
+        results.append({
+            "format": "binary" if binary else "ascii",
+            "samples_per_s": reader.channels[0].buffer.total / elapsed,
+            "samples_missing": stats["samples_missing"] + stats["invalid_lines"],
+            "parse_ms": timings["parse"]["mean"] * 1e3 if "parse" in timings else np.nan,
+            "lock_ms": timings["lock"]["mean"] * 1e3 if "lock" in timings else np.nan,
+            "lock_max_ms": timings["lock"]["max"] * 1e3 if "lock" in timings else np.nan,
+        })
+    return results
+
+
+def _plot_widget(width):
+    """Return ``(app, widget, curve)`` for an offscreen plot, all None without PyQt5."""
+    if sys.platform.startswith("linux") and "DISPLAY" not in os.environ:
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    try:
+        import pyqtgraph as pg
+        from PyQt5.QtWidgets import QApplication
+    except ImportError:
+        return None, None, None
+    app = QApplication.instance() or QApplication([])
+    widget = pg.PlotWidget()
+    widget.resize(width, 600)
+    widget.show()
+    app.processEvents()
+    return app, widget, widget.plot(pen='y', connect='finite')
+
+
+def bench_render(values, sizes, width=1000):
+    """Decimation and drawing time of a buffer of each size, on a ``width`` pixel plot.
+
+    ``draw_raw_ms`` draws every sample without decimation (up to 1M points).
+    """
+    app, widget, curve = _plot_widget(width)  # The application must outlive the widget
+    results = []
+    for n in sizes:
+        buffer = SampleBuffer(n, dt=1.0 / SAMPLE_RATE, lod=True)
+        buffer.extend(values[:n])
+        decimator = Decimator()
+        trace = buffer.trace()
+
+        def decimate():
+            decimator.invalidate()
+            return decimator.update(trace, -np.inf, np.inf, width, buffer.total, buffer.first_index, buffer.lod)
+
+        row = {"points": n, "decimate_ms": measure(decimate)["mean"] * 1e3}
+        if widget is not None:
+            x, y, _ = decimate()
+
+            def draw(x=x, y=y):
+                curve.setData(x, y)
+                widget.grab()  # Paints the scene
+
+            row["draw_ms"] = measure(draw)["mean"] * 1e3
+            if n <= 1_000_000:
+                row["draw_raw_ms"] = measure(lambda: draw(trace.times, np.asarray(trace.values)))["mean"] * 1e3
+        results.append(row)
+    return results
+
+
+def bench_fft(values, sizes):
+    """Time to transform and average one frame of each size."""
+    from scope.spectrum import SpectrumAnalyzer  # Imports SciPy
+
+    results = []
+    for n in sizes:
+        analyzer = SpectrumAnalyzer(n)
+        block = values[:n]
+        timing = measure(lambda: analyzer.update(block, 1, 1.0 / SAMPLE_RATE))
+        results.append({"points": n, "ms": timing["mean"] * 1e3, "ns_per_sample": timing["mean"] / n * 1e9})
+    return results
+
+
+def bench_filter(values, sizes):
+    """Time to run a block of each size through a 5th order low-pass filter."""
+    from scope.capture import make_filter  # Imports SciPy
+
+    results = []
+    for n in sizes:
+        chain = make_filter(f"lowpass:{SAMPLE_RATE / 100:g}", SAMPLE_RATE)
+        block = values[:n]
+        timing = measure(lambda: chain.process(block))
+        results.append({"points": n, "ms": timing["mean"] * 1e3, "ns_per_sample": timing["mean"] / n * 1e9})
+    return results
+
+
+def print_table(title, rows):
+    print(f"\n{title}")
+    columns = list(dict.fromkeys(key for row in rows for key in row))
+    print("  ".join(f"{column:>14}" for column in columns))
+    for row in rows:
+        cells = []
+        for column in columns:
+            value = row.get(column, "")
+            cells.append(f"{value:>14.4g}" if isinstance(value, float) else f"{value:>14}")
+        print("  ".join(cells))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m scope.bench", description=__doc__.splitlines()[0])
+    parser.add_argument("benchmarks", nargs="*", help=f"any of {', '.join(BENCHMARKS)}; all by default")
+    parser.add_argument("--input", help="take samples from a .txt or .scp capture instead of a synthetic signal")
+    parser.add_argument("--quick", action="store_true", help="smaller sizes and a shorter stream test")
+    parser.add_argument("--channels", type=int, default=1, help="channels in the simulated stream")
+    parser.add_argument("--errors", type=float, default=0.0, help="corrupted line/frame probability in the stream")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args(argv)
+    unknown = set(args.benchmarks) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmark {', '.join(sorted(unknown))}")
+
+    selected = args.benchmarks or BENCHMARKS
+    largest = 10 ** 6 if args.quick else 10 ** 7
+    sizes = [10 ** k for k in range(3, 8) if 10 ** k <= largest]
+    frame_sizes = [1 << k for k in range(10, 17 if args.quick else 21, 2)]
+    values = signal(max(largest, frame_sizes[-1]), args.input)
+
+    results = {}
+    runs = {
+        "parse": ("Parse throughput", lambda: bench_parse(values[:1 << 20])),
+        "stream": ("Simulated stream", lambda: bench_stream(0.5 if args.quick else 2.0, args.channels, args.errors)),
+        "render": ("Render time", lambda: bench_render(values, sizes)),
+        "fft": ("FFT latency", lambda: bench_fft(values, frame_sizes)),
+        "filter": ("Filter latency", lambda: bench_filter(values, sizes)),
+    }
+    for name in selected:
+        title, run = runs[name]
+        results[name] = run()
+        print_table(title, results[name])
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(results, file, indent=2, default=float)
+        print(f"\nResults written to {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,164 @@
+"""Headless capture: acquire, trigger, filter, analyse and save without the GUI.
+
+Only NumPy and pyserial are needed to capture; SciPy is imported when a
+filter or a spectrum is asked for.  Nothing here imports Qt, so scripts and
+the ``python -m scope`` command line start quickly on machines without a
+display.
+"""
+import os
+import time
+from contextlib import ExitStack
+
+import numpy as np
+
+from scope.acquisition import AcquisitionManager
+from scope.capture_file import load_text_traces, open_capture
+from scope.export import export_traces
+from scope.sample_buffer import TraceBuffer
+from scope.trace import Trace
+from scope.trigger import TriggerEngine
+
+CAPTURE_EXTENSIONS = (".txt", ".scp")
+POLL_INTERVAL = 0.01  # Seconds between checks of the acquisition buffer
+
+
+def load_traces(path):
+    """Load a ``.txt`` or ``.scp`` capture as a list of traces, one per channel."""
+    if path.endswith(".scp"):
+        capture = open_capture(path)  # Memory-mapped, not loaded
+        return [capture.trace(channel) for channel in range(capture.channels)]
+    return load_text_traces(path)
+
+
+def save_traces(path, traces, dtype="float32"):
+    """Write traces of equal length in the format given by the extension of ``path``.
+
+    Any of the :data:`~scope.export.EXPORT_FORMATS`; CSV has the time then
+    one column per channel.
+    """
+    export_traces(path, traces, dtype=dtype)
+
+
+def _trigger_engine(trigger, level, pre_trigger, samples, sample_rate):
+    if trigger is None:
+        return None
+    pre = int(samples * pre_trigger)
+    return TriggerEngine(trigger, mode="Single", level=level, hysteresis=0.05, pre_samples=pre,
+                         post_samples=samples - pre, auto_timeout=None)
+
+
+def _frame_traces(buffers, index, pre, post, dt):
+    """Cut the same frame out of every buffer, with times relative to the trigger."""
+    return [Trace(-pre * dt, dt, np.array(buffer.read(index - pre, index + post).values)) for buffer in buffers]
+
+
+def capture(source, samples=None, seconds=None, sample_rate=None, baud_rate=115200, channels=1, binary=False,
+            trigger=None, level=0.0, pre_trigger=0.5, timeout=None):
+    """Capture from a serial port or a capture file; returns one :class:`Trace` per channel.
+
+    The length is given in ``samples`` or ``seconds``.  ``sample_rate`` is
+    required for serial ports and read from the file otherwise.  With
+    ``trigger`` (one of ``TRIGGER_TYPES``) the result is the first frame
+    triggered on channel 0 at ``level`` volts, ``pre_trigger`` of it before
+    the trigger point and times relative to it; otherwise it is the first
+    ``samples`` samples.  Raises ``TimeoutError`` if a serial capture is not
+    complete after ``timeout`` seconds.
+    """
+    is_file = source.endswith(CAPTURE_EXTENSIONS) and os.path.exists(source)
+    if is_file:
+        traces = load_traces(source)
+        sample_rate = traces[0].sample_rate
+    elif sample_rate is None:
+        raise ValueError("sample_rate is required to capture from a serial port")
+    if samples is None:
+        if seconds is None:
+            raise ValueError("give the capture length in samples or seconds")
+        samples = int(round(seconds * sample_rate))
+    samples = int(samples)
+    if samples < 1:
+        raise ValueError("the capture must contain at least one sample")
+    engine = _trigger_engine(trigger, level, pre_trigger, samples, sample_rate)
+
+    if is_file:
+        if engine is None:
+            return [Trace(t.t0, t.dt, t.values[:samples]) for t in traces]
+        buffers = [TraceBuffer(t, lod=False) for t in traces]
+        frames = engine.process(buffers[0])
+        if not frames:
+            raise ValueError(f"no trigger found in {source}")
+        return _frame_traces(buffers, frames[0].index, engine.pre_samples, engine.post_samples, traces[0].dt)
+
+    # Keep some slack so the reader can run ahead of the polling below
+    capacity = samples + (1 << 16) if engine is None else max(4 * samples, 1 << 20)
+    manager = AcquisitionManager()
+    reader = manager.add_serial(source, baud_rate, sample_rate, capacity, channels, binary)
+    deadline = None if timeout is None else time.monotonic() + timeout
+    manager.start()
+    try:
+        primary = reader.channels[0]
+        buffers = [channel.buffer for channel in reader.channels]
+        while True:
+            time.sleep(POLL_INTERVAL)
+            if reader.error is not None:
+                raise reader.error
+            # Cut the result out under the locks: a fast source overwrites the rings before stop() returns
+            with ExitStack() as locks:
+                for channel in reader.channels:
+                    locks.enter_context(channel.lock)
+                if engine is None:
+                    if primary.buffer.total - primary.buffer.first_index >= samples:
+                        start = primary.buffer.first_index
+                        return [buffer.read(start, start + samples).copy() for buffer in buffers]
+                else:
+                    frames = engine.process(primary.buffer)
+                    if frames:
+                        return _frame_traces(buffers, frames[0].index, engine.pre_samples, engine.post_samples,
+                                             primary.buffer.dt)
+            if deadline is not None and time.monotonic() > deadline:
+                raise TimeoutError(f"capture from {source} not complete after {timeout} s")
+    finally:
+        manager.stop()
+
+
+def make_filter(spec, sample_rate):
+    """Build a filter chain from ``"lowpass:HZ"``, ``"highpass:HZ"`` or ``"movavg:N"``.
+
+    Several stages are separated by commas, e.g. ``"highpass:1,lowpass:100"``.
+    """
+    from scope.filters import ButterworthStage, FilterChain, MovingAverageStage  # Imports SciPy
+
+    stages = []
+    for part in spec.split(","):
+        kind, _, value = part.strip().partition(":")
+        if kind in ("lowpass", "highpass"):
+            stages.append(ButterworthStage(kind[:-4], 5, float(value), sample_rate))
+        elif kind == "movavg":
+            stages.append(MovingAverageStage(int(value)))
+        else:
+            raise ValueError(f"unknown filter {part!r}, use lowpass:HZ, highpass:HZ or movavg:N")
+    return FilterChain(stages)
+
+
+def filter_traces(traces, spec):
+    """Return the traces filtered by the chain described by ``spec``."""
+    return [Trace(t.t0, t.dt, make_filter(spec, t.sample_rate).process(t.values)) for t in traces]
+
+
+def spectrum(trace, frame_size=4096, window_name="Hann", averaging="Exponential"):
+    """Averaged amplitude spectrum of a whole trace; returns ``(freqs, amplitude)``."""
+    from scope.spectrum import SpectrumAnalyzer  # Imports SciPy
+
+    frame_size = min(int(frame_size), len(trace))
+    result = SpectrumAnalyzer(frame_size, window_name=window_name, averaging=averaging,
+                              max_frames=64).analyze(trace.values, trace.dt)
+    if result is None:
+        raise ValueError("the trace is too short for a spectrum")
+    freqs, amplitude = result
+    return freqs, amplitude.copy()
+
+
+def save_spectrum(path, freqs, amplitudes):
+    """Write spectra as CSV: frequency then one amplitude column per channel."""
+    header = ",".join(["frequency"] + [f"ch{i + 1}" for i in range(len(amplitudes))])
+    np.savetxt(path, np.column_stack([freqs] + list(amplitudes)), fmt="%.9g", delimiter=",", header=header,
+               comments="")
@@ -0,0 +1,356 @@
+"""Capture file formats: columnar text and the native binary ``.scp`` format.
+
+A ``.scp`` file is::
+
+    magic       8 bytes   b"EPTSCOPE"
+    version     uint16    FORMAT_VERSION
+    reserved    uint16
+    header_len  uint32    length of the JSON header that follows
+    header      JSON      sample_rate, t0, units, channels, dtype, gain, offset
+    data        raw       little-endian samples, channels interleaved
+
+The data starts on a 64-byte boundary and its length is implied by the file
+size, so a writer can keep appending without rewriting the header and a
+reader can map the samples with ``np.memmap`` instead of loading them.
+Stored codes are converted to physical units as ``code * gain + offset``.
+
+With ``"compression": "zlib"`` in the header the data is instead a sequence
+of blocks, each a ``uint32`` compressed length, a ``uint32`` row count and
+the zlib-compressed rows.  Compressed captures are decompressed on open.
+"""
+import json
+import os
+import struct
+import zlib
+
+import numpy as np
+
+from scope.trace import Trace
+
+MAGIC = b"EPTSCOPE"
+FORMAT_VERSION = 1
+PREAMBLE = struct.Struct("<8sHHI")
+DATA_ALIGNMENT = 64
+SUPPORTED_DTYPES = ("float32", "float64", "int16", "uint16")
+COMPRESSED_BLOCK = struct.Struct("<II")
+
+TEXT_CHUNK_BYTES = 1 << 22
+_WHITESPACE = np.zeros(256, dtype=bool)
+_WHITESPACE[list(b" \t\n\r\x0b\x0c")] = True  # What bytes.split() splits on
+
+
+def text_columns(path):
+    """Return the number of columns of a text capture, from its first line of numbers.
+
+    Header or comment lines before the data are skipped, as the loader does.
+    """
+    with open(path, "rb") as file:
+        for line in file:
+            fields = line.split()
+            try:
+                [float(field) for field in fields]
+            except ValueError:
+                continue
+            if fields:
+                return max(len(fields), 2)
+    return 2
+
+
+def iter_text_chunks(path, chunk_bytes=TEXT_CHUNK_BYTES, columns=2):
+    """Yield ``(timestamps, values)`` arrays from a text capture of ``columns`` columns.
+
+    For a two-column file ``values`` is one-dimensional.  With more columns
+    it is shaped ``(samples, columns - 1)``, one column per channel.  The
+    file is read in blocks of about ``chunk_bytes`` and each block is
+    converted with a single NumPy call, so memory stays bounded whatever the
+    file size.  Lines that do not have exactly ``columns`` numeric columns,
+    such as a header, are skipped, as the original loader did.
+    """
+    with open(path, "rb") as file:
+        remainder = b""
+        while True:
+            block = file.read(chunk_bytes)
+            if not block:
+                break
+            block = remainder + block
+            cut = block.rfind(b"\n") + 1
+            if cut == 0:
+                remainder = block
+                continue
+            remainder = block[cut:]
+            yield _parse_text_block(block[:cut], columns)
+        if remainder.strip():
+            yield _parse_text_block(remainder, columns)
+
+
+def lines_have_fields(block, fields):
+    """Return True if every non-blank line of ``block`` has exactly ``fields`` whitespace separated fields.
+
+    Counted with NumPy over the raw bytes, so a well-formed block can be
+    converted in one call without malformed lines pairing up by accident.
+    """
+    data = np.frombuffer(block, dtype=np.uint8)
+    if len(data) == 0:
+        return True
+    space = _WHITESPACE[data]
+    starts = np.flatnonzero(space[:-1] > space[1:]) + 1  # Fields start after whitespace
+    if not space[0]:
+        starts = np.concatenate(([0], starts))
+    line = np.searchsorted(np.flatnonzero(data == ord("\n")), starts)  # Line number of every field
+    counts = np.bincount(line)
+    return bool(np.all((counts == 0) | (counts == fields)))
+
+
+def _parse_text_block(block, columns=2):
+    table = None
+    if lines_have_fields(block, columns):
+        try:
+            table = np.array(block.split()).astype(np.float64).reshape(-1, columns)
+        except ValueError:
+            pass
+    if table is None:
+        # Slow path for blocks with short, long or non-numeric lines
+        rows = []
+        for line in block.splitlines():
+            parts = line.split()
+            if len(parts) == columns:
+                try:
+                    rows.append([float(part) for part in parts])
+                except ValueError:
+                    continue
+        table = np.array(rows, dtype=np.float64).reshape(-1, columns)
+    return table[:, 0], table[:, 1] if columns == 2 else table[:, 1:]
+
+
+def load_text_traces(path, chunk_bytes=TEXT_CHUNK_BYTES):
+    """Load a ``timestamp value [value ...]`` text capture as one :class:`Trace` per value column."""
+    columns = text_columns(path)
+    chunks = list(iter_text_chunks(path, chunk_bytes, columns))
+    if not chunks:
+        return [Trace(0.0, 1.0, np.empty(0)) for _ in range(columns - 1)]
+    timestamps = np.concatenate([c[0] for c in chunks])
+    values = np.concatenate([c[1] for c in chunks]).reshape(len(timestamps), columns - 1)
+    return [Trace.from_timestamps(timestamps, values[:, i]) for i in range(columns - 1)]
+
+
+def load_text(path, chunk_bytes=TEXT_CHUNK_BYTES):
+    """Load a text capture as a :class:`Trace`, the first channel if it has several."""
+    return load_text_traces(path, chunk_bytes)[0]
+
+
+class ScaledArray:
+    """Read-only array-like applying ``code * gain + offset`` on access.
+
+    Slicing only converts the requested part, so integer captures stay
+    memory-mapped until the samples are actually needed.
+    """
+
+    def __init__(self, codes, gain, offset):
+        self.codes = codes
+        self.gain = gain
+        self.offset = offset
+
+    def __len__(self):
+        return len(self.codes)
+
+    @property
+    def shape(self):
+        return self.codes.shape
+
+    @property
+    def dtype(self):
+        return np.dtype(np.float64)
+
+    def __getitem__(self, index):
+        return self.codes[index] * self.gain + self.offset
+
+    def __array__(self, dtype=None, copy=None):
+        values = self[:]
+        return values if dtype is None else values.astype(dtype)
+
+
+class Capture:
+    """A ``.scp`` file opened with its samples memory-mapped."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as file:
+            magic, version, _, header_len = PREAMBLE.unpack(file.read(PREAMBLE.size))
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not an EPT'Scope capture file")
+            if version > FORMAT_VERSION:
+                raise ValueError(f"Unsupported capture format version {version}")
+            self.header = json.loads(file.read(header_len).decode("utf-8"))
+        self.sample_rate = float(self.header["sample_rate"])
+        self.t0 = float(self.header.get("t0", 0.0))
+        self.units = self.header.get("units", "V")
+        self.channels = int(self.header.get("channels", 1))
+        self.gain = float(self.header.get("gain", 1.0))
+        self.offset = float(self.header.get("offset", 0.0))
+        self.dtype = np.dtype(self.header["dtype"]).newbyteorder("<")
+        self.compression = self.header.get("compression")
+        self.data_offset = _data_offset(header_len)
+        if self.compression == "zlib":
+            self.data = self._read_compressed()
+            return
+        if self.compression is not None:
+            raise ValueError(f"Unsupported compression {self.compression!r}")
+        row = self.dtype.itemsize * self.channels
+        n = max(os.path.getsize(path) - self.data_offset, 0) // row
+        if n:
+            self.data = np.memmap(path, dtype=self.dtype, mode="r", offset=self.data_offset, shape=(n, self.channels))
+        else:
+            self.data = np.empty((0, self.channels), dtype=self.dtype)
+
+    def _read_compressed(self):
+        blocks = []
+        with open(self.path, "rb") as file:
+            file.seek(self.data_offset)
+            while True:
+                prefix = file.read(COMPRESSED_BLOCK.size)
+                if len(prefix) < COMPRESSED_BLOCK.size:
+                    break
+                size, rows = COMPRESSED_BLOCK.unpack(prefix)
+                payload = file.read(size)
+                if len(payload) < size:
+                    break  # Truncated last block of an interrupted recording
+                blocks.append(np.frombuffer(zlib.decompress(payload), dtype=self.dtype).reshape(rows, self.channels))
+        if not blocks:
+            return np.empty((0, self.channels), dtype=self.dtype)
+        return np.concatenate(blocks)
+
+    def __len__(self):
+        return len(self.data)
+
+    def values(self, channel=0):
+        """Samples of ``channel`` in physical units, still backed by the file."""
+        codes = self.data[:, channel]
+        if self.gain == 1.0 and self.offset == 0.0:
+            return codes
+        return ScaledArray(codes, self.gain, self.offset)
+
+    def trace(self, channel=0):
+        return Trace(self.t0, 1.0 / self.sample_rate, self.values(channel))
+
+
+def open_capture(path):
+    """Open a ``.scp`` capture without loading its samples."""
+    return Capture(path)
+
+
+def _data_offset(header_len):
+    return -(-(PREAMBLE.size + header_len) // DATA_ALIGNMENT) * DATA_ALIGNMENT
+
+
+class CaptureWriter:
+    """Streams samples into a new ``.scp`` file."""
+
+    def __init__(self, path, sample_rate, channels=1, dtype="float32", t0=0.0, units="V", gain=1.0, offset=0.0,
+                 compress=False, **extra):
+        if dtype not in SUPPORTED_DTYPES:
+            raise ValueError(f"dtype must be one of {SUPPORTED_DTYPES}")
+        self.path = path
+        self.channels = int(channels)
+        self.dtype = np.dtype(dtype).newbyteorder("<")
+        self.compress = compress
+        header = dict(extra, sample_rate=float(sample_rate), t0=float(t0), units=units, channels=self.channels,
+                      dtype=dtype, gain=float(gain), offset=float(offset))
+        if compress:
+            header["compression"] = "zlib"
+        encoded = json.dumps(header).encode("utf-8")
+        # Pad the header with spaces so the samples start aligned
+        padded = len(encoded) + _data_offset(len(encoded)) - PREAMBLE.size - len(encoded)
+        encoded = encoded.ljust(padded)
+        self._file = open(path, "wb")
+        self._file.write(PREAMBLE.pack(MAGIC, FORMAT_VERSION, 0, len(encoded)))
+        self._file.write(encoded)
+        self.samples_written = 0
+
+    @property
+    def bytes_written(self):
+        return self._file.tell()
+
+    def write(self, values):
+        """Append samples, shaped ``(n,)`` for one channel or ``(n, channels)``.
+
+        When compressing, every call produces one compressed block, so pass
+        batches rather than single samples.
+        """
+        values = np.asarray(values)
+        if values.ndim == 1:
+            values = values.reshape(-1, self.channels)
+        if self.dtype.kind in "iu" and values.dtype.kind == "f":
+            values = np.round(values)
+        payload = np.ascontiguousarray(values, dtype=self.dtype).tobytes()
+        if self.compress:
+            payload = zlib.compress(payload, 1)  # Fast level, this runs at acquisition rate
+            self._file.write(COMPRESSED_BLOCK.pack(len(payload), len(values)))
+        self._file.write(payload)
+        self.samples_written += len(values)
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def write_capture(path, trace, dtype="float32", units="V"):
+    """Write a :class:`Trace` to a ``.scp`` file."""
+    with CaptureWriter(path, trace.sample_rate, dtype=dtype, t0=trace.t0, units=units) as writer:
+        chunk = 1 << 20
+        for start in range(0, len(trace), chunk):
+            writer.write(np.asarray(trace.values[start:start + chunk], dtype=np.float64))
+
+
+def text_to_capture(src, dst, dtype="float32"):
+    """Convert a text capture to ``.scp``, one channel per value column, with bounded memory.
+
+    The sample interval is taken from the timestamps of the first block;
+    the samples themselves are streamed through unchanged.
+    """
+    columns = text_columns(src)
+    writer = None
+    try:
+        for timestamps, values in iter_text_chunks(src, columns=columns):
+            if writer is None:
+                if len(timestamps) < 2:
+                    raise ValueError("Need at least two samples to determine the sample rate")
+                dt = float(np.median(np.diff(timestamps)))
+                writer = CaptureWriter(dst, 1.0 / dt, columns - 1, dtype=dtype, t0=timestamps[0])
+            writer.write(values)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def capture_to_text(src, dst, channel=0):
+    """Convert a ``.scp`` capture to the two-column text format."""
+    capture = open_capture(src)
+    trace = capture.trace(channel)
+    chunk = 1 << 20
+    with open(dst, "w") as file:
+        for start in range(0, len(trace), chunk):
+            values = np.asarray(trace.values[start:start + chunk], dtype=np.float64)
+            times = trace.t0 + trace.dt * np.arange(start, start + len(values))
+            np.savetxt(file, np.column_stack((times, values)), fmt="%.9g")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Convert between .txt and .scp capture files.")
+    parser.add_argument("src")
+    parser.add_argument("dst")
+    parser.add_argument("--dtype", default="float32", choices=SUPPORTED_DTYPES)
+    args = parser.parse_args()
+    if args.src.endswith(".scp"):
+        capture_to_text(args.src, args.dst)
+    else:
+        text_to_capture(args.src, args.dst, dtype=args.dtype)
@@ -0,0 +1,87 @@
+"""View-dependent min/max decimation for drawing large traces."""
+import numpy as np
+
+
+def visible_range(trace, x_min, x_max):
+    """Return the index range ``[i0, i1)`` of ``trace`` covering ``[x_min, x_max]``.
+
+    One extra sample is kept on each side so the curve reaches the edges.
+    """
+    n = len(trace)
+    i0 = int(np.floor((x_min - trace.t0) / trace.dt)) if np.isfinite(x_min) else 0
+    i1 = int(np.ceil((x_max - trace.t0) / trace.dt)) + 1 if np.isfinite(x_max) else n
+    return max(0, min(i0 - 1, n)), max(0, min(i1 + 1, n))
+
+
+def minmax_decimate(trace, i0, i1, width, first_index=0, pyramid=None):
+    """Reduce ``trace.values[i0:i1]`` to at most about two points per pixel.
+
+    Each bucket of samples is replaced by its minimum and maximum, so peaks
+    and glitches survive the reduction.  Bucket edges are aligned on absolute
+    sample indices (``first_index`` is the absolute index of ``values[0]``)
+    so the envelope does not shimmer while panning.  Returns ``(x, y,
+    decimated)``; when the range already fits in ``2 * width`` points the raw
+    samples are returned with ``decimated`` set to False.
+
+    With a :class:`~scope.lod.MinMaxPyramid` covering the trace, the bulk of
+    the envelope comes from the closest pyramid level in O(pixels) and only
+    the newest samples not yet summarised are reduced from the raw data.
+    """
+    values = trace.values[i0:i1]
+    n = len(values)
+    width = max(int(width), 1)
+    if n <= 2 * width:
+        return trace.t0 + trace.dt * np.arange(i0, i1), np.array(values), False
+
+    if pyramid is not None:
+        envelope = pyramid.envelope(first_index + i0, first_index + i1, width)
+        if envelope is not None:
+            edges, mins, maxs, end = envelope
+            x = np.repeat(trace.t0 + trace.dt * (edges - first_index), 2)
+            y = np.empty(2 * len(edges))
+            y[0::2] = mins
+            y[1::2] = maxs
+            rest = max(end - first_index, i0)
+            if rest < i1:
+                tail_x, tail_y, _ = minmax_decimate(trace, rest, i1, max(1, (i1 - rest) * width // n), first_index)
+                x = np.concatenate((x, tail_x))
+                y = np.concatenate((y, tail_y))
+            return x, y, True
+
+    bucket = n // width
+    lead = (-(first_index + i0)) % bucket
+    edges = np.arange(lead, n, bucket)
+    if lead:
+        edges = np.concatenate(([0], edges))
+    # fmin/fmax skip NaN gaps unless a whole bucket is missing
+    mins = np.fmin.reduceat(values, edges)
+    maxs = np.fmax.reduceat(values, edges)
+
+    x = np.repeat(trace.t0 + trace.dt * (i0 + edges), 2)
+    y = np.empty(2 * len(edges))
+    y[0::2] = mins
+    y[1::2] = maxs
+    return x, y, True
+
+
+class Decimator:
+    """Caches the decimated view so it is only rebuilt when something changed."""
+
+    def __init__(self):
+        self._key = None
+
+    def invalidate(self):
+        self._key = None
+
+    def update(self, trace, x_min, x_max, width, version, first_index=0, pyramid=None):
+        """Return ``(x, y, decimated)``, or None if the view and data are unchanged.
+
+        ``version`` identifies the data content, e.g. the number of samples
+        written so far.
+        """
+        i0, i1 = visible_range(trace, x_min, x_max)
+        key = (version, i0, i1, int(width))
+        if key == self._key:
+            return None
+        self._key = key
+        return minmax_decimate(trace, i0, i1, width, first_index, pyramid)
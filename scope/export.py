@@ -0,0 +1,224 @@
+"""Export of captures to text, CSV, ``.scp``, NPZ, WAV and HDF5 from a background thread."""
+import os
+import threading
+import wave
+import zipfile
+
+import numpy as np
+
+from scope.capture_file import CaptureWriter
+from scope.sample_buffer import SampleBuffer, TraceBuffer
+from scope.trace import Trace
+
+EXPORT_FORMATS = {
+    ".txt": "Text",
+    ".csv": "CSV",
+    ".scp": "Capture",
+    ".npz": "NumPy archive",
+    ".wav": "WAV audio",
+    ".h5": "HDF5",
+    ".hdf5": "HDF5",
+}
+EXPORT_EXTENSIONS = tuple(EXPORT_FORMATS)
+EXPORT_CHUNK = 1 << 18  # Samples per channel written between progress reports
+
+
+def snapshot(channels):
+    """Copy the buffered samples of every channel, holding each lock only for its copy.
+
+    Loaded recordings never change, so their traces are passed on as they
+    are and a memory-mapped file is read by the export as it goes.  Live
+    buffers are copied with ``read()``, which validates samples taken from
+    a shared ring against the acquisition process writing into it.
+    """
+    traces = []
+    for channel in channels:
+        buffer = channel.buffer
+        if isinstance(buffer, TraceBuffer):
+            traces.append(buffer.trace())
+            continue
+        with channel.lock:
+            trace = buffer.read(buffer.first_index, buffer.total)
+            if isinstance(buffer, SampleBuffer):
+                trace = trace.copy()  # A view of the ring buffer, overwritten as acquisition goes on
+        traces.append(trace)
+    return traces
+
+
+def align(traces):
+    """Cut traces to the length of the shortest, keeping the newest samples of each."""
+    n = min(len(trace) for trace in traces)
+    # Slicing would convert a whole scaled capture at once, so full-length traces are kept as they are
+    return [trace if len(trace) == n else
+            Trace(trace.t0 + (len(trace) - n) * trace.dt, trace.dt, trace.values[len(trace) - n:])
+            for trace in traces]
+
+
+def export_traces(path, traces, names=None, dtype="float32", progress=None, cancelled=None, chunk=EXPORT_CHUNK):
+    """Write traces to ``path`` in the format given by its extension; returns False if cancelled.
+
+    Traces longer than the shortest are cut to their newest samples and
+    share the time axis of the first.  ``progress(fraction)`` is called
+    after every ``chunk`` samples and ``cancelled()`` polled as often; a
+    cancelled export removes its partial file.  ``dtype`` is the sample
+    type of ``.scp``, ``.npz`` and HDF5 files.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in EXPORT_FORMATS:
+        raise ValueError(f"unsupported export format {extension or path!r}, use one of {', '.join(EXPORT_EXTENSIONS)}")
+    traces = align(traces)
+    names = list(names) if names is not None else [f"ch{i + 1}" for i in range(len(traces))]
+    writer = {".txt": _write_text, ".csv": _write_text, ".scp": _write_capture, ".npz": _write_npz,
+              ".wav": _write_wav, ".h5": _write_hdf5, ".hdf5": _write_hdf5}[extension]
+    n = len(traces[0])
+    state = {"cancelled": False}
+
+    def blocks():
+        # Reports progress after every block and stops early when cancelled
+        for start in range(0, n, chunk):
+            if cancelled is not None and cancelled():
+                state["cancelled"] = True
+                return
+            stop = min(start + chunk, n)
+            yield start, np.column_stack([np.asarray(trace.values[start:stop], dtype=np.float64)
+                                          for trace in traces])
+            if progress is not None:
+                progress(stop / n)
+
+    try:
+        writer(path, traces, names, np.dtype(dtype), blocks())
+    except BaseException:
+        _remove(path)
+        raise
+    if state["cancelled"]:
+        _remove(path)
+    return not state["cancelled"]
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _write_text(path, traces, names, dtype, blocks):
+    # .txt keeps the "time value [value ...]" lines the loader reads, .csv gets a header and commas
+    csv = path.lower().endswith(".csv")
+    separator = "," if csv else " "
+    row = separator.join(["%.9g"] * (len(traces) + 1)) + "\n"
+    first = traces[0]
+    with open(path, "w") as file:
+        if csv:
+            file.write(",".join(["time"] + names) + "\n")
+        for start, block in blocks:
+            times = first.t0 + first.dt * np.arange(start, start + len(block))
+            table = np.column_stack([times, block])
+            file.write((row * len(table)) % tuple(table.ravel()))  # One formatting call per block
+
+
+def _write_capture(path, traces, names, dtype, blocks):
+    first = traces[0]
+    with CaptureWriter(path, first.sample_rate, channels=len(traces), dtype=dtype.name, t0=first.t0,
+                       names=names) as writer:
+        for _, block in blocks:
+            writer.write(block)
+
+
+def _write_npz(path, traces, names, dtype, blocks):
+    # Streams the values array into the archive, np.load reads it as usual
+    first = traces[0]
+    header = {"descr": np.lib.format.dtype_to_descr(dtype), "fortran_order": False,
+              "shape": (len(first), len(traces))}
+    with zipfile.ZipFile(path, "w", allowZip64=True) as archive:
+        with archive.open("values.npy", "w", force_zip64=True) as file:
+            np.lib.format.write_array_header_2_0(file, header)
+            for _, block in blocks:
+                file.write(block.astype(dtype).tobytes())
+        for key, value in (("t0", first.t0), ("dt", first.dt), ("names", np.array(names))):
+            with archive.open(f"{key}.npy", "w") as file:
+                np.lib.format.write_array(file, np.asarray(value))
+
+
+def _write_wav(path, traces, names, dtype, blocks):
+    # 16-bit PCM scaled so the largest magnitude is full scale; gaps become silence
+    first = traces[0]
+    peak = max((_peak(trace.values) for trace in traces if len(trace)), default=0.0)
+    scale = 32767 / peak if np.isfinite(peak) and peak > 0 else 1.0
+    with wave.open(path, "wb") as file:
+        file.setnchannels(len(traces))
+        file.setsampwidth(2)
+        file.setframerate(max(1, int(round(first.sample_rate))))
+        for _, block in blocks:
+            file.writeframes(np.round(np.nan_to_num(block) * scale).astype("<i2").tobytes())
+
+
+def _peak(values, chunk=EXPORT_CHUNK):
+    # Chunked so a memory-mapped capture is not converted in one piece
+    return max(float(np.nanmax(np.abs(np.asarray(values[start:start + chunk], dtype=np.float64))))
+               for start in range(0, len(values), chunk))
+
+
+def _write_hdf5(path, traces, names, dtype, blocks):
+    try:
+        import h5py  # Optional, only needed for HDF5
+    except ImportError:
+        raise ValueError("HDF5 export needs h5py (pip install h5py)") from None
+    first = traces[0]
+    with h5py.File(path, "w") as file:
+        shape = (len(first), len(traces))
+        values = file.create_dataset("values", shape=shape, dtype=dtype,
+                                     chunks=(min(max(shape[0], 1), EXPORT_CHUNK), shape[1]))
+        values.attrs.update(t0=first.t0, dt=first.dt, sample_rate=first.sample_rate, units="V")
+        values.attrs["channels"] = np.array(names, dtype=h5py.string_dtype())
+        for start, block in blocks:
+            values[start:start + len(block)] = block
+
+
+class ExportJob:
+    """Runs ``function(progress, cancelled)`` in a background thread.
+
+    The function reports the fraction done through ``progress`` and should
+    return False when ``cancelled()`` made it stop early.  The GUI polls
+    :attr:`progress`, :attr:`is_running` and, once finished,
+    :attr:`completed` and :attr:`error`.
+    """
+
+    def __init__(self, function, name="Export"):
+        self.function = function
+        self.name = name
+        self.progress = 0.0
+        self.completed = False
+        self.error = None
+        self._cancel = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+
+    @property
+    def is_running(self):
+        return self._thread.is_alive()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        self._cancel.set()
+
+    def join(self, timeout=None):
+        self._thread.join(timeout)
+
+    def _report(self, fraction):
+        self.progress = fraction
+
+    def _run(self):
+        try:
+            self.completed = self.function(self._report, self._cancel.is_set) is not False
+        except Exception as e:
+            # Any failure must reach the GUI, which otherwise reports success
+            self.error = e
+        if self.completed:
+            self.progress = 1.0
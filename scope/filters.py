@@ -0,0 +1,102 @@
+"""Stateful streaming filters applied block by block as samples arrive."""
+from functools import lru_cache
+
+import numpy as np
+from scipy.signal import butter, sosfilt, sosfilt_zi
+
+
+@lru_cache(maxsize=64)
+def design_sos(kind, order, cutoff, fs):
+    """Butterworth design in second-order sections, cached per parameter set.
+
+    The returned array is shared between callers and must not be modified.
+    """
+    return butter(order, cutoff, btype=kind, fs=fs, output="sos")
+
+
+class ButterworthStage:
+    """Butterworth IIR filter whose state (``zi``) carries over between blocks."""
+
+    def __init__(self, kind, order, cutoff, fs):
+        nyquist = 0.5 * fs
+        if not 0 < cutoff < nyquist:
+            raise ValueError(f"cutoff must be between 0 and {nyquist:g} Hz")
+        self.sos = design_sos(kind, int(order), float(cutoff), float(fs))
+        self.zi = None
+
+    def reset(self):
+        self.zi = None
+
+    def process(self, block):
+        if len(block) == 0:
+            return block
+        if self.zi is None:
+            # Start in steady state at the first sample instead of from zero
+            self.zi = sosfilt_zi(self.sos) * block[0]
+        out, self.zi = sosfilt(self.sos, block, zi=self.zi)
+        return out
+
+
+class MovingAverageStage:
+    """Running mean over the last ``window`` samples, O(1) per sample.
+
+    Only the last ``window - 1`` input samples are kept between blocks; the
+    first outputs of a stream average over the samples seen so far.
+    """
+
+    def __init__(self, window):
+        self.window = int(window)
+        if self.window < 1:
+            raise ValueError("window must be at least 1")
+        self._history = np.empty(0)
+
+    def reset(self):
+        self._history = np.empty(0)
+
+    def process(self, block):
+        if len(block) == 0:
+            return block
+        extended = np.concatenate((self._history, block))
+        sums = np.concatenate(([0.0], np.cumsum(extended)))
+        stop = np.arange(len(self._history) + 1, len(extended) + 1)
+        start = np.maximum(stop - self.window, 0)
+        out = (sums[stop] - sums[start]) / (stop - start)
+        self._history = extended[-(self.window - 1):] if self.window > 1 else extended[:0]
+        return out
+
+
+class FilterChain:
+    """Stages applied in order to consecutive blocks of one stream.
+
+    NaN gaps are bridged by holding the last valid sample so they do not
+    poison the filter state, and are restored as NaN in the output.
+    """
+
+    def __init__(self, stages):
+        self.stages = list(stages)
+        self._last = 0.0
+
+    def reset(self):
+        self._last = 0.0
+        for stage in self.stages:
+            stage.reset()
+
+    def process(self, block):
+        block = np.asarray(block, dtype=np.float64)
+        gaps = np.isnan(block)
+        if gaps.any():
+            # Forward-fill the gaps with the last valid sample
+            last_valid = np.where(gaps, -1, np.arange(len(block)))
+            np.maximum.accumulate(last_valid, out=last_valid)
+            block_in = np.where(last_valid >= 0, block[np.maximum(last_valid, 0)], self._last)
+        else:
+            block_in = block
+        if len(block_in):
+            self._last = block_in[-1]
+        out = block_in
+        for stage in self.stages:
+            out = stage.process(out)
+        if gaps.any():
+            out = np.array(out)
+            out[gaps] = np.nan
+        return out
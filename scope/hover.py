@@ -0,0 +1,33 @@
+"""Nearest-sample lookup for hover readouts and cursors."""
+import numpy as np
+
+
+def nearest_sample(trace, x, y, pixel_size, radius=10, max_samples=1 << 16):
+    """Find the sample of ``trace`` closest to ``(x, y)`` as seen on screen.
+
+    ``pixel_size`` is the ``(width, height)`` of one screen pixel in data
+    units, so time and voltage differences are compared in pixels whatever
+    the zoom.  The time axis is uniform, so the samples under the cursor are
+    located by index arithmetic and only those within ``radius`` pixels
+    horizontally are compared, at most ``max_samples`` of them.  Returns
+    ``(index, distance)`` with the distance in pixels, or None if no sample
+    lies within ``radius`` pixels.
+    """
+    px, py = pixel_size
+    n = len(trace)
+    if n == 0 or not px > 0 or not py > 0:
+        return None
+    center = (x - trace.t0) / trace.dt
+    half = min(int(np.ceil(radius * px / trace.dt)), max_samples // 2)
+    i0 = max(int(np.floor(center)) - half, 0)
+    i1 = min(int(np.ceil(center)) + half + 1, n)
+    if i1 <= i0:
+        return None
+    dx = (trace.t0 + trace.dt * np.arange(i0, i1) - x) / px
+    dy = (np.asarray(trace.values[i0:i1], dtype=np.float64) - y) / py
+    distance = np.hypot(dx, dy)
+    distance[np.isnan(distance)] = np.inf  # Gaps cannot be hovered
+    k = int(np.argmin(distance))
+    if distance[k] > radius:
+        return None
+    return i0 + k, float(distance[k])
@@ -0,0 +1,91 @@
+"""Timing of the acquisition, display and signal processing stages."""
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+from scope.ring_buffer import RingBuffer
+
+
+class StageTimer:
+    """Wall-clock and CPU time of named stages over their last ``history`` runs.
+
+    Time a stage with ``with timer.stage("draw"): ...``.  Recording costs two
+    clock reads and two array writes, so timers stay enabled in the hot
+    paths.  CPU time is that of the calling thread.  A stage is written by
+    one thread; another may read the statistics, which are then at most
+    one run stale.
+    """
+
+    def __init__(self, history=100):
+        self.history = history
+        self.reset()
+
+    def reset(self):
+        self._wall = {}
+        self._cpu = {}
+
+    @contextmanager
+    def stage(self, name):
+        wall = time.perf_counter()
+        cpu = time.thread_time()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - wall, time.thread_time() - cpu)
+
+    def record(self, name, wall, cpu=np.nan):
+        """Add one run of ``name`` lasting ``wall`` seconds, ``cpu`` of them on the CPU."""
+        if name not in self._wall:
+            self._wall[name] = RingBuffer(self.history)
+            self._cpu[name] = RingBuffer(self.history)
+        self._wall[name].append(wall)
+        self._cpu[name].append(cpu)
+
+    @property
+    def stages(self):
+        return list(self._wall)
+
+    def mean(self, name):
+        """Mean wall time of ``name`` in seconds, NaN before its first run."""
+        history = self._wall.get(name)
+        return float(np.mean(history.view())) if history is not None and len(history) else np.nan
+
+    def summary(self):
+        """Return ``{stage: {"mean", "max", "cpu", "runs"}}``, times in seconds."""
+        result = {}
+        for name in list(self._wall):
+            wall = self._wall[name].view()
+            if len(wall) == 0:
+                continue
+            result[name] = {
+                "mean": float(np.mean(wall)),
+                "max": float(np.max(wall)),
+                "cpu": float(np.mean(self._cpu[name].view())),
+                "runs": self._wall[name].total,
+            }
+        return result
+
+
+class RateMeter:
+    """Smoothed rate of a growing counter, e.g. samples per second."""
+
+    def __init__(self, smoothing=0.3):
+        self.smoothing = smoothing
+        self.rate = 0.0
+        self._last = None
+
+    def reset(self):
+        self.rate = 0.0
+        self._last = None
+
+    def update(self, count, now=None):
+        """Take the current value of the counter; returns the rate per second."""
+        now = time.monotonic() if now is None else now
+        if self._last is not None:
+            count0, t0 = self._last
+            if now > t0:
+                rate = max(count - count0, 0) / (now - t0)
+                self.rate += self.smoothing * (rate - self.rate)
+        self._last = (count, now)
+        return self.rate
@@ -0,0 +1,230 @@
+"""Multi-resolution min/max/mean index for instant zooming on long traces."""
+import numpy as np
+
+from scope.ring_buffer import RingBuffer
+
+
+class _Level:
+    """Blocks of ``block_size`` samples summarised by min, max, sum and valid sample count."""
+
+    def __init__(self, block_size, capacity):
+        self.block_size = block_size
+        self.min = RingBuffer(capacity)
+        self.max = RingBuffer(capacity)
+        self.sum = RingBuffer(capacity)
+        self.count = RingBuffer(capacity)
+
+    @property
+    def total(self):
+        """Number of complete blocks ever added."""
+        return self.min.total
+
+    @property
+    def first_index(self):
+        return self.min.first_index
+
+    def clear(self, total=0):
+        for ring in (self.min, self.max, self.sum, self.count):
+            ring.clear(total)
+
+    def extend(self, mins, maxs, sums, counts):
+        self.min.extend(mins)
+        self.max.extend(maxs)
+        self.sum.extend(sums)
+        self.count.extend(counts)
+
+    def read(self, start, stop):
+        """Return ``(min, max, sum, count)`` views for absolute block indices ``[start, stop)``."""
+        return (self.min.read(start, stop), self.max.read(start, stop), self.sum.read(start, stop),
+                self.count.read(start, stop))
+
+
+def _level_capacity(capacity, block_size, factor):
+    # Enough blocks to cover the sample ring plus a not yet combined group
+    return capacity // block_size + factor + 2
+
+
+class MinMaxPyramid:
+    """Level-of-detail index over a stream of samples.
+
+    Level ``k`` summarises blocks of ``base * factor**k`` samples.  Blocks
+    are built once, from a whole array or incrementally as samples stream
+    in, and each level is a ring buffer covering at least the last
+    ``capacity`` samples, so the index follows the sample ring buffer it
+    describes.  ``memory_budget`` (bytes) bounds the index: the base block
+    is enlarged until all levels fit.
+
+    Block ``j`` of a level covers absolute sample indices
+    ``[j * block_size, (j + 1) * block_size)``, matching the absolute
+    indexing of ``RingBuffer``.
+    """
+
+    def __init__(self, capacity, base=64, factor=8, memory_budget=64 * 1024 * 1024):
+        capacity = int(capacity)
+        bytes_per_block = 4 * 2 * 8  # Four mirrored float64 ring buffers
+        while base < capacity and bytes_per_block * sum(
+                _level_capacity(capacity, block, factor) for block in self._block_sizes(capacity, base, factor)
+        ) > memory_budget:
+            base *= 2
+        self.capacity = capacity
+        self.base = base
+        self.factor = factor
+        self.memory_budget = memory_budget
+        self.levels = [_Level(block, _level_capacity(capacity, block, factor))
+                       for block in self._block_sizes(capacity, base, factor)]
+        self._tail = np.empty(0)  # Samples not yet forming a complete base block
+        self._pending = []  # Single samples from append()
+        self.total = 0
+
+    @staticmethod
+    def _block_sizes(capacity, base, factor):
+        sizes = [base]
+        while sizes[-1] * factor <= capacity:
+            sizes.append(sizes[-1] * factor)
+        return sizes
+
+    def clear(self, start=0):
+        """Drop the index; the next sample gets absolute index ``start``."""
+        self.__init__(self.capacity, self.base, self.factor, self.memory_budget)
+        if start:
+            self.total = int(start)
+            # Pad the first base block so blocks stay aligned on absolute indices
+            self._tail = np.full(self.total % self.base, np.nan)
+            blocks = self.total // self.base
+            for level in self.levels:
+                level.clear(blocks)
+                # A coarser block partly before ``start`` is never built; finer levels cover that part
+                blocks = -(-blocks // self.factor)
+
+    @property
+    def indexed(self):
+        """Absolute index up to which samples are covered by base blocks."""
+        return self.levels[0].total * self.base
+
+    def append(self, value):
+        """Index a single sample; blocks are built once a base block is complete."""
+        self._pending.append(value)
+        if len(self._pending) + len(self._tail) >= self.base:
+            pending, self._pending = self._pending, []
+            self.extend(pending)
+
+    def extend(self, values):
+        """Index newly appended samples."""
+        if self._pending:
+            pending, self._pending = self._pending, []
+            self.extend(pending)
+        values = np.asarray(values, dtype=np.float64)
+        # Bounded chunks so no level ring drops blocks before they are combined
+        for start in range(0, len(values), self.capacity):
+            self._extend(values[start:start + self.capacity])
+
+    def _extend(self, values):
+        self.total += len(values)
+        pending = np.concatenate((self._tail, values)) if len(self._tail) else values
+        n = len(pending) // self.base * self.base
+        self._tail = pending[n:].copy()
+        blocks = pending[:n].reshape(-1, self.base)
+        # NaN gaps are left out of the extrema, the sums and the sample counts
+        mins = np.fmin.reduce(blocks, axis=1)
+        maxs = np.fmax.reduce(blocks, axis=1)
+        sums = np.nansum(blocks, axis=1)
+        counts = self.base - np.count_nonzero(np.isnan(blocks), axis=1)
+        self.levels[0].extend(mins, maxs, sums, counts)
+        for lower, level in zip(self.levels, self.levels[1:]):
+            # Combine every complete group of ``factor`` lower blocks
+            start = level.total * self.factor
+            stop = lower.total // self.factor * self.factor
+            if stop <= start:
+                break
+            lmin, lmax, lsum, lcount = lower.read(start, stop)
+            level.extend(np.fmin.reduce(lmin.reshape(-1, self.factor), axis=1),
+                         np.fmax.reduce(lmax.reshape(-1, self.factor), axis=1),
+                         lsum.reshape(-1, self.factor).sum(axis=1),
+                         lcount.reshape(-1, self.factor).sum(axis=1))
+
+    @classmethod
+    def build(cls, values, capacity=None, **kwargs):
+        """Build the index for a whole array, e.g. a loaded recording."""
+        pyramid = cls(capacity or max(len(values), 1), **kwargs)
+        chunk = 1 << 22  # Bounded temporary memory for memory-mapped inputs
+        for start in range(0, len(values), chunk):
+            pyramid.extend(values[start:start + chunk])
+        return pyramid
+
+    def level_for(self, samples_per_pixel):
+        """Return the coarsest level whose blocks are no larger than one pixel."""
+        best = None
+        for level in self.levels:
+            if level.block_size > samples_per_pixel:
+                break
+            best = level
+        return best
+
+    def envelope(self, start, stop, width):
+        """Per-pixel min/max over absolute samples ``[start, stop)``.
+
+        Returns ``(edges, mins, maxs, end)`` where ``edges`` are the absolute
+        sample indices at which each bucket starts and ``end`` is the index
+        up to which blocks were available; samples from ``end`` to ``stop``
+        (the newest, not yet combined ones) are left to the caller.  Returns
+        None when no level is coarse enough to help.
+        """
+        width = max(int(width), 1)
+        level = self.level_for((stop - start) / width)
+        if level is None:
+            return None
+        size = level.block_size
+        first = max(start // size, level.first_index)
+        last = min(-(-stop // size), level.total)
+        if last <= first:
+            return None
+        lmin, lmax, _, _ = level.read(first, last)
+        per_bucket = max(len(lmin) // width, 1)
+        lead = (-first) % per_bucket
+        edges = np.arange(lead, len(lmin), per_bucket)
+        if lead:
+            edges = np.concatenate(([0], edges))
+        mins = np.fmin.reduceat(lmin, edges)
+        maxs = np.fmax.reduceat(lmax, edges)
+        return (first + edges) * size, mins, maxs, last * size
+
+    def stats(self, start, stop, read_raw=None):
+        """Return ``(min, max, mean)`` over absolute samples ``[start, stop)``, or None.
+
+        The range is covered with the coarsest whole blocks first and finer
+        levels towards the ends, so the cost grows with the number of levels
+        rather than the range length.  What is left over (less than a base
+        block at each end, plus samples not indexed yet) is read through
+        ``read_raw(a, b)`` when given.
+        """
+        mins, maxs = [], []
+        total = 0.0
+        count = 0
+        segments = [(start, stop)]
+        for level in reversed(self.levels):
+            size = level.block_size
+            remaining = []
+            for a, b in segments:
+                first = max(-(-a // size), level.first_index)
+                last = min(b // size, level.total)
+                if last <= first:
+                    remaining.append((a, b))
+                    continue
+                lmin, lmax, lsum, lcount = level.read(first, last)
+                mins.append(np.fmin.reduce(lmin))
+                maxs.append(np.fmax.reduce(lmax))
+                total += lsum.sum()
+                count += lcount.sum()
+                remaining += [(a, first * size), (last * size, b)]
+            segments = [(a, b) for a, b in remaining if b > a]
+        if read_raw is not None:
+            for a, b in segments:
+                raw = read_raw(a, b)
+                if len(raw) and not np.all(np.isnan(raw)):
+                    mins.append(np.nanmin(raw))
+                    maxs.append(np.nanmax(raw))
+                    total += np.nansum(raw)
+                    count += np.count_nonzero(~np.isnan(raw))
+        if not count:
+            return None
+        return float(np.nanmin(mins)), float(np.nanmax(maxs)), float(total / count)
@@ -0,0 +1,196 @@
+"""Automatic waveform measurements with running statistics."""
+import time
+
+import numpy as np
+
+from scope.ring_buffer import RingBuffer
+
+# Measurement names and their units, in display order
+MEASUREMENTS = {
+    "Vpp": "V",
+    "Mean": "V",
+    "RMS": "V",
+    "Frequency": "Hz",
+    "Period": "s",
+    "Duty Cycle": "%",
+    "Rise Time": "s",
+    "Fall Time": "s",
+}
+
+
+def _fill_gaps(values):
+    """Replace NaN gaps by the last valid sample so they do not read as edges."""
+    nan = np.isnan(values)
+    if not nan.any():
+        return values
+    valid = np.flatnonzero(~nan)
+    if len(valid) == 0:
+        return None
+    last = np.where(nan, 0, np.arange(len(values)))
+    np.maximum.accumulate(last, out=last)
+    filled = values[last]
+    filled[:valid[0]] = values[valid[0]]
+    return filled
+
+
+def _transitions(values, low, high):
+    """Indices where a hysteresis comparator switches up (``rises``) and down (``falls``).
+
+    The comparator goes high above ``high``, low below ``low`` and holds
+    its state in between, so noise around one threshold is not counted.
+    """
+    state = np.where(values > high, 1, np.where(values < low, -1, 0))
+    last = np.where(state != 0, np.arange(len(values)), -1)
+    np.maximum.accumulate(last, out=last)
+    held = np.where(last >= 0, state[np.maximum(last, 0)], 0)
+    rises = np.flatnonzero((held[1:] == 1) & (held[:-1] == -1)) + 1
+    falls = np.flatnonzero((held[1:] == -1) & (held[:-1] == 1)) + 1
+    return rises, falls
+
+
+def _crossing_before(values, level, at):
+    """Fractional sample index of the last crossing of ``level`` at or before each of ``at``."""
+    above = values > level
+    raw = np.flatnonzero(above[1:] != above[:-1]) + 1
+    if len(raw) == 0:
+        return np.full(len(at), np.nan)
+    pos = np.searchsorted(raw, at, side="right") - 1
+    j = raw[np.maximum(pos, 0)]
+    v0 = values[j - 1]
+    v1 = values[j]
+    # Linear interpolation between the two samples around the crossing
+    crossing = j - 1 + (level - v0) / (v1 - v0)
+    return np.where(pos >= 0, crossing, np.nan)
+
+
+def amplitude(values):
+    """Vpp, mean and RMS of ``values``, ignoring NaN gaps."""
+    if len(values) == 0 or np.all(np.isnan(values)):
+        return {}
+    return {
+        "Vpp": float(np.nanmax(values) - np.nanmin(values)),
+        "Mean": float(np.nanmean(values)),
+        "RMS": float(np.sqrt(np.nanmean(np.square(values)))),
+    }
+
+
+def timing(values, dt, hysteresis=0.1):
+    """Frequency, period and duty cycle from crossings of the mid level.
+
+    The comparator hysteresis is a fraction of the peak-to-peak amplitude.
+    Results need at least two rising crossings.
+    """
+    values = _fill_gaps(np.asarray(values, dtype=np.float64))
+    if values is None or len(values) < 3:
+        return {}
+    low, high = np.min(values), np.max(values)
+    level = (low + high) / 2
+    h = hysteresis * (high - low) / 2
+    if h <= 0:
+        return {}
+    rises, falls = _transitions(values, level - h, level + h)
+    if len(rises) < 2:
+        return {}
+    starts = _crossing_before(values, level, rises)
+    period = float(np.nanmean(np.diff(starts))) * dt
+    result = {"Frequency": 1.0 / period, "Period": period}
+    # High time of every complete cycle: from its rising to its falling crossing
+    after = np.searchsorted(falls, rises[:-1])
+    complete = after < len(falls)
+    complete[complete] = falls[after[complete]] < rises[1:][complete]
+    if complete.any():
+        ends = _crossing_before(values, level, falls[after[complete]])
+        high_time = ends - starts[:-1][complete]
+        cycle = np.diff(starts)[complete]
+        result["Duty Cycle"] = float(np.nanmean(high_time / cycle)) * 100
+    return result
+
+
+def edges(values, dt, low=0.1, high=0.9):
+    """Mean 10-90% rise and fall times of the transitions in ``values``."""
+    values = _fill_gaps(np.asarray(values, dtype=np.float64))
+    if values is None or len(values) < 3:
+        return {}
+    vmin, vmax = np.min(values), np.max(values)
+    if vmax <= vmin:
+        return {}
+    lo = vmin + low * (vmax - vmin)
+    hi = vmin + high * (vmax - vmin)
+    rises, falls = _transitions(values, lo, hi)
+    result = {}
+    if len(rises):
+        rise = _crossing_before(values, hi, rises) - _crossing_before(values, lo, rises)
+        if not np.all(np.isnan(rise)):
+            result["Rise Time"] = float(np.nanmean(rise)) * dt
+    if len(falls):
+        fall = _crossing_before(values, lo, falls) - _crossing_before(values, hi, falls)
+        if not np.all(np.isnan(fall)):
+            result["Fall Time"] = float(np.nanmean(fall)) * dt
+    return result
+
+
+class MeasurementEngine:
+    """Measures windows of samples and keeps statistics over the last acquisitions.
+
+    The measurements are grouped by the work they share (amplitude, timing
+    and edges).  Each group has a time budget per refresh: it measures the
+    newest ``samples`` of the window, a number halved whenever the group
+    runs over budget and doubled again while it stays well under, so the
+    panel never holds up the display.  :attr:`limited` names the groups that
+    did not see the whole window last time.
+    """
+
+    GROUPS = {"amplitude": amplitude, "timing": timing, "edges": edges}
+
+    def __init__(self, budget=0.004, history=100, min_samples=1024, max_samples=1 << 20):
+        self.budget = budget  # Seconds per group and refresh
+        self.history = history
+        self.min_samples = min_samples
+        self.max_samples = max_samples
+        self.samples = dict.fromkeys(self.GROUPS, max_samples // 4)
+        self.reset()
+
+    @property
+    def window_samples(self):
+        """Most samples any group will look at; callers need not copy more."""
+        return max(self.samples.values())
+
+    def reset(self):
+        """Drop the results and the statistics."""
+        self.results = {}
+        self.limited = set()
+        self.acquisitions = 0
+        self._history = {name: RingBuffer(self.history) for name in MEASUREMENTS}
+        self._key = None
+
+    def update(self, trace, key=None):
+        """Measure ``trace`` unless ``key`` is the same as last time; returns the results."""
+        if key is not None and key == self._key:
+            return self.results
+        self._key = key
+        results = {}
+        self.limited = set()
+        for group, measure in self.GROUPS.items():
+            n = self.samples[group]
+            values = trace.values[-n:]
+            if len(values) < len(trace):
+                self.limited.add(group)
+            start = time.perf_counter()
+            results.update(measure(values) if group == "amplitude" else measure(values, trace.dt))
+            elapsed = time.perf_counter() - start
+            if elapsed > self.budget:
+                self.samples[group] = max(self.min_samples, n // 2)
+            elif elapsed < self.budget / 4 and len(values) == n:
+                self.samples[group] = min(self.max_samples, n * 2)
+        self.results = results
+        self.acquisitions += 1
+        for name, history in self._history.items():
+            history.append(results.get(name, np.nan))
+        return results
+
+    def statistics(self, name):
+        """Return ``(min, max, mean, std)`` of ``name`` over the last acquisitions, or None."""
+        values = self._history[name].view()
+        if len(values) == 0 or np.all(np.isnan(values)):
+            return None
+        return float(np.nanmin(values)), float(np.nanmax(values)), float(np.nanmean(values)), float(np.nanstd(values))
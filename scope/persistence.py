@@ -0,0 +1,87 @@
+"""Intensity-graded persistence display built from a 2D hit histogram."""
+import time
+
+import numpy as np
+
+
+class PersistenceMap:
+    """Decaying time-by-voltage histogram of the samples of many aligned frames.
+
+    Every frame of ``length`` samples is binned into ``columns`` time bins
+    by ``rows`` voltage bins over ``v_range``, like the phosphor of an
+    analog scope: frequent paths glow, rare glitches stay visible as faint
+    hits.  A batch of frames is binned with one ``np.bincount`` over
+    precomputed column offsets, so thousands of frames per second are
+    accumulated on the CPU.  Samples outside ``v_range`` are drawn on the
+    edge rows and counted in :attr:`clipped`.  Hits fade with the time
+    constant ``persistence`` in seconds; ``np.inf`` keeps them forever.
+    """
+
+    def __init__(self, length, t0, dt, v_range, columns=1000, rows=256, persistence=1.0):
+        self.length = int(length)
+        self.t0 = float(t0)
+        self.dt = float(dt)
+        self.v_min, self.v_max = float(v_range[0]), float(v_range[1])
+        if not self.v_max > self.v_min:
+            raise ValueError("v_range must be increasing")
+        self.columns = max(1, min(int(columns), self.length))
+        self.rows = int(rows)
+        self.persistence = float(persistence)
+        # Flat histogram offset of the column of every sample of a frame
+        self._offsets = (np.arange(self.length) * self.columns // self.length * self.rows).astype(np.int32)
+        self._scale = self.rows / (self.v_max - self.v_min)
+        self.reset()
+
+    def reset(self):
+        self.hits = np.zeros((self.columns, self.rows), dtype=np.float32)
+        self.frames = 0
+        self.clipped = 0
+        self._decayed = time.monotonic()
+
+    @property
+    def rect(self):
+        """``(x, y, width, height)`` of the histogram in plot coordinates."""
+        return self.t0, self.v_min, self.length * self.dt, self.v_max - self.v_min
+
+    def decay(self, now=None):
+        """Fade the hits by the time elapsed since the last call."""
+        now = time.monotonic() if now is None else now
+        elapsed = now - self._decayed
+        self._decayed = now
+        if np.isfinite(self.persistence) and elapsed > 0:
+            self.hits *= np.float32(np.exp(-elapsed / self.persistence))
+
+    def add(self, frames, now=None, chunk_samples=1 << 22):
+        """Accumulate a ``(n, length)`` array of frames, after fading the older hits.
+
+        Large batches are binned ``chunk_samples`` samples at a time to bound
+        the temporary arrays.
+        """
+        frames = np.asarray(frames).reshape(-1, self.length)
+        self.decay(now)
+        step = max(1, chunk_samples // self.length)
+        for start in range(0, len(frames), step):
+            self._bin(frames[start:start + step])
+        self.frames += len(frames)
+
+    def _bin(self, frames):
+        rows = (frames.astype(np.float32) - np.float32(self.v_min)) * np.float32(self._scale)
+        valid = np.isfinite(rows)
+        rows[~valid] = 0
+        out = (rows < 0) | (rows >= self.rows)
+        self.clipped += int(np.count_nonzero(out & valid))
+        index = np.clip(rows, 0, self.rows - 1).astype(np.int32)
+        index += self._offsets  # Broadcast over the frames
+        counts = np.bincount(index[valid], minlength=self.columns * self.rows)
+        self.hits += counts.reshape(self.columns, self.rows)
+
+    def intensity(self):
+        """Hits on a logarithmic scale normalised to ``[0, 1]``, shaped ``(columns, rows)``.
+
+        The logarithm keeps single hits visible next to paths hit by every frame.
+        """
+        image = np.log1p(self.hits)
+        peak = image.max()
+        if peak > 0:
+            image /= peak
+        return image
@@ -0,0 +1,149 @@
+"""Binary framed serial protocol used by the acquisition firmware.
+
+Every frame is little-endian and laid out as::
+
+    magic   uint16   0x5AA5 (bytes A5 5A on the wire)
+    seq     uint32   frame sequence number, incremented by one per frame
+    count   uint16   number of ADC codes in the frame
+    samples count x int16/uint16 ADC codes
+    crc     uint16   CRC-16/CCITT (init 0xFFFF) over seq, count and samples
+
+The number of samples per frame is fixed for a session, so whole runs of
+frames can be decoded at once with ``np.frombuffer``.
+"""
+import binascii
+
+import numpy as np
+
+MAGIC = 0x5AA5
+MAGIC_BYTES = MAGIC.to_bytes(2, "little")
+HEADER_SIZE = 8
+CRC_SIZE = 2
+
+# STM32H5 12-bit ADC referenced to 3.3 V
+DEFAULT_GAIN = 3.3 / 4095
+DEFAULT_OFFSET = 0.0
+
+
+def frame_dtype(samples_per_frame, sample_format="uint16"):
+    """Return the packed structured dtype of one frame."""
+    return np.dtype([
+        ("magic", "<u2"),
+        ("seq", "<u4"),
+        ("count", "<u2"),
+        ("samples", np.dtype(sample_format).newbyteorder("<"), (samples_per_frame,)),
+        ("crc", "<u2"),
+    ])
+
+
+def crc16(data):
+    """CRC-16/CCITT-FALSE of ``data``."""
+    return binascii.crc_hqx(data, 0xFFFF)
+
+
+def encode_frame(seq, codes, sample_format="uint16"):
+    """Build the wire representation of one frame from raw ADC codes."""
+    codes = np.asarray(codes, dtype=np.dtype(sample_format).newbyteorder("<"))
+    body = (int(seq) & 0xFFFFFFFF).to_bytes(4, "little") + len(codes).to_bytes(2, "little") + codes.tobytes()
+    return MAGIC_BYTES + body + crc16(body).to_bytes(2, "little")
+
+
+def encode_frames(first_seq, codes, sample_format="uint16"):
+    """Build consecutive frames at once from ADC codes shaped ``(frames, samples_per_frame)``."""
+    codes = np.asarray(codes)
+    frames = np.zeros(len(codes), dtype=frame_dtype(codes.shape[1], sample_format))
+    frames["magic"] = MAGIC
+    frames["seq"] = (int(first_seq) + np.arange(len(codes))) & 0xFFFFFFFF
+    frames["count"] = codes.shape[1]
+    frames["samples"] = codes
+    raw = frames.view(np.uint8).reshape(len(codes), -1)
+    # The CRC covers everything between the magic word and the CRC field
+    frames["crc"] = [crc16(row[2:-CRC_SIZE].tobytes()) for row in raw]
+    return frames.tobytes()
+
+
+class FrameDecoder:
+    """Incremental decoder turning raw serial bytes into calibrated volts.
+
+    ``feed()`` accepts arbitrarily sized chunks, keeps any partial frame for
+    the next call and resynchronises on the magic word after garbage.  Frames
+    with a bad CRC are discarded and counted in ``frames_corrupt``; gaps in
+    the sequence numbers (lost or discarded frames) are counted in
+    ``frames_dropped``.
+    """
+
+    def __init__(self, samples_per_frame=256, sample_format="uint16", gain=DEFAULT_GAIN, offset=DEFAULT_OFFSET):
+        self.samples_per_frame = int(samples_per_frame)
+        self.dtype = frame_dtype(self.samples_per_frame, sample_format)
+        self.frame_size = self.dtype.itemsize
+        self.gain = gain
+        self.offset = offset
+        self._pending = bytearray()
+        self.last_seq = None
+        self.frames_ok = 0
+        self.frames_corrupt = 0
+        self.frames_dropped = 0
+        self.bytes_skipped = 0
+
+    def reset(self):
+        """Forget buffered bytes, sequence tracking and statistics."""
+        self.__init__(self.samples_per_frame, self.dtype["samples"].base, self.gain, self.offset)
+
+    def feed(self, chunk):
+        """Consume ``chunk`` and return ``(seqs, volts)`` for the complete valid frames.
+
+        ``seqs`` holds one sequence number per decoded frame and ``volts``
+        the concatenated samples of those frames, in order.
+        """
+        pending = self._pending
+        pending += chunk
+        size = self.frame_size
+        pos = 0
+        good = []
+        while len(pending) - pos >= size:
+            if pending[pos:pos + 2] != MAGIC_BYTES:
+                found = pending.find(MAGIC_BYTES, pos + 1)
+                new_pos = found if found >= 0 else max(len(pending) - 1, pos)
+                self.bytes_skipped += new_pos - pos
+                pos = new_pos
+                continue
+            n = (len(pending) - pos) // size
+            frames = np.frombuffer(pending, dtype=self.dtype, count=n, offset=pos)
+            bad = (frames["magic"] != MAGIC) | (frames["count"] != self.samples_per_frame)
+            if bad[0]:
+                # Magic matched by chance inside garbage: skip it and resync
+                self.bytes_skipped += 1
+                pos += 1
+                del frames  # Release the export so the bytearray can be trimmed
+                continue
+            aligned = n if not bad.any() else int(np.argmax(bad))
+            crcs = frames["crc"][:aligned].tolist()
+            with memoryview(pending) as view:
+                valid = [crc16(view[pos + i * size + 2:pos + (i + 1) * size - CRC_SIZE]) == crc
+                         for i, crc in enumerate(crcs)]
+            self.frames_corrupt += valid.count(False)
+            good.append(frames[:aligned][np.array(valid, dtype=bool)])
+            del frames  # Release the export so the bytearray can be trimmed
+            pos += aligned * size
+        del pending[:pos]
+
+        frames = np.concatenate(good) if good else np.empty(0, dtype=self.dtype)
+        if len(frames) == 0:
+            return np.empty(0, dtype=np.uint32), np.empty(0)
+        seqs = frames["seq"]
+        self._count_drops(seqs)
+        self.frames_ok += len(frames)
+        volts = frames["samples"].ravel().astype(np.float64)
+        volts *= self.gain
+        volts += self.offset
+        return seqs, volts
+
+    def _count_drops(self, seqs):
+        """Accumulate the number of frames missing from the sequence."""
+        previous = np.empty(len(seqs), dtype=np.int64)
+        previous[0] = int(seqs[0]) - 1 if self.last_seq is None else self.last_seq
+        previous[1:] = seqs[:-1]
+        gaps = (seqs.astype(np.int64) - previous - 1) % (1 << 32)
+        # Backwards jumps (device reset) wrap to huge values; ignore them
+        self.frames_dropped += int(gaps[gaps < (1 << 31)].sum())
+        self.last_seq = int(seqs[-1])
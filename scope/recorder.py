@@ -0,0 +1,148 @@
+"""Continuous record-to-disk of acquired samples from a dedicated thread."""
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+
+from scope.capture_file import CaptureWriter
+
+
+class StreamRecorder:
+    """Logs sample blocks to rotating ``.scp`` files without blocking the reader.
+
+    Acquisition threads hand blocks to :meth:`submit`, which only enqueues
+    them; a writer thread batches whatever is queued into one write per
+    file.  When the bounded queue is full the block is dropped and counted
+    rather than stalling acquisition.  Files are rotated by size and/or age,
+    and also whenever the sample stream is discontinuous so every file stays
+    on one uniform time grid.  Each data file gets a sidecar ``.idx`` text
+    index with one line per written batch: first sample index, sample count,
+    device time of the first sample and host time of the write.
+    """
+
+    def __init__(self, directory, sample_rate, prefix="capture", dtype="float32", compress=False,
+                 rotate_bytes=256 * 1024 * 1024, rotate_seconds=None, queue_blocks=1024, units="V", channels=1):
+        self.directory = directory
+        self.sample_rate = float(sample_rate)
+        self.channels = channels  # Blocks are shaped (samples, channels) when above 1
+        self.prefix = prefix
+        self.dtype = dtype
+        self.compress = compress
+        self.rotate_bytes = rotate_bytes
+        self.rotate_seconds = rotate_seconds
+        self.units = units
+        self._queue = queue.Queue(maxsize=queue_blocks)
+        self._thread = None
+        self._writer = None
+        self._index = None
+        self._opened_at = 0.0
+        self._next_index = None  # Absolute index expected after the last written sample
+        self.files = []
+        self.samples_written = 0
+        self.bytes_written = 0
+        self.blocks_dropped = 0
+        self.error = None
+
+    @property
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def start(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name="StreamRecorder", daemon=True)
+        self._thread.start()
+
+    def submit(self, first_index, values):
+        """Queue ``values`` starting at absolute sample ``first_index``; never blocks.
+
+        Returns False if the block had to be dropped.
+        """
+        try:
+            self._queue.put_nowait((int(first_index), np.array(values, copy=True)))
+            return True
+        except queue.Full:
+            self.blocks_dropped += 1
+            return False
+
+    def stop(self, timeout=None):
+        """Write everything still queued, close the files and join the thread."""
+        if self._thread is None:
+            return
+        sent = False
+        if self._thread.is_alive():
+            try:
+                # The writer drains the queue, so a slot frees up unless it is stuck
+                self._queue.put(None, timeout=1.0)
+                sent = True
+            except queue.Full:
+                pass
+        # A writer that died (e.g. disk full) or is stuck must not hang the caller
+        self._thread.join(timeout if sent else 0)
+        self._thread = None
+
+    def _run(self):
+        try:
+            while True:
+                blocks = [self._queue.get()]
+                # Drain whatever else is waiting so it is written as one batch
+                while blocks[-1] is not None:
+                    try:
+                        blocks.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                stop = blocks[-1] is None
+                self._write_batch([b for b in blocks if b is not None])
+                if stop:
+                    break
+        except Exception as e:
+            self.error = e
+            print(f"Recording stopped: {e}")
+        finally:
+            self._close_file()
+
+    def _write_batch(self, blocks):
+        start = 0
+        for i in range(1, len(blocks) + 1):
+            # Split the batch wherever the sample indices are not contiguous
+            if i == len(blocks) or blocks[i][0] != blocks[i - 1][0] + len(blocks[i - 1][1]):
+                run = blocks[start:i]
+                self._write_run(run[0][0], np.concatenate([b[1] for b in run]))
+                start = i
+
+    def _write_run(self, first_index, values):
+        now = time.time()
+        if (self._writer is None or first_index != self._next_index
+                or self._writer.bytes_written >= self.rotate_bytes
+                or (self.rotate_seconds and now - self._opened_at >= self.rotate_seconds)):
+            self._open_file(first_index, now)
+        before = self._writer.bytes_written
+        self._writer.write(values)
+        self._index.write(f"{first_index},{len(values)},{first_index / self.sample_rate:.9f},{now:.6f}\n")
+        self.bytes_written += self._writer.bytes_written - before
+        self.samples_written += len(values)
+        self._next_index = first_index + len(values)
+
+    def _open_file(self, first_index, now):
+        self._close_file()
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(now))
+        path = os.path.join(self.directory, f"{self.prefix}_{stamp}_{len(self.files):04d}.scp")
+        self._writer = CaptureWriter(path, self.sample_rate, self.channels, dtype=self.dtype,
+                                     t0=first_index / self.sample_rate, units=self.units, compress=self.compress,
+                                     first_index=first_index)
+        self._index = open(path + ".idx", "w")
+        self._index.write("first_index,samples,device_time,host_time\n")
+        self._opened_at = now
+        self.files.append(path)
+
+    def _close_file(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._index.close()
+            self._writer = None
+            self._index = None
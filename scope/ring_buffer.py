@@ -0,0 +1,94 @@
+"""Fixed-capacity FIFO storage backed by a preallocated NumPy array."""
+import numpy as np
+
+
+class RingBuffer:
+    """FIFO of numbers with a fixed capacity and O(1) appends.
+
+    The storage is a single contiguous array of twice the capacity in which
+    every item is written at ``i`` and ``i + capacity``.  The newest ``n``
+    items therefore always form one contiguous slice, so ``view()`` can hand
+    out an ordered, zero-copy array without ever concatenating.
+    """
+
+    def __init__(self, capacity, dtype=np.float64):
+        capacity = int(capacity)
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self._buf = np.zeros(2 * capacity, dtype=dtype)
+        self._head = 0  # Next write position in [0, capacity)
+        self._size = 0
+        self.total = 0  # Number of items ever written
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def dtype(self):
+        return self._buf.dtype
+
+    @property
+    def first_index(self):
+        """Absolute index (counted from the first write) of the oldest item."""
+        return self.total - self._size
+
+    def clear(self, total=0):
+        """Drop all items; numbering of the next item continues from ``total``."""
+        self._head = 0
+        self._size = 0
+        self.total = int(total)
+
+    def append(self, value):
+        """Append a single item, overwriting the oldest one when full."""
+        head = self._head
+        self._buf[head] = value
+        self._buf[head + self.capacity] = value
+        self._head = (head + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+        self.total += 1
+
+    def extend(self, values):
+        """Append a block of items with at most two slice assignments per half."""
+        values = np.asarray(values, dtype=self._buf.dtype).ravel()
+        n = len(values)
+        if n == 0:
+            return
+        cap = self.capacity
+        if n > cap:
+            values = values[-cap:]
+        k = len(values)
+        head = self._head
+        first = min(k, cap - head)
+        self._buf[head:head + first] = values[:first]
+        self._buf[head + cap:head + cap + first] = values[:first]
+        rest = k - first
+        if rest:
+            self._buf[:rest] = values[first:]
+            self._buf[cap:cap + rest] = values[first:]
+        self._head = (head + k) % cap
+        self._size = min(self._size + k, cap)
+        self.total += n
+
+    def view(self, n=None):
+        """Return the newest ``n`` items (all by default), oldest first.
+
+        The result is a view into the internal storage: it stays valid until
+        the writer wraps around over it, so copy it if it has to outlive the
+        lock protecting the buffer.
+        """
+        size = self._size if n is None else max(0, min(int(n), self._size))
+        end = self._head + self.capacity
+        return self._buf[end - size:end]
+
+    def read(self, start, stop):
+        """Return items by absolute index range ``[start, stop)`` as a view.
+
+        The range is clipped to what is still held in the buffer.
+        """
+        start = max(int(start), self.first_index)
+        stop = min(int(stop), self.total)
+        if stop <= start:
+            return self._buf[:0]
+        end = self._head + self.capacity - (self.total - stop)
+        return self._buf[end - (stop - start):end]
@@ -0,0 +1,131 @@
+"""Acquisition sample store on a uniform time grid."""
+import numpy as np
+
+from scope.lod import MinMaxPyramid
+from scope.ring_buffer import RingBuffer
+from scope.trace import Trace
+
+
+class SampleBuffer:
+    """Voltage ring buffer on a uniform time grid.
+
+    Timestamps are implicit: the sample with absolute index ``i`` (counted
+    from the first write) was taken at ``t0 + i * dt``.  With ``lod=True`` a
+    :class:`~scope.lod.MinMaxPyramid` is kept up to date alongside the
+    samples for fast zooming and range statistics.
+    """
+
+    def __init__(self, capacity, dt=1.0, t0=0.0, lod=False):
+        self.voltage = RingBuffer(capacity)
+        self.dt = float(dt)
+        self.t0 = float(t0)
+        self.lod = MinMaxPyramid(capacity) if lod else None
+
+    def __len__(self):
+        return len(self.voltage)
+
+    @property
+    def capacity(self):
+        return self.voltage.capacity
+
+    @property
+    def total(self):
+        return self.voltage.total
+
+    @property
+    def first_index(self):
+        return self.voltage.first_index
+
+    def clear(self, total=None):
+        """Drop all samples; the next one gets absolute index ``total``.
+
+        By default numbering continues where it was, so sample indices keep
+        matching the acquisition clock and the device sequence numbers.
+        """
+        total = self.total if total is None else int(total)
+        if self.lod is not None:
+            self.lod.clear(total)
+        self.voltage.clear(total)
+
+    def append(self, voltage):
+        self.voltage.append(voltage)
+        if self.lod is not None:
+            self.lod.append(voltage)
+
+    def extend(self, voltages):
+        self.voltage.extend(voltages)
+        if self.lod is not None:
+            self.lod.extend(voltages)
+
+    def stats(self, start=None, stop=None):
+        """Return ``(min, max, mean)`` over an absolute index range, or None."""
+        start = self.first_index if start is None else max(int(start), self.first_index)
+        stop = self.total if stop is None else min(int(stop), self.total)
+        if self.lod is not None:
+            return self.lod.stats(start, stop, read_raw=self.voltage.read)
+        values = self.voltage.read(start, stop)
+        if len(values) == 0 or np.all(np.isnan(values)):
+            return None
+        return float(np.nanmin(values)), float(np.nanmax(values)), float(np.nanmean(values))
+
+    def trace(self, n=None):
+        """Return the newest ``n`` samples as a zero-copy :class:`Trace`."""
+        values = self.voltage.view(n)
+        return Trace(self.t0 + (self.total - len(values)) * self.dt, self.dt, values)
+
+    def read(self, start, stop):
+        """Return samples by absolute index range ``[start, stop)`` as a :class:`Trace`."""
+        start = max(int(start), self.first_index)
+        values = self.voltage.read(start, stop)
+        return Trace(self.t0 + start * self.dt, self.dt, values)
+
+
+class TraceBuffer:
+    """Read-only counterpart of :class:`SampleBuffer` over a complete trace.
+
+    Used for loaded recordings: the samples may be a memory-mapped file and
+    are never copied; the level-of-detail pyramid is built in bounded chunks.
+    """
+
+    def __init__(self, trace, lod=True):
+        self._trace = trace
+        self.dt = trace.dt
+        self.t0 = trace.t0
+        self.lod = MinMaxPyramid.build(trace.values) if lod and len(trace) else None
+
+    def __len__(self):
+        return len(self._trace)
+
+    @property
+    def capacity(self):
+        return len(self._trace)
+
+    @property
+    def total(self):
+        return len(self._trace)
+
+    @property
+    def first_index(self):
+        return 0
+
+    def clear(self):
+        """Drop the loaded samples, releasing the file they may be mapped from."""
+        self._trace = Trace(self.t0, self.dt, np.empty(0))
+        self.lod = None
+
+    def trace(self, n=None):
+        if n is None or n >= len(self._trace):
+            return self._trace
+        return self.read(len(self._trace) - n, len(self._trace))
+
+    def read(self, start, stop):
+        start = max(int(start), 0)
+        stop = min(int(stop), len(self._trace))
+        return Trace(self.t0 + start * self.dt, self.dt, self._trace.values[start:max(start, stop)])
+
+    def stats(self, start=None, stop=None):
+        start = 0 if start is None else max(int(start), 0)
+        stop = len(self) if stop is None else min(int(stop), len(self))
+        if self.lod is not None:
+            return self.lod.stats(start, stop, read_raw=lambda a, b: self.read(a, b).values)
+        return None
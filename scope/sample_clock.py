@@ -0,0 +1,101 @@
+"""Acquisition clock deriving sample times from the device sample rate."""
+from collections import deque
+
+import numpy as np
+
+SEQ_MODULO = 1 << 32
+
+
+class SampleClock:
+    """Places incoming samples on a uniform grid of absolute sample indices.
+
+    Sample ``i`` is taken at ``i / sample_rate`` device time.  Binary frames
+    are positioned from their sequence numbers, so lost frames leave NaN
+    holes of the right length instead of shifting everything after them.
+    The host arrival time of each block is recorded to estimate the drift
+    between the device and host clocks.
+    """
+
+    def __init__(self, sample_rate, samples_per_frame=1, max_gap=1000000, history=256):
+        if sample_rate <= 0:
+            raise ValueError("sample_rate must be positive")
+        self.sample_rate = float(sample_rate)
+        self.dt = 1.0 / self.sample_rate
+        self.samples_per_frame = int(samples_per_frame)
+        self.max_gap = int(max_gap)  # Longest gap filled with NaN, in samples
+        self.next_index = 0  # Absolute index of the next sample
+        self.next_seq = None  # Sequence number of the next expected frame
+        self.gaps = deque(maxlen=1000)  # (absolute index, missing samples)
+        self.samples_missing = 0
+        self.host_t0 = None  # Host time of sample 0
+        self.drift_ppm = 0.0
+        self._observations = deque(maxlen=history)
+        self._observed = 0
+
+    def time_of(self, index):
+        """Device time of the sample at ``index``."""
+        return index * self.dt
+
+    def host_time_of(self, index):
+        """Estimated host time of the sample at ``index``, drift included."""
+        return (self.host_t0 or 0.0) + index * self.dt * (1.0 + self.drift_ppm * 1e-6)
+
+    def place_samples(self, values):
+        """Place consecutive samples that carry no sequence information.
+
+        Returns ``(first_index, values)``.
+        """
+        first = self.next_index
+        self.next_index += len(values)
+        return first, values
+
+    def place_frames(self, seqs, values):
+        """Place decoded frames by sequence number, filling lost frames with NaN.
+
+        ``values`` is shaped ``(samples,)`` or ``(samples, channels)``.  Returns
+        ``(first_index, values)`` where ``values`` covers every index from
+        ``first_index`` up to the new ``next_index``.
+        """
+        spf = self.samples_per_frame
+        seqs = np.asarray(seqs, dtype=np.int64)
+        if len(seqs) == 0:
+            return self.next_index, np.empty(0)
+        if self.next_seq is None:
+            self.next_seq = int(seqs[0])
+        previous = np.empty(len(seqs), dtype=np.int64)
+        previous[0] = self.next_seq - 1
+        previous[1:] = seqs[:-1]
+        steps = (seqs - previous) % SEQ_MODULO
+        # A backwards jump means the device restarted: resume right after
+        steps[(steps == 0) | (steps >= SEQ_MODULO // 2)] = 1
+        np.minimum(steps, self.max_gap // spf + 1, out=steps)
+        slots = np.cumsum(steps) - 1
+
+        first = self.next_index
+        values = np.asarray(values, dtype=np.float64)
+        if slots[-1] + 1 == len(seqs):
+            placed = values
+        else:
+            # Rows may carry several interleaved channels each
+            placed = np.full(((slots[-1] + 1) * spf,) + values.shape[1:], np.nan)
+            placed.reshape((-1, spf) + values.shape[1:])[slots] = values.reshape((-1, spf) + values.shape[1:])
+            for slot, missing in zip(slots[steps > 1], steps[steps > 1] - 1):
+                self.gaps.append((first + int(slot - missing) * spf, int(missing) * spf))
+                self.samples_missing += int(missing) * spf
+        self.next_seq = int(seqs[-1] + 1) % SEQ_MODULO
+        self.next_index += len(placed)
+        return first, placed
+
+    def observe(self, host_time):
+        """Record that every sample before ``next_index`` had arrived by ``host_time``."""
+        device_time = self.next_index * self.dt
+        if self.host_t0 is None:
+            self.host_t0 = host_time - device_time
+        self._observations.append((device_time, host_time - self.host_t0 - device_time))
+        self._observed += 1
+        if self._observed % 16 == 0:  # Refitting on every line would dominate ASCII mode
+            # The host/device offset grows linearly with the relative clock error;
+            # transport latency only adds noise on top of that line
+            device, offset = np.array(self._observations).T
+            if device[-1] > device[0]:
+                self.drift_ppm = float(np.polyfit(device, offset, 1)[0]) * 1e6
@@ -0,0 +1,120 @@
+"""Segmented memory: triggered frames kept in one preallocated array."""
+import numpy as np
+
+from scope.trace import Trace
+
+
+class SegmentStore:
+    """The latest triggered segments of ``length`` samples, with their metadata.
+
+    Segments are rows of a single ``(capacity, length)`` array allocated up
+    front, so storing one is a row copy and the memory used never grows.
+    The capacity is ``max_segments``, reduced to what fits in
+    ``budget_bytes``; once full, every new segment evicts the oldest.
+    Segments are numbered from the first one stored, like samples in a
+    :class:`~scope.ring_buffer.RingBuffer`: the ones held are
+    ``first_index <= i < total``.  Each keeps the absolute sample index and
+    acquisition time of its trigger and the wall-clock time it was stored.
+    Samples are stored as ``float32`` by default, plenty for a 12-bit ADC
+    and half the memory.
+    """
+
+    def __init__(self, length, dt, pre_samples=0, max_segments=1000, budget_bytes=256 << 20, dtype=np.float32):
+        self.length = int(length)
+        self.dt = float(dt)
+        self.pre_samples = int(pre_samples)
+        dtype = np.dtype(dtype)
+        capacity = min(int(max_segments), int(budget_bytes) // max(self.length * dtype.itemsize, 1))
+        if capacity < 1:
+            raise ValueError("the memory budget does not hold a single segment")
+        self.capacity = capacity
+        self.max_segments = int(max_segments)
+        self.budget_bytes = int(budget_bytes)
+        self._values = np.full((capacity, self.length), np.nan, dtype=dtype)
+        self._index = np.zeros(capacity, dtype=np.int64)
+        self._time = np.zeros(capacity)
+        self._wall = np.zeros(capacity)
+        self.total = 0  # Segments ever stored
+
+    def __len__(self):
+        return min(self.total, self.capacity)
+
+    @property
+    def first_index(self):
+        """Number of the oldest segment still held."""
+        return self.total - len(self)
+
+    @property
+    def nbytes(self):
+        return self._values.nbytes
+
+    def clear(self):
+        self.total = 0
+
+    def add(self, values, index, time, wall=0.0):
+        """Store one segment triggered at absolute sample ``index`` and acquisition ``time``."""
+        if len(values) != self.length:
+            raise ValueError(f"segments must have {self.length} samples")
+        row = self.total % self.capacity
+        self._values[row] = values
+        self._index[row] = index
+        self._time[row] = time
+        self._wall[row] = wall
+        self.total += 1
+
+    def add_frames(self, frames, t0, wall=0.0):
+        """Store the triggered :class:`~scope.trigger.TriggerFrame` objects of a buffer starting at ``t0``.
+
+        Frames forced by the Auto mode did not trigger and are skipped.
+        """
+        frames = [frame for frame in frames if not frame.forced]
+        for frame in frames[-self.capacity:]:
+            self.add(frame.trace.values, frame.index, t0 + frame.index * self.dt, wall)
+
+    def _rows(self, start, stop):
+        start = max(int(start), self.first_index)
+        stop = min(int(stop), self.total)
+        return np.arange(start, max(start, stop)) % self.capacity
+
+    def segment(self, i):
+        """Return segment ``i`` as a :class:`Trace` timed from its trigger, with its metadata."""
+        if not self.first_index <= i < self.total:
+            raise IndexError(f"segment {i} is not held, the store has {self.first_index} to {self.total - 1}")
+        row = i % self.capacity
+        trace = Trace(-self.pre_samples * self.dt, self.dt, self._values[row])
+        return trace, {"index": int(self._index[row]), "time": float(self._time[row]), "wall": float(self._wall[row])}
+
+    def values(self, start=None, stop=None):
+        """Return segments ``[start, stop)`` as a 2D array, oldest first.
+
+        The range is clipped to the segments held.  The result is a view
+        when the segments are contiguous in the store and a copy otherwise.
+        """
+        rows = self._rows(self.first_index if start is None else start, self.total if stop is None else stop)
+        if len(rows) and rows[-1] - rows[0] == len(rows) - 1:
+            return self._values[rows[0]:rows[-1] + 1]
+        return self._values[rows]
+
+    def times(self, start=None, stop=None):
+        """Acquisition times of the triggers of segments ``[start, stop)``."""
+        return self._time[self._rows(self.first_index if start is None else start,
+                                     self.total if stop is None else stop)]
+
+    def save(self, path):
+        """Write the segments held and their metadata to a ``.npz`` file."""
+        rows = self._rows(self.first_index, self.total)
+        np.savez(path, values=self._values[rows], index=self._index[rows], time=self._time[rows],
+                 wall=self._wall[rows], dt=self.dt, pre_samples=self.pre_samples,
+                 first=self.first_index)
+
+    @classmethod
+    def load(cls, path, budget_bytes=256 << 20):
+        """Read a store written by :meth:`save`; segments keep their numbers."""
+        with np.load(path) as data:
+            values = data["values"]
+            store = cls(values.shape[1], float(data["dt"]), int(data["pre_samples"]), max(len(values), 1),
+                        max(budget_bytes, values.nbytes), values.dtype)
+            store.total = int(data["first"])
+            for k in range(len(values)):
+                store.add(values[k], data["index"][k], data["time"][k], data["wall"][k])
+        return store
@@ -0,0 +1,210 @@
+"""Sample ring buffer in shared memory, written by an acquisition process."""
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from scope.lod import MinMaxPyramid
+from scope.trace import Trace
+
+# Header: int64 write indices and geometry, then float64 link statistics
+_TOTAL, _RESERVED, _CAPACITY, _CHANNELS = range(4)
+STATS = ("t0", "drift_ppm", "gaps", "samples_missing", "invalid_lines", "frames_ok", "frames_corrupt",
+         "frames_dropped", "parse_ms", "lock_ms", "backlog_bytes")
+HEADER_BYTES = 4 * 8 + 16 * 8
+
+
+class SharedRing:
+    """Mirrored multi-channel sample ring in shared memory with a single writer.
+
+    The layout follows :class:`~scope.ring_buffer.RingBuffer`: sample ``i``
+    of every channel is stored at ``i % capacity`` and ``i % capacity +
+    capacity``, so any run of the newest samples is one contiguous slice.
+    There is no lock.  The writer first publishes how far it is about to
+    write, then stores the samples, then advances the write index.  Readers
+    copy what they need and check the reservation afterwards, discarding the
+    part the writer may have overwritten meanwhile, as with a seqlock.  The
+    indices are aligned 64-bit words, which are stored atomically on the
+    x86-64 and ARM64 hosts the scope runs on.
+
+    Create the ring with ``SharedRing(capacity, channels)`` and attach to it
+    from another process with ``SharedRing(name=ring.name)``.
+    """
+
+    def __init__(self, capacity=None, channels=1, name=None):
+        if name is None:
+            capacity = int(capacity)
+            if capacity < 1:
+                raise ValueError("capacity must be at least 1")
+            size = HEADER_BYTES + channels * 2 * capacity * 8
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+            self._index = np.ndarray(4, dtype=np.int64, buffer=self.shm.buf)
+            self._index[:] = (0, 0, capacity, channels)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            self._index = np.ndarray(4, dtype=np.int64, buffer=self.shm.buf)
+        self.owner = name is None
+        self.capacity = int(self._index[_CAPACITY])
+        self.channels = int(self._index[_CHANNELS])
+        self._stats = np.ndarray(16, dtype=np.float64, buffer=self.shm.buf, offset=4 * 8)
+        if self.owner:
+            self._stats[:] = 0.0
+        self._data = np.ndarray((self.channels, 2 * self.capacity), dtype=np.float64, buffer=self.shm.buf,
+                                offset=HEADER_BYTES)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    @property
+    def total(self):
+        """Number of samples per channel written so far."""
+        return int(self._index[_TOTAL])
+
+    def write(self, rows):
+        """Append rows shaped ``(samples, channels)``; only the writer process calls this."""
+        rows = np.asarray(rows, dtype=np.float64).reshape(-1, self.channels)
+        n = len(rows)
+        if n == 0:
+            return
+        cap = self.capacity
+        total = int(self._index[_TOTAL])
+        self._index[_RESERVED] = total + n  # Readers discard whatever this may overwrite
+        if n > cap:
+            rows = rows[-cap:]
+        k = len(rows)
+        head = (total + n - k) % cap
+        first = min(k, cap - head)
+        self._data[:, head:head + first] = rows[:first].T
+        self._data[:, head + cap:head + cap + first] = rows[:first].T
+        rest = k - first
+        if rest:
+            self._data[:, :rest] = rows[first:].T
+            self._data[:, cap:cap + rest] = rows[first:].T
+        self._index[_TOTAL] = total + n
+
+    def view(self, channel, start, stop):
+        """Zero-copy view of absolute samples ``[start, stop)`` of one channel, not validated."""
+        start = max(int(start), stop - self.capacity, 0)
+        i = start % self.capacity
+        return self._data[channel, i:i + max(0, stop - start)]
+
+    def read(self, start, stop, channel=None):
+        """Copy absolute samples ``[start, stop)``, as rows or from one ``channel``.
+
+        Returns ``(start, values)``; ``start`` moves forward past samples that
+        were already overwritten, before or during the copy.
+        """
+        stop = min(int(stop), self.total)
+        start = max(int(start), stop - self.capacity, 0)
+        if stop <= start:
+            return stop, np.empty((0,) if channel is not None else (0, self.channels))
+        i = start % self.capacity
+        if channel is None:
+            values = self._data[:, i:i + stop - start].T.copy()
+        else:
+            values = self._data[channel, i:i + stop - start].copy()
+        # The writer may have lapped the oldest copied samples meanwhile
+        overwritten = int(self._index[_RESERVED]) - self.capacity
+        if overwritten > start:
+            values = values[min(overwritten, stop) - start:]
+            start = min(overwritten, stop)
+        return start, values
+
+    def set_stats(self, **values):
+        for key, value in values.items():
+            self._stats[STATS.index(key)] = value
+
+    def stats(self):
+        return dict(zip(STATS, self._stats.tolist()))
+
+    def close(self):
+        """Unmap the ring, and free it if this process created it."""
+        self._index = self._stats = self._data = None
+        try:
+            self.shm.close()
+        except BufferError:
+            pass  # Views are still in use; the mapping goes away with them
+        if self.owner:
+            self.shm.unlink()
+
+
+class SharedRingBuffer:
+    """One channel of a :class:`SharedRing`, read like a :class:`~scope.sample_buffer.SampleBuffer`.
+
+    The ring's write index is sampled once per :meth:`ingest`, so the
+    buffer looks frozen between refreshes.  The level-of-detail pyramid is
+    kept in this process and fed with the new samples only.  ``trace()``
+    returns a zero-copy view whose oldest samples may be overwritten while
+    it is drawn; ``read()`` returns validated copies.  Only the GUI thread
+    uses it, so the channel lock is never contended.
+    """
+
+    def __init__(self, ring, channel, dt=1.0, t0=0.0, lod=True):
+        self.ring = ring
+        self.channel = channel
+        self.dt = float(dt)
+        self.t0 = float(t0)
+        self.lod = MinMaxPyramid(ring.capacity) if lod else None
+        self._total = 0  # Write index when last ingested
+        self._cleared = 0  # Samples before this index are hidden by clear()
+
+    def __len__(self):
+        return self.total - self.first_index
+
+    @property
+    def capacity(self):
+        return self.ring.capacity
+
+    @property
+    def total(self):
+        return self._total
+
+    @property
+    def first_index(self):
+        return max(self._total - self.ring.capacity, self._cleared)
+
+    def clear(self):
+        """Hide the samples received so far; numbering continues."""
+        self._cleared = self._total
+
+    def ingest(self, start, values):
+        """Take in samples ``values`` from absolute index ``start`` onwards."""
+        if self.lod is not None:
+            # Samples overwritten before they could be read are indexed as a gap
+            missing = start - self._total
+            while missing > 0:
+                n = min(missing, self.ring.capacity)
+                self.lod.extend(np.full(n, np.nan))
+                missing -= n
+            self.lod.extend(values)
+        self._total = start + len(values)
+
+    def trace(self, n=None):
+        """Return the newest ``n`` samples as a zero-copy :class:`Trace`."""
+        n = len(self) if n is None else max(0, min(int(n), len(self)))
+        values = self.ring.view(self.channel, self._total - n, self._total)
+        return Trace(self.t0 + (self._total - len(values)) * self.dt, self.dt, values)
+
+    def read(self, start, stop):
+        """Return a copy of samples by absolute index range ``[start, stop)``.
+
+        Samples the writer overwrote before they could be copied come back as
+        NaN, so the result always starts at ``start`` like a ``SampleBuffer``'s.
+        """
+        start = max(int(start), self.first_index)
+        stop = max(start, min(int(stop), self._total))
+        first, values = self.ring.read(start, stop, self.channel)
+        if first > start:
+            values = np.concatenate((np.full(first - start, np.nan), values))
+        return Trace(self.t0 + start * self.dt, self.dt, values)
+
+    def stats(self, start=None, stop=None):
+        """Return ``(min, max, mean)`` over an absolute index range, or None."""
+        start = self.first_index if start is None else max(int(start), self.first_index)
+        stop = self.total if stop is None else min(int(stop), self.total)
+        if self.lod is not None:
+            return self.lod.stats(start, stop, read_raw=lambda a, b: self.read(a, b).values)
+        values = self.read(start, stop).values
+        if len(values) == 0 or np.all(np.isnan(values)):
+            return None
+        return float(np.nanmin(values)), float(np.nanmax(values)), float(np.nanmean(values))
@@ -0,0 +1,286 @@
+"""Simulated acquisition board for testing without hardware.
+
+:class:`SimulatedSerial` stands in for ``serial.Serial`` and streams a
+synthetic waveform in the ASCII line protocol or the binary frame protocol,
+at the configured sample rate or as fast as it is read.  Framing errors and
+dropouts can be injected to exercise the decoders.  Open one with a
+``sim://`` port name anywhere a port is expected, e.g.
+``sim://square?frequency=1000&errors=0.01``, or expose it on a
+pseudo-terminal with ``python -m scope.simulator``.
+"""
+import time
+from urllib.parse import parse_qsl, urlsplit
+
+import numpy as np
+
+from scope.protocol import DEFAULT_GAIN, DEFAULT_OFFSET, encode_frames
+
+WAVEFORMS = ("sine", "square", "triangle", "noise", "burst", "glitch")
+SIM_PREFIX = "sim://"
+
+
+class SignalGenerator:
+    """Continuous synthetic waveform, generated in vectorized blocks.
+
+    ``burst`` plays ``burst_cycles`` sine periods every ``burst_period``
+    periods; ``glitch`` is a square wave with single-sample spikes arriving
+    ``glitch_rate`` times per second on average.  Channel ``k`` of a
+    multi-channel signal is shifted by ``k / channels`` of a period.
+    """
+
+    def __init__(self, waveform="sine", sample_rate=10000.0, frequency=50.0, amplitude=1.0, offset=1.65, noise=0.0,
+                 channels=1, burst_cycles=5, burst_period=20, glitch_rate=10.0, seed=None):
+        if waveform not in WAVEFORMS:
+            raise ValueError(f"waveform must be one of {WAVEFORMS}")
+        self.waveform = waveform
+        self.sample_rate = float(sample_rate)
+        self.frequency = float(frequency)
+        self.amplitude = float(amplitude)
+        self.offset = float(offset)
+        self.noise = float(noise)
+        self.channels = int(channels)
+        self.burst_cycles = burst_cycles
+        self.burst_period = burst_period
+        self.glitch_rate = float(glitch_rate)
+        self.rng = np.random.default_rng(seed)
+        self.index = 0  # Index of the next sample
+
+    def generate(self, n):
+        """Return the next ``n`` samples shaped ``(n, channels)``."""
+        t = (self.index + np.arange(n)) / self.sample_rate
+        self.index += n
+        cycles = self.frequency * t[:, None] + np.arange(self.channels) / self.channels
+        if self.waveform == "sine":
+            wave = np.sin(2 * np.pi * cycles)
+        elif self.waveform == "triangle":
+            wave = 4 * np.abs(cycles - np.floor(cycles + 0.5)) - 1
+        elif self.waveform == "noise":
+            wave = self.rng.standard_normal((n, self.channels))
+        elif self.waveform == "burst":
+            wave = np.sin(2 * np.pi * cycles) * (np.floor(cycles) % self.burst_period < self.burst_cycles)
+        else:
+            wave = np.where(cycles % 1.0 < 0.5, 1.0, -1.0)
+            if self.waveform == "glitch":
+                spikes = self.rng.random((n, self.channels)) < self.glitch_rate / self.sample_rate
+                wave[spikes] *= -1.5  # Short spike against the current level
+        values = self.offset + self.amplitude * wave
+        if self.noise:
+            values += self.noise * self.rng.standard_normal(values.shape)
+        return values
+
+
+class SimulatedSerial:
+    """A ``serial.Serial`` look-alike streaming a :class:`SignalGenerator`.
+
+    With ``realtime=True`` bytes become available at the pace of
+    ``sample_rate``; otherwise every read is served immediately, which
+    measures how fast a consumer can go.  ``errors`` is the probability that
+    a line or frame has a corrupted byte and ``dropouts`` the probability
+    that it is lost.  Unread data beyond ``buffer_size`` bytes is discarded
+    like an overflowing driver buffer and counted in ``bytes_overrun``.
+    """
+
+    def __init__(self, waveform="sine", sample_rate=10000.0, protocol="ascii", channels=1, errors=0.0, dropouts=0.0,
+                 realtime=True, timeout=1.0, samples_per_frame=256, buffer_size=1 << 22, seed=None, **signal):
+        if protocol not in ("ascii", "binary"):
+            raise ValueError("protocol must be 'ascii' or 'binary'")
+        self.generator = SignalGenerator(waveform, sample_rate, channels=channels, seed=seed, **signal)
+        self.sample_rate = float(sample_rate)
+        self.protocol = protocol
+        self.channels = int(channels)
+        self.errors = float(errors)
+        self.dropouts = float(dropouts)
+        self.realtime = realtime
+        self.timeout = timeout
+        self.samples_per_frame = int(samples_per_frame)
+        self.buffer_size = int(buffer_size)
+        self.rng = np.random.default_rng(seed)
+        self.port = f"{SIM_PREFIX}{waveform}"
+        self.is_open = True
+        self.seq = 0
+        self.errors_injected = 0
+        self.units_dropped = 0  # Lines or frames lost to dropouts
+        self.bytes_overrun = 0
+        self._pending = bytearray()
+        self._started = time.monotonic()
+        self._rows = 0  # Sample rows produced so far
+        self._line_format = ",".join(["%.4f"] * self.channels) + "\n"
+
+    @classmethod
+    def from_url(cls, url, **defaults):
+        """Create from ``sim://WAVEFORM?key=value&...``; query values override ``defaults``."""
+        parts = urlsplit(url)
+        options = dict(defaults)
+        for key, value in parse_qsl(parts.query):
+            if key in ("protocol", "waveform"):
+                options[key] = value
+            elif key == "realtime":
+                options[key] = value.lower() not in ("0", "false", "no")
+            elif key in ("channels", "samples_per_frame", "seed", "burst_cycles", "burst_period"):
+                options[key] = int(value)
+            else:
+                options[key] = float(value)
+        if parts.netloc:
+            options["waveform"] = parts.netloc
+        return cls(**options)
+
+    # serial.Serial interface
+
+    @property
+    def in_waiting(self):
+        self._produce()
+        return len(self._pending)
+
+    def isOpen(self):
+        return self.is_open
+
+    def close(self):
+        self.is_open = False
+
+    def write(self, data):
+        return len(data)  # Commands to the board are ignored
+
+    def reset_input_buffer(self):
+        self._produce()
+        self._pending.clear()
+
+    def read(self, size=1):
+        self._wait(lambda: len(self._pending) >= size)
+        data = bytes(self._pending[:size])
+        del self._pending[:size]
+        return data
+
+    def readline(self):
+        self._wait(lambda: b"\n" in self._pending)
+        end = self._pending.find(b"\n") + 1 or len(self._pending)
+        data = bytes(self._pending[:end])
+        del self._pending[:end]
+        return data
+
+    # Data generation
+
+    def _wait(self, ready):
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        while True:
+            self._produce()
+            if ready() or (deadline is not None and time.monotonic() >= deadline):
+                return
+            time.sleep(0.0005)
+
+    def _produce(self):
+        rows_per_unit = 1 if self.protocol == "ascii" else self.samples_per_frame // self.channels
+        if self.realtime:
+            due = int((time.monotonic() - self._started) * self.sample_rate) - self._rows
+        else:
+            due = 1 << 16 if len(self._pending) < 1 << 20 else 0  # Keep a block ready
+        units = due // rows_per_unit
+        if units <= 0:
+            return
+        rows = self.generator.generate(units * rows_per_unit)
+        self._rows += len(rows)
+        lost = self.rng.random(units) < self.dropouts
+        self.units_dropped += int(lost.sum())
+        if self.protocol == "ascii":
+            data = self._encode_lines(rows, lost)
+        else:
+            data = self._encode_frames(rows, lost)
+        self._pending += data
+        overflow = len(self._pending) - self.buffer_size
+        if overflow > 0:
+            del self._pending[:overflow]
+            self.bytes_overrun += overflow
+
+    def _encode_lines(self, rows, lost):
+        rows = rows[~lost]
+        text = ((self._line_format * len(rows)) % tuple(rows.ravel())).encode()
+        corrupt = np.flatnonzero(self.rng.random(len(rows)) < self.errors)
+        if len(corrupt) == 0:
+            return text
+        # Garble one character of each corrupted line
+        ends = np.flatnonzero(np.frombuffer(text, dtype=np.uint8) == ord("\n"))
+        starts = np.concatenate(([0], ends[:-1] + 1))
+        data = bytearray(text)
+        for line in corrupt:
+            data[starts[line]] = ord("#")
+        self.errors_injected += len(corrupt)
+        return bytes(data)
+
+    def _encode_frames(self, rows, lost):
+        codes = np.clip(np.round((rows - DEFAULT_OFFSET) / DEFAULT_GAIN), 0, 4095).astype(np.uint16)
+        codes = codes.reshape(-1, self.samples_per_frame)  # Channels interleaved within each frame
+        seqs = self.seq + np.arange(len(codes))
+        self.seq += len(codes)
+        keep = np.flatnonzero(~lost)
+        if len(keep) == 0:
+            return b""
+        # Runs of consecutive sequence numbers are encoded together
+        breaks = np.flatnonzero(np.diff(keep) != 1) + 1
+        data = bytearray()
+        for run in np.split(keep, breaks):
+            data += encode_frames(seqs[run[0]], codes[run])
+        frame_size = len(data) // len(keep)
+        corrupt = np.flatnonzero(self.rng.random(len(keep)) < self.errors)
+        for frame in corrupt:
+            # Flip one byte after the magic word: the CRC check will reject the frame
+            position = frame * frame_size + 2 + int(self.rng.integers(frame_size - 2))
+            data[position] ^= 0xFF
+        self.errors_injected += len(corrupt)
+        return bytes(data)
+
+
+def is_simulated(port):
+    return port.startswith(SIM_PREFIX)
+
+
+def open_simulator(port, sample_rate=10000.0, channels=1, binary=False, timeout=1.0):
+    """Open a ``sim://`` port with the acquisition settings as defaults."""
+    return SimulatedSerial.from_url(port, sample_rate=sample_rate, channels=channels,
+                                    protocol="binary" if binary else "ascii", timeout=timeout)
+
+
+def serve_pty(simulator, chunk=4096):
+    """Stream ``simulator`` into a new pseudo-terminal; returns the slave path and the thread.
+
+    Any program can then open the slave path as a serial port.  POSIX only.
+    """
+    import os
+    import threading
+    import tty
+
+    master, slave = os.openpty()
+    tty.setraw(slave)
+
+    def pump():
+        while simulator.is_open:
+            data = simulator.read(chunk)
+            if data:
+                os.write(master, data)
+
+    thread = threading.Thread(target=pump, name="SimulatorPty", daemon=True)
+    thread.start()
+    return os.ttyname(slave), thread
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serve a simulated acquisition board on a pseudo-terminal.")
+    parser.add_argument("waveform", nargs="?", default="sine", choices=WAVEFORMS)
+    parser.add_argument("--rate", type=float, default=10000.0, help="sample rate in Hz")
+    parser.add_argument("--frequency", type=float, default=50.0)
+    parser.add_argument("--channels", type=int, default=1)
+    parser.add_argument("--binary", action="store_true", help="framed binary protocol instead of ASCII lines")
+    parser.add_argument("--noise", type=float, default=0.0, help="noise standard deviation in volts")
+    parser.add_argument("--errors", type=float, default=0.0, help="probability of a corrupted line or frame")
+    parser.add_argument("--dropouts", type=float, default=0.0, help="probability of a lost line or frame")
+    args = parser.parse_args()
+    sim = SimulatedSerial(args.waveform, args.rate, protocol="binary" if args.binary else "ascii",
+                          channels=args.channels, errors=args.errors, dropouts=args.dropouts,
+                          frequency=args.frequency, noise=args.noise)
+    path, _ = serve_pty(sim)
+    print(f"Simulated board on {path}, Ctrl+C to stop")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        sim.close()
@@ -0,0 +1,128 @@
+"""Streaming spectrum analyzer with windowing and averaging."""
+from functools import lru_cache
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy import fft as sp_fft
+from scipy.signal import get_window
+
+WINDOWS = {
+    "Hann": "hann",
+    "Blackman-Harris": "blackmanharris",
+    "Flat-top": "flattop",
+    "Rectangular": "boxcar",
+}
+AVERAGING_MODES = ("Exponential", "Peak Hold", "None")
+
+
+@lru_cache(maxsize=32)
+def window(name, size):
+    """Return the (read-only, cached) window array ``name`` of length ``size``."""
+    w = get_window(WINDOWS[name], size, fftbins=True)
+    w.flags.writeable = False
+    return w
+
+
+@lru_cache(maxsize=32)
+def frequencies(size, dt):
+    f = sp_fft.rfftfreq(size, dt)
+    f.flags.writeable = False
+    return f
+
+
+class SpectrumAnalyzer:
+    """Averaged amplitude spectrum of a sample stream.
+
+    The stream is cut into frames of ``frame_size`` samples overlapping by
+    ``overlap``.  Only frames that were not analysed yet are transformed,
+    and at most ``max_frames`` of the newest ones per update, so the cost of
+    a refresh does not depend on how much history is buffered.  Window
+    arrays are cached; ``scipy.fft`` keeps its own cache of FFT plans for
+    the fixed frame size.
+    """
+
+    def __init__(self, frame_size=4096, overlap=0.5, window_name="Hann", averaging="Exponential", alpha=0.25,
+                 max_frames=8):
+        if averaging not in AVERAGING_MODES:
+            raise ValueError(f"averaging must be one of {AVERAGING_MODES}")
+        self.frame_size = int(frame_size)
+        self.hop = max(1, int(round(self.frame_size * (1.0 - overlap))))
+        self.window_name = window_name
+        self.averaging = averaging
+        self.alpha = alpha
+        self.max_frames = max_frames
+        self.reset()
+
+    def reset(self):
+        self.spectrum = None
+        self.freqs = None
+        self._next_start = None
+        self.frames_analysed = 0
+
+    def collect(self, buffer):
+        """Copy the frames not analysed yet out of ``buffer``.
+
+        Call with the buffer's lock held; the copy is bounded by
+        ``max_frames`` frames.  Returns ``(block, count)`` or None.
+        """
+        n = self.frame_size
+        latest = buffer.total - n  # Start of the newest complete frame
+        if latest < buffer.first_index:
+            return None
+        start = latest if self._next_start is None else max(self._next_start, buffer.first_index)
+        if start > latest + self.hop:
+            start = latest  # The buffer was cleared or replaced
+        if start > latest:
+            return None
+        count = (latest - start) // self.hop + 1
+        if count > self.max_frames:
+            start += (count - self.max_frames) * self.hop
+            count = self.max_frames
+        block = np.array(buffer.read(start, start + (count - 1) * self.hop + n).values, dtype=np.float64)
+        self._next_start = start + count * self.hop
+        return block, count
+
+    def update(self, block, count, dt):
+        """Transform the collected frames and fold them into the average."""
+        n = self.frame_size
+        frames = sliding_window_view(np.nan_to_num(block), n)[::self.hop][:count]
+        w = window(self.window_name, n)
+        magnitude = np.abs(sp_fft.rfft(frames * w, axis=1))
+        # Single-sided amplitude corrected for the window's coherent gain
+        magnitude *= 2.0 / w.sum()
+        magnitude[:, 0] /= 2.0
+        if n % 2 == 0:
+            magnitude[:, -1] /= 2.0
+
+        if self.spectrum is None or self.spectrum.shape[0] != magnitude.shape[1] or self.averaging == "None":
+            if self.averaging == "Peak Hold":
+                self.spectrum = magnitude.max(axis=0)
+            else:
+                # The exponential average starts from the oldest frame, None shows the newest
+                self.spectrum = magnitude[0 if self.averaging == "Exponential" else -1].copy()
+            start = 1 if self.averaging == "Exponential" else len(magnitude)
+        else:
+            start = 0
+        if self.averaging == "Peak Hold":
+            np.maximum(self.spectrum, magnitude.max(axis=0), out=self.spectrum)
+        elif self.averaging == "Exponential":
+            for row in magnitude[start:]:
+                self.spectrum += self.alpha * (row - self.spectrum)
+        self.freqs = frequencies(n, float(dt))
+        self.frames_analysed += len(magnitude)
+        return self.freqs, self.spectrum
+
+    def analyze(self, values, dt):
+        """Fold every frame of a complete recording in, ``max_frames`` at a time.
+
+        Returns ``(freqs, spectrum)``, or None if ``values`` is shorter than a frame.
+        """
+        n = self.frame_size
+        count = (len(values) - n) // self.hop + 1
+        result = None
+        for first in range(0, max(count, 0), self.max_frames):
+            batch = min(self.max_frames, count - first)
+            start = first * self.hop
+            block = np.asarray(values[start:start + (batch - 1) * self.hop + n], dtype=np.float64)
+            result = self.update(block, batch, dt)
+        return result
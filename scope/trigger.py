@@ -0,0 +1,213 @@
+"""Software trigger scanning sample blocks for edges, levels and pulses."""
+from collections import namedtuple
+
+import numpy as np
+
+from scope.trace import Trace
+
+TRIGGER_TYPES = ("Rising Edge", "Falling Edge", "Level", "Pulse Width")
+TRIGGER_MODES = ("Auto", "Normal", "Single")
+
+TriggerFrame = namedtuple("TriggerFrame", "index trace forced")
+TriggerFrame.__doc__ = """A captured frame; ``trace`` times are relative to the trigger at absolute ``index``."""
+
+
+class _Crossings:
+    """Hysteresis comparator: reports where the input goes from below ``low`` to above ``high``.
+
+    The comparator state carries over between blocks, so an edge split
+    across two blocks is still found exactly once.
+    """
+
+    def __init__(self, low, high, invert=False):
+        self.low = low
+        self.high = high
+        self.invert = invert
+        self.state = 0  # -1 armed (was below low), +1 fired (was above high), 0 unknown
+
+    def scan(self, values):
+        """Return the block-relative indices of the crossings in ``values``."""
+        if self.invert:
+            state = np.where(values < self.low, 1, np.where(values > self.high, -1, 0))
+        else:
+            state = np.where(values > self.high, 1, np.where(values < self.low, -1, 0))
+        # Between the thresholds the comparator keeps its previous output
+        last = np.where(state != 0, np.arange(len(values)), -1)
+        np.maximum.accumulate(last, out=last)
+        held = np.where(last >= 0, state[np.maximum(last, 0)], self.state)
+        previous = np.concatenate(([self.state], held[:-1]))
+        if len(held):
+            self.state = int(held[-1])
+        return np.flatnonzero((held == 1) & (previous == -1))
+
+
+class TriggerEngine:
+    """Finds trigger points in a sample stream and cuts aligned frames around them.
+
+    ``process()`` scans only the samples that arrived since the previous
+    call, with vectorized comparisons instead of per-sample loops, and
+    returns the frames whose post-trigger part is complete.  Each frame
+    holds ``pre_samples`` samples before the trigger (taken from the
+    history buffer) and ``post_samples`` from the trigger on.
+
+    Trigger types:
+
+    * ``Rising Edge`` / ``Falling Edge``: crossing of ``level``, re-armed only
+      after going ``hysteresis`` beyond it on the other side.
+    * ``Level``: when the signal goes above ``level`` (below for
+      ``slope="falling"``), without hysteresis.
+    * ``Pulse Width``: at the end of a positive pulse (negative for
+      ``slope="falling"``) lasting between ``pulse_min`` and ``pulse_max``
+      samples.
+
+    Modes: ``Normal`` only produces triggered frames, ``Auto`` also
+    produces a free-running frame when nothing triggered for
+    ``auto_timeout`` samples, and ``Single`` disarms after one frame until
+    :meth:`arm` is called.  ``holdoff`` is the minimum number of samples
+    between two triggers.
+    """
+
+    def __init__(self, kind="Rising Edge", mode="Auto", level=0.0, hysteresis=0.05, slope="rising",
+                 pre_samples=500, post_samples=500, holdoff=0, pulse_min=0, pulse_max=np.inf,
+                 auto_timeout=None, max_frames=256):
+        if kind not in TRIGGER_TYPES:
+            raise ValueError(f"kind must be one of {TRIGGER_TYPES}")
+        if mode not in TRIGGER_MODES:
+            raise ValueError(f"mode must be one of {TRIGGER_MODES}")
+        self.kind = kind
+        self.mode = mode
+        self.level = float(level)
+        self.hysteresis = abs(float(hysteresis))
+        self.slope = "falling" if kind == "Falling Edge" else slope
+        self.pre_samples = int(pre_samples)
+        self.post_samples = int(post_samples)
+        self.holdoff = max(int(holdoff), 1)
+        self.pulse_min = pulse_min
+        self.pulse_max = pulse_max
+        self.auto_timeout = auto_timeout or 2 * (self.pre_samples + self.post_samples)
+        self.max_frames = max_frames
+        self.reset()
+
+    @property
+    def frame_length(self):
+        return self.pre_samples + self.post_samples
+
+    def reset(self):
+        """Forget the scan position, comparator states and pending triggers."""
+        h = self.hysteresis
+        self._rising = _Crossings(self.level - h, self.level)
+        self._falling = _Crossings(self.level, self.level + h, invert=True)
+        self._pulse_start = None  # Absolute index of an unfinished pulse's leading edge
+        self._inside = False  # Whether the last scanned sample was in the Level region
+        self._scanned = None  # Absolute index of the next sample to scan
+        self._last_trigger = None
+        self._pending = []  # Trigger indices waiting for their post-trigger samples
+        self.armed = True
+        self.triggers = 0
+
+    def arm(self):
+        """Re-arm after a single-shot capture."""
+        self.armed = True
+        self._last_trigger = None
+
+    def scan(self, values, first_index):
+        """Return absolute trigger indices found in ``values`` (starting at ``first_index``).
+
+        Holdoff is applied; the mode is not.
+        """
+        values = np.asarray(values, dtype=np.float64)
+        if self.kind in ("Rising Edge", "Falling Edge"):
+            comparator = self._falling if self.slope == "falling" else self._rising
+            candidates = comparator.scan(values) + first_index
+        elif self.kind == "Level":
+            inside = values < self.level if self.slope == "falling" else values > self.level
+            # Fire where the signal enters the level region, not on every sample inside it
+            previous = np.concatenate(([self._inside], inside[:-1]))
+            if len(inside):
+                self._inside = bool(inside[-1])
+            candidates = np.flatnonzero(inside & ~previous) + first_index
+        else:
+            candidates = self._scan_pulses(values, first_index)
+        return self._apply_holdoff(candidates)
+
+    def _scan_pulses(self, values, first_index):
+        leading, trailing = (self._falling, self._rising) if self.slope == "falling" else (self._rising, self._falling)
+        starts = leading.scan(values) + first_index
+        ends = trailing.scan(values) + first_index
+        if self._pulse_start is not None:
+            starts = np.concatenate(([self._pulse_start], starts))
+        if len(ends) == 0:
+            self._pulse_start = int(starts[-1]) if len(starts) else self._pulse_start
+            return ends
+        # Pair every pulse end with the latest start before it
+        pair = np.searchsorted(starts, ends, side="right") - 1
+        valid = pair >= 0
+        ends, pair = ends[valid], pair[valid]
+        width = ends - starts[pair]
+        # Only the first end after a given start closes that pulse
+        first_end = np.concatenate(([True], pair[1:] != pair[:-1])) if len(pair) else pair.astype(bool)
+        keep = first_end & (width >= self.pulse_min) & (width <= self.pulse_max)
+        last_end = ends[-1] if len(ends) else -1
+        self._pulse_start = int(starts[-1]) if len(starts) and starts[-1] > last_end else None
+        return ends[keep]
+
+    def _apply_holdoff(self, candidates):
+        if len(candidates) == 0:
+            return candidates
+        if self.holdoff <= 1 and self._last_trigger is None:
+            selected = candidates[:self.max_frames]
+        else:
+            # Greedy selection; the loop runs once per trigger, not per sample
+            selected = []
+            earliest = -np.inf if self._last_trigger is None else self._last_trigger + self.holdoff
+            i = int(np.searchsorted(candidates, earliest))
+            while i < len(candidates) and len(selected) < self.max_frames:
+                selected.append(candidates[i])
+                i = int(np.searchsorted(candidates, candidates[i] + self.holdoff))
+            selected = np.array(selected, dtype=np.int64)
+        if len(selected):
+            self._last_trigger = int(selected[-1])
+        return selected
+
+    def process(self, buffer):
+        """Scan new samples of ``buffer`` and return the completed :class:`TriggerFrame` list.
+
+        Call with the buffer's lock held.  Frames whose pre-trigger part has
+        already been overwritten in the ring buffer are dropped.
+        """
+        total = buffer.total
+        start = buffer.first_index if self._scanned is None else max(self._scanned, buffer.first_index)
+        if self._scanned is not None and self._scanned > total:
+            self.reset()  # The buffer was cleared or replaced
+            start = buffer.first_index
+        if self.armed and total > start:
+            found = self.scan(buffer.read(start, total).values, start)
+            # Like a hardware scope, ignore triggers until the pre-trigger history is filled
+            found = found[found - self.pre_samples >= buffer.first_index]
+            if self.mode == "Single":
+                found = found[:1]
+                if len(found):
+                    self.armed = False
+            self._pending += [(int(i), False) for i in found]
+            self.triggers += len(found)
+        self._scanned = total
+
+        if self.mode == "Auto" and not self._pending:
+            last = self._last_trigger if self._last_trigger is not None else buffer.first_index
+            if total - last >= self.auto_timeout and total - buffer.first_index >= self.frame_length:
+                # Nothing triggered for a while: show the newest data untriggered
+                self._last_trigger = total - self.post_samples
+                self._pending.append((self._last_trigger, True))
+
+        frames = []
+        waiting = []
+        for index, forced in self._pending:
+            if index + self.post_samples > total:
+                waiting.append((index, forced))
+                continue
+            if index - self.pre_samples < buffer.first_index:
+                continue
+            values = np.array(buffer.read(index - self.pre_samples, index + self.post_samples).values)
+            frames.append(TriggerFrame(index, Trace(-self.pre_samples * buffer.dt, buffer.dt, values), forced))
+        self._pending = waiting[-self.max_frames:]
+        return frames[-self.max_frames:]
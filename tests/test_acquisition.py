@@ -0,0 +1,41 @@
+import pytest
+import serial
+
+from scope.acquisition import ProcessReader, parse_lines
+
+
+def test_parse_lines_single_and_multi_channel():
+    rows, rejected = parse_lines(b"1.0\n2.5\n\n3\n")
+    assert rows.tolist() == [[1.0], [2.5], [3.0]] and rejected == 0
+    rows, rejected = parse_lines(b"1,2\n3 4\r\n5.5, 6\n", channels=2)
+    assert rows.tolist() == [[1, 2], [3, 4], [5.5, 6]] and rejected == 0
+
+
+def test_malformed_lines_are_skipped_not_mispaired():
+    rows, rejected = parse_lines(b"1.0\n2.0 3.0 4.0\n5.0 6.0\n", channels=2)
+    assert rows.tolist() == [[5.0, 6.0]] and rejected == 2
+    rows, rejected = parse_lines(b"1.0\n#.5\n2.0\n")
+    assert rows.tolist() == [[1.0], [2.0]] and rejected == 1
+
+
+def test_empty_block():
+    rows, rejected = parse_lines(b"\n\n", channels=3)
+    assert rows.shape == (0, 3) and rejected == 0
+
+
+def test_process_reader_reports_startup_errors():
+    reader = ProcessReader("sim://sine?bogus=1", 115200, 1000, capacity=1024)
+    try:
+        with pytest.raises(serial.SerialException, match="bogus"):
+            reader.start(0.0, timeout=30.0)
+    finally:
+        reader.close()
+
+
+def test_process_reader_reports_unexpected_startup_errors():
+    reader = ProcessReader("/dev/does-not-exist", "fast", 1000, capacity=1024)
+    try:
+        with pytest.raises(serial.SerialException, match="ValueError"):
+            reader.start(0.0, timeout=30.0)
+    finally:
+        reader.close()
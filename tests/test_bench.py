@@ -0,0 +1,39 @@
+import functools
+import json
+
+import numpy as np
+import pytest
+
+from scope import bench
+
+
+def test_measure_runs_at_least_min_runs():
+    calls = []
+    timing = bench.measure(lambda: calls.append(1), min_time=0, min_runs=3)
+    assert len(calls) == timing["runs"] == 3 and 0 <= timing["mean"] <= timing["max"]
+
+
+def test_signal_repeats_the_input_file(tmp_path):
+    path = str(tmp_path / "short.txt")
+    np.savetxt(path, np.column_stack((0.001 * np.arange(4), [1.0, 2.0, 3.0, 4.0])))
+    np.testing.assert_array_equal(bench.signal(10, path), [1, 2, 3, 4, 1, 2, 3, 4, 1, 2])
+    assert len(bench.signal(1000)) == 1000
+
+
+def test_quick_run_writes_json(tmp_path, monkeypatch, capsys):
+    # One run per measurement keeps the smoke test short; the sizes are those of --quick
+    monkeypatch.setattr(bench, "measure", functools.partial(bench.measure, min_time=0, min_runs=1))
+    path = str(tmp_path / "results.json")
+    assert bench.main(["--quick", "--json", path]) == 0
+    with open(path) as file:
+        results = json.load(file)
+    assert set(results) == set(bench.BENCHMARKS)
+    assert [row["format"] for row in results["stream"]] == ["ascii", "binary"]
+    assert all(row["samples_per_s"] > 0 for row in results["parse"] + results["stream"])
+    assert [row["points"] for row in results["filter"]] == [10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6]
+    assert "Render time" in capsys.readouterr().out
+
+
+def test_unknown_benchmark_is_rejected():
+    with pytest.raises(SystemExit):
+        bench.main(["plot"])
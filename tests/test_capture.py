@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+
+from scope.__main__ import main
+from scope.capture import capture, save_traces
+from scope.capture_file import write_capture
+from scope.trace import Trace
+
+RATE = 10000.0
+
+
+def square(n=5000, frequency=100.0):
+    """Square wave between 0 and 1 V; rising edges every 1 / ``frequency`` s from 5 ms."""
+    t = np.arange(n) / RATE
+    return Trace(0.0, 1 / RATE, (((t - 0.005) * frequency) % 1.0 < 0.5).astype(np.float64))
+
+
+@pytest.fixture(params=[".txt", ".scp"])
+def capture_path(request, tmp_path):
+    path = str(tmp_path / ("signal" + request.param))
+    if request.param == ".scp":
+        write_capture(path, square(), dtype="float64")
+    else:
+        save_traces(path, [square()])
+    return path
+
+
+def test_file_capture_takes_the_first_samples(capture_path):
+    (trace,) = capture(capture_path, samples=1200)
+    assert len(trace) == 1200 and trace.sample_rate == pytest.approx(RATE)
+    np.testing.assert_allclose(trace.values, square().values[:1200], atol=1e-6)
+    (trace,) = capture(capture_path, seconds=0.05)
+    assert len(trace) == 500
+
+
+def test_file_capture_triggers(capture_path):
+    (frame,) = capture(capture_path, samples=400, trigger="Rising Edge", level=0.5, pre_trigger=0.1)
+    assert len(frame) == 400 and frame.t0 == pytest.approx(-40 / RATE)
+    assert np.all(frame.values[:40] < 0.5) and np.all(frame.values[40:90] > 0.5)
+
+
+def test_file_without_trigger_is_an_error(tmp_path):
+    path = str(tmp_path / "flat.scp")
+    write_capture(path, Trace(0.0, 1 / RATE, np.zeros(1000)))
+    with pytest.raises(ValueError):
+        capture(path, samples=100, trigger="Rising Edge", level=0.5)
+
+
+def test_length_is_required(capture_path):
+    with pytest.raises(ValueError):
+        capture(capture_path)
+    with pytest.raises(ValueError):
+        capture("sim://sine", samples=100)  # No sample rate
+
+
+@pytest.mark.parametrize("realtime", ["1", "0"])
+def test_simulated_capture(realtime):
+    traces = capture(f"sim://sine?realtime={realtime}", samples=2000, sample_rate=RATE, channels=2, timeout=5)
+    assert [len(trace) for trace in traces] == [2000, 2000]
+    assert traces[0].sample_rate == pytest.approx(RATE)
+    assert 0.5 < traces[0].values.min() < traces[0].values.max() < 2.8
+
+
+def test_simulated_capture_triggers():
+    (frame,) = capture("sim://square?frequency=100&realtime=0", samples=1000, sample_rate=RATE,
+                       trigger="Rising Edge", level=1.65, timeout=5)
+    assert len(frame) == 1000 and frame.t0 == pytest.approx(-0.05)
+    assert frame.values[499] < 1.65 < frame.values[500]
+
+
+def test_cli_writes_trigger_frame_and_spectrum(capture_path, tmp_path):
+    output, fft = str(tmp_path / "frame.npz"), str(tmp_path / "fft.csv")
+    code = main([capture_path, "-o", output, "-n", "2048", "--trigger", "rising", "--level", "0.5",
+                 "--fft", fft, "--fft-size", "1024", "--dtype", "float64"])
+    assert code == 0
+    with np.load(output) as archive:
+        assert archive["values"].shape == (2048, 1)
+        assert float(archive["t0"]) == pytest.approx(-1024 / RATE)
+    table = np.loadtxt(fft, delimiter=",", skiprows=1)
+    assert table.shape == (513, 2)
+    assert table[np.argmax(table[1:, 1]) + 1, 0] == pytest.approx(100.0, abs=RATE / 1024)
+
+
+def test_cli_exit_code_on_failure(tmp_path, capsys):
+    output = str(tmp_path / "out.npz")
+    assert main([str(tmp_path / "missing.scp"), "-o", output, "-n", "10"]) == 1
+    assert main(["sim://sine", "-o", output, "-n", "10"]) == 1  # No --rate
+    assert "Capture failed" in capsys.readouterr().err
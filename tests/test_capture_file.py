@@ -0,0 +1,90 @@
+import numpy as np
+
+from scope.capture_file import (CaptureWriter, _parse_text_block, capture_to_text, lines_have_fields, load_text,
+                                load_text_traces, open_capture, text_columns, text_to_capture, write_capture)
+from scope.trace import Trace
+
+
+def test_parse_text_block():
+    times, values = _parse_text_block(b"0 1.5\n\n0.1 2.5\r\n0.2 3.5")
+    np.testing.assert_array_equal(times, [0, 0.1, 0.2])
+    np.testing.assert_array_equal(values, [1.5, 2.5, 3.5])
+
+
+def test_malformed_lines_do_not_pair_up():
+    times, values = _parse_text_block(b"1.0\n2.0 3.0 4.0\n5.0 6.0\n")
+    assert times.tolist() == [5.0] and values.tolist() == [6.0]
+    times, _ = _parse_text_block(b"0 x\n1 2\n")
+    assert times.tolist() == [1.0]
+
+
+def test_lines_have_fields():
+    assert lines_have_fields(b"1 2\n3 4\n", 2)
+    assert lines_have_fields(b"1 2\n\n  \n3\t4", 2)
+    assert not lines_have_fields(b"1\n2 3 4\n", 2)
+    assert lines_have_fields(b"", 2)
+
+
+def test_load_text_in_small_chunks(tmp_path):
+    path = tmp_path / "signal.txt"
+    times = 0.001 * np.arange(1000)
+    np.savetxt(path, np.column_stack((times, np.sin(times))), fmt="%.9g")
+    trace = load_text(str(path), chunk_bytes=97)
+    assert len(trace) == 1000
+    assert abs(trace.dt - 0.001) < 1e-12
+    np.testing.assert_allclose(trace.values, np.sin(times), atol=1e-8)
+
+
+def test_capture_round_trip_is_memory_mapped(tmp_path):
+    path = str(tmp_path / "signal.scp")
+    trace = Trace(2.0, 0.5, np.linspace(-1, 1, 5000))
+    write_capture(path, trace)
+    capture = open_capture(path)
+    assert len(capture) == 5000 and capture.t0 == 2.0 and capture.sample_rate == 2.0
+    assert isinstance(capture.values(), np.memmap)
+    np.testing.assert_allclose(capture.values(), trace.values, atol=1e-6)
+
+
+def test_multi_channel_integer_capture(tmp_path):
+    path = str(tmp_path / "codes.scp")
+    codes = np.arange(200, dtype=np.float64).reshape(100, 2)
+    with CaptureWriter(path, 1000.0, channels=2, dtype="int16", gain=0.5, offset=1.0) as writer:
+        writer.write(codes)
+    capture = open_capture(path)
+    assert capture.channels == 2
+    np.testing.assert_allclose(np.asarray(capture.values(1)), codes[:, 1] * 0.5 + 1.0)
+
+
+def test_text_capture_conversion(tmp_path):
+    txt, scp, back = (str(tmp_path / name) for name in ("a.txt", "a.scp", "b.txt"))
+    times = 0.01 * np.arange(300)
+    np.savetxt(txt, np.column_stack((times, times * 2)), fmt="%.9g")
+    text_to_capture(txt, scp)
+    capture_to_text(scp, back)
+    np.testing.assert_allclose(load_text(back).values, times * 2, atol=1e-5)
+
+
+def test_multi_column_text(tmp_path):
+    txt, scp = str(tmp_path / "a.txt"), str(tmp_path / "a.scp")
+    times = 0.01 * np.arange(300)
+    np.savetxt(txt, np.column_stack((times, times * 2, times * 3)), fmt="%.9g")
+    assert text_columns(txt) == 3
+    traces = load_text_traces(txt, chunk_bytes=100)
+    assert len(traces) == 2
+    np.testing.assert_allclose(traces[1].values, times * 3)
+    text_to_capture(txt, scp)
+    capture = open_capture(scp)
+    assert capture.channels == 2
+    np.testing.assert_allclose(capture.values(1), times * 3, atol=1e-5)
+
+
+def test_header_lines_are_skipped(tmp_path):
+    path = tmp_path / "header.txt"
+    times = 0.01 * np.arange(100)
+    with open(path, "w") as file:
+        file.write("Time (s) Voltage (V)\n# exported by hand\n\n")
+        np.savetxt(file, np.column_stack((times, times * 2)), fmt="%.9g")
+    assert text_columns(str(path)) == 2
+    traces = load_text_traces(str(path))
+    assert len(traces) == 1 and len(traces[0]) == 100
+    np.testing.assert_allclose(traces[0].values, times * 2)
@@ -0,0 +1,49 @@
+import numpy as np
+
+from scope.decimation import Decimator, minmax_decimate, visible_range
+from scope.lod import MinMaxPyramid
+from scope.trace import Trace
+
+
+def test_visible_range_keeps_one_sample_beyond_each_edge():
+    trace = Trace(0.0, 0.1, np.zeros(100))
+    assert visible_range(trace, 1.0, 2.0) == (9, 22)
+    assert visible_range(trace, -np.inf, np.inf) == (0, 100)
+    assert visible_range(trace, 50.0, 60.0) == (100, 100)
+
+
+def test_short_ranges_are_not_decimated():
+    trace = Trace(1.0, 0.5, np.arange(10.0))
+    x, y, decimated = minmax_decimate(trace, 2, 8, width=100)
+    assert not decimated
+    np.testing.assert_array_equal(x, 1.0 + 0.5 * np.arange(2, 8))
+    np.testing.assert_array_equal(y, np.arange(2, 8))
+
+
+def test_glitches_survive_decimation():
+    values = np.zeros(100000)
+    values[54321] = 5.0
+    values[77777] = -3.0
+    x, y, decimated = minmax_decimate(Trace(0.0, 1.0, values), 0, len(values), width=500)
+    assert decimated and len(y) <= 2 * 502
+    assert y.max() == 5.0 and y.min() == -3.0
+
+
+def test_pyramid_envelope_matches_raw_decimation_extremes():
+    rng = np.random.default_rng(3)
+    values = rng.normal(size=200000)
+    trace = Trace(0.0, 1e-3, values)
+    pyramid = MinMaxPyramid.build(values, base=16)
+    _, raw, _ = minmax_decimate(trace, 1000, 190000, 300)
+    _, fast, decimated = minmax_decimate(trace, 1000, 190000, 300, pyramid=pyramid)
+    assert decimated
+    assert fast.max() >= raw.max() and fast.min() <= raw.min()
+    assert fast.max() == values[1000 - 1000 % 16:].max()
+
+
+def test_decimator_skips_unchanged_views():
+    trace = Trace(0.0, 1.0, np.arange(10000.0))
+    decimator = Decimator()
+    assert decimator.update(trace, 0, 5000, 100, version=1) is not None
+    assert decimator.update(trace, 0, 5000, 100, version=1) is None
+    assert decimator.update(trace, 0, 5000, 100, version=2) is not None
@@ -0,0 +1,107 @@
+import numpy as np
+import pytest
+
+from scope.acquisition import Channel
+from scope.capture import load_traces
+from scope.capture_file import open_capture, write_capture
+from scope.export import ExportJob, export_traces, snapshot
+from scope.sample_buffer import SampleBuffer, TraceBuffer
+from scope.shared_ring import SharedRing, SharedRingBuffer
+from scope.trace import Trace
+
+
+def traces(n=1000, channels=2):
+    return [Trace(0.5, 1e-3, np.sin(np.arange(n) * 0.01 * (i + 1))) for i in range(channels)]
+
+
+def test_csv_has_header_and_time_column(tmp_path):
+    path = str(tmp_path / "out.csv")
+    assert export_traces(path, traces(100), names=["a", "b"])
+    with open(path) as file:
+        assert file.readline().strip() == "time,a,b"
+    table = np.loadtxt(path, delimiter=",", skiprows=1)
+    assert table.shape == (100, 3)
+    np.testing.assert_allclose(table[:, 0], 0.5 + 1e-3 * np.arange(100))
+
+
+def test_npz_round_trip(tmp_path):
+    path = str(tmp_path / "out.npz")
+    source = traces(3000)
+    assert export_traces(path, source, dtype="float64", chunk=512)
+    archive = np.load(path)
+    np.testing.assert_array_equal(archive["values"], np.column_stack([t.values for t in source]))
+    assert float(archive["dt"]) == 1e-3
+
+
+def test_traces_are_aligned_on_the_newest_samples(tmp_path):
+    path = str(tmp_path / "out.npz")
+    long, short = Trace(0.0, 1.0, np.arange(10.0)), Trace(5.0, 1.0, np.arange(5.0))
+    export_traces(path, [long, short], dtype="float64")
+    archive = np.load(path)
+    np.testing.assert_array_equal(archive["values"][:, 0], np.arange(5.0, 10.0))
+    assert float(archive["t0"]) == 5.0
+
+
+def test_cancelled_export_removes_the_file(tmp_path):
+    path = tmp_path / "out.csv"
+    calls = []
+    assert not export_traces(str(path), traces(5000), chunk=1000, progress=calls.append,
+                             cancelled=lambda: len(calls) >= 2)
+    assert not path.exists()
+
+
+def test_unknown_extension_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        export_traces(str(tmp_path / "out.xyz"), traces())
+
+
+def test_job_reports_any_failure():
+    def fail(progress, cancelled):
+        raise TypeError("unexpected")
+
+    job = ExportJob(fail).start()
+    job.join(1.0)
+    assert not job.completed
+    assert isinstance(job.error, TypeError)
+
+
+def test_job_reports_progress_and_completion(tmp_path):
+    path = str(tmp_path / "out.scp")
+    job = ExportJob(lambda progress, cancelled: export_traces(path, traces(), progress=progress,
+                                                              cancelled=cancelled, chunk=100)).start()
+    job.join(5.0)
+    assert job.completed and job.error is None and job.progress == 1.0
+
+
+def test_multi_channel_text_reopens_every_channel(tmp_path):
+    path = str(tmp_path / "out.txt")
+    source = traces(1000, channels=2)
+    export_traces(path, source)
+    loaded = load_traces(path)
+    assert len(loaded) == 2
+    for trace, original in zip(loaded, source):
+        assert len(trace) == 1000
+        assert abs(trace.t0 - 0.5) < 1e-9 and abs(trace.dt - 1e-3) < 1e-9
+        np.testing.assert_allclose(trace.values, original.values, atol=1e-8)
+
+
+def test_snapshot_copies_live_buffers_and_keeps_recordings_mapped(tmp_path):
+    path = str(tmp_path / "rec.scp")
+    write_capture(path, Trace(0.0, 1e-3, np.arange(5000.0)))
+    recording = open_capture(path).trace()
+    live = SampleBuffer(100, dt=1e-3)
+    live.extend(np.arange(250.0))
+    ring = SharedRing(100)
+    try:
+        shared = SharedRingBuffer(ring, 0, dt=1e-3)
+        ring.write(np.arange(150.0).reshape(-1, 1))
+        shared.ingest(0, np.arange(150.0))
+        traces = snapshot([Channel("rec", TraceBuffer(recording, lod=False)), Channel("live", live),
+                           Channel("shared", shared)])
+        assert traces[0].values is recording.values
+        live.extend(np.zeros(100))
+        np.testing.assert_array_equal(traces[1].values, np.arange(150.0, 250.0))
+        assert abs(traces[1].t0 - 0.15) < 1e-12
+        np.testing.assert_array_equal(traces[2].values, np.arange(50.0, 150.0))
+    finally:
+        ring.close()
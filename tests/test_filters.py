@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+from scipy.signal import sosfilt, sosfilt_zi
+
+from scope.filters import ButterworthStage, FilterChain, MovingAverageStage
+
+
+def test_streaming_butterworth_matches_one_pass():
+    rng = np.random.default_rng(4)
+    values = rng.normal(size=5000) + 1.0
+    stage = ButterworthStage("lowpass", 4, 50.0, 1000.0)
+    streamed = np.concatenate([stage.process(block) for block in np.array_split(values, 17)])
+    whole, _ = sosfilt(stage.sos, values, zi=sosfilt_zi(stage.sos) * values[0])
+    np.testing.assert_allclose(streamed, whole, atol=1e-12)
+
+
+def test_cutoff_must_be_below_nyquist():
+    with pytest.raises(ValueError):
+        ButterworthStage("lowpass", 4, 600.0, 1000.0)
+
+
+def test_moving_average_across_blocks():
+    values = np.arange(20.0)
+    stage = MovingAverageStage(4)
+    streamed = np.concatenate([stage.process(values[:7]), stage.process(values[7:])])
+    expected = [values[max(0, i - 3):i + 1].mean() for i in range(20)]
+    np.testing.assert_allclose(streamed, expected)
+
+
+def test_chain_bridges_nan_gaps():
+    values = np.ones(100)
+    values[40:50] = np.nan
+    chain = FilterChain([MovingAverageStage(5)])
+    out = chain.process(values)
+    assert np.isnan(out[40:50]).all()
+    np.testing.assert_allclose(out[~np.isnan(values)], 1.0)
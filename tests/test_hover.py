@@ -0,0 +1,24 @@
+import numpy as np
+
+from scope.hover import nearest_sample
+from scope.trace import Trace
+
+
+def test_nearest_sample_in_pixels():
+    trace = Trace(0.0, 1.0, np.arange(100.0))
+    index, distance = nearest_sample(trace, 10.2, 10.0, pixel_size=(0.1, 0.1))
+    assert index == 10 and abs(distance - 2.0) < 1e-9
+
+
+def test_nothing_within_the_radius():
+    trace = Trace(0.0, 1.0, np.zeros(100))
+    assert nearest_sample(trace, 50.0, 5.0, pixel_size=(0.1, 0.1)) is None
+    assert nearest_sample(trace, 500.0, 0.0, pixel_size=(0.1, 0.1)) is None
+    assert nearest_sample(Trace(0.0, 1.0, np.empty(0)), 0.0, 0.0, pixel_size=(1, 1)) is None
+
+
+def test_gaps_cannot_be_hovered():
+    values = np.zeros(10)
+    values[5] = np.nan
+    index, _ = nearest_sample(Trace(0.0, 1.0, values), 5.0, 0.0, pixel_size=(0.5, 0.01))
+    assert index in (4, 6)
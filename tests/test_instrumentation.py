@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from scope.instrumentation import RateMeter, StageTimer
+
+
+def test_summary_over_the_history_window():
+    timer = StageTimer(history=3)
+    assert np.isnan(timer.mean("draw")) and timer.summary() == {}
+    for wall in (0.010, 0.001, 0.002, 0.003):
+        timer.record("draw", wall, cpu=wall / 2)
+    summary = timer.summary()["draw"]
+    assert summary["runs"] == 4  # Counts every run, the statistics only the last three
+    assert summary["mean"] == pytest.approx(0.002) and summary["max"] == pytest.approx(0.003)
+    assert summary["cpu"] == pytest.approx(0.001)
+    assert timer.mean("draw") == pytest.approx(0.002)
+    assert timer.stages == ["draw"]
+
+
+def test_stage_records_even_when_it_raises():
+    timer = StageTimer()
+    with timer.stage("parse"):
+        pass
+    with pytest.raises(KeyError):
+        with timer.stage("parse"):
+            raise KeyError
+    summary = timer.summary()["parse"]
+    assert summary["runs"] == 2 and 0 <= summary["mean"] <= summary["max"] < 1
+    timer.reset()
+    assert timer.stages == []
+
+
+def test_rate_meter_smooths_the_rate():
+    meter = RateMeter(smoothing=0.5)
+    assert meter.update(0, now=10.0) == 0.0  # No interval yet
+    assert meter.update(1000, now=11.0) == pytest.approx(500.0)
+    assert meter.update(3000, now=12.0) == pytest.approx(1250.0)
+    assert meter.update(3000, now=12.0) == pytest.approx(1250.0)  # No time has passed
+    assert meter.update(0, now=13.0) == pytest.approx(625.0)  # A reset counter counts as no samples
+    meter.reset()
+    assert meter.rate == 0.0 and meter.update(100, now=20.0) == 0.0
@@ -0,0 +1,67 @@
+import numpy as np
+
+from scope.lod import MinMaxPyramid
+from scope.ring_buffer import RingBuffer
+
+
+def brute_stats(values):
+    return float(np.nanmin(values)), float(np.nanmax(values)), float(np.nanmean(values))
+
+
+def test_stats_match_the_samples_while_streaming():
+    rng = np.random.default_rng(1)
+    capacity = 5000
+    ring = RingBuffer(capacity)
+    pyramid = MinMaxPyramid(capacity, base=16, factor=4)
+    for _ in range(40):
+        block = rng.normal(size=int(rng.integers(1, 700)))
+        ring.extend(block)
+        pyramid.extend(block)
+        for _ in range(5):
+            a = int(rng.integers(ring.first_index, ring.total))
+            b = int(rng.integers(a + 1, ring.total + 1))
+            np.testing.assert_allclose(pyramid.stats(a, b, read_raw=ring.read), brute_stats(ring.read(a, b)))
+
+
+def test_append_matches_extend():
+    values = np.sin(np.arange(1000) * 0.1)
+    a, b = MinMaxPyramid(1000, base=8), MinMaxPyramid(1000, base=8)
+    for value in values:
+        a.append(value)
+    b.extend(values)
+    a.extend([])  # Flushes the samples still pending
+    assert a.indexed == b.indexed
+    assert a.stats(0, 1000, read_raw=lambda s, e: values[s:e]) == b.stats(0, 1000, read_raw=lambda s, e: values[s:e])
+
+
+def test_nan_gaps_are_ignored_by_the_extrema():
+    values = np.arange(512, dtype=np.float64)
+    values[100:200] = np.nan
+    pyramid = MinMaxPyramid.build(values, base=16)
+    lo, hi, _ = pyramid.stats(0, 512, read_raw=lambda s, e: values[s:e])
+    assert (lo, hi) == (0.0, 511.0)
+
+
+def test_envelope_bounds_every_bucket():
+    rng = np.random.default_rng(2)
+    values = rng.normal(size=100000)
+    pyramid = MinMaxPyramid.build(values, base=16, factor=4)
+    edges, mins, maxs, end = pyramid.envelope(1234, 98765, 200)
+    assert edges[0] <= 1234 < edges[1] and end >= 98765
+    bounds = np.append(edges, end)
+    for k in range(len(edges)):
+        chunk = values[bounds[k]:bounds[k + 1]]
+        assert mins[k] == chunk.min() and maxs[k] == chunk.max()
+
+
+def test_memory_budget_enlarges_the_base_block():
+    pyramid = MinMaxPyramid(1 << 24, base=64, memory_budget=1 << 20)
+    assert pyramid.base > 64
+
+
+def test_nan_gaps_do_not_pull_the_mean_down():
+    values = np.full(4096, 2.0)
+    values[1000:3000] = np.nan
+    pyramid = MinMaxPyramid.build(values, base=16, factor=4)
+    assert pyramid.stats(0, 4096, read_raw=lambda s, e: values[s:e]) == (2.0, 2.0, 2.0)
+    assert pyramid.stats(1024, 2048, read_raw=lambda s, e: values[s:e]) is None
@@ -0,0 +1,45 @@
+import numpy as np
+
+from scope.measurements import MeasurementEngine, amplitude, edges, timing
+from scope.trace import Trace
+
+
+def square(n, period, duty=0.5, low=0.0, high=3.3):
+    return np.where((np.arange(n) % period) < duty * period, high, low)
+
+
+def test_amplitude_ignores_gaps():
+    values = np.array([-1.0, 1.0, np.nan, 1.0, -1.0])
+    assert amplitude(values) == {"Vpp": 2.0, "Mean": 0.0, "RMS": 1.0}
+    assert amplitude(np.full(3, np.nan)) == {}
+
+
+def test_timing_of_a_square_wave():
+    result = timing(square(10000, period=100, duty=0.25), dt=1e-4)
+    assert abs(result["Frequency"] - 100.0) < 1e-6
+    assert abs(result["Period"] - 0.01) < 1e-9
+    assert abs(result["Duty Cycle"] - 25.0) < 0.5
+
+
+def test_timing_needs_two_cycles():
+    assert timing(square(150, period=100), dt=1e-4) == {}
+    assert timing(np.ones(1000), dt=1e-4) == {}
+
+
+def test_rise_and_fall_times_of_a_trapezoid():
+    ramp = np.linspace(0.0, 1.0, 11)  # 10 samples from 0 to 1
+    cycle = np.concatenate((ramp, np.ones(40), ramp[::-1], np.zeros(40)))
+    result = edges(np.tile(cycle, 5), dt=1.0)
+    assert abs(result["Rise Time"] - 8.0) < 1e-9
+    assert abs(result["Fall Time"] - 8.0) < 1e-9
+
+
+def test_engine_statistics_and_caching():
+    engine = MeasurementEngine()
+    trace = Trace(0.0, 1e-4, square(5000, period=50))
+    first = engine.update(trace, key=1)
+    assert engine.update(trace, key=1) is first
+    engine.update(trace, key=2)
+    assert engine.acquisitions == 2
+    lo, hi, mean, std = engine.statistics("Frequency")
+    assert abs(mean - 200.0) < 1e-6 and std < 1e-9
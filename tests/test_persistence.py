@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+from scope.persistence import PersistenceMap
+
+
+def test_hits_are_binned_by_time_and_voltage():
+    persistence = PersistenceMap(100, t0=0.0, dt=1.0, v_range=(0.0, 1.0), columns=10, rows=4, persistence=np.inf)
+    frames = np.zeros((3, 100))
+    frames[:, 50:] = 0.9
+    persistence.add(frames, now=0.0)
+    assert persistence.frames == 3
+    assert persistence.hits.sum() == 300
+    assert persistence.hits[0, 0] == 30 and persistence.hits[9, 3] == 30
+
+
+def test_out_of_range_and_gaps():
+    persistence = PersistenceMap(10, t0=0.0, dt=1.0, v_range=(0.0, 1.0), columns=10, rows=4)
+    frame = np.full(10, 0.5)
+    frame[0] = 5.0
+    frame[1] = np.nan
+    persistence.add(frame, now=0.0)
+    assert persistence.clipped == 1
+    assert persistence.hits[0, 3] == 1  # Drawn on the edge row
+    assert persistence.hits[1].sum() == 0
+
+
+def test_hits_decay():
+    persistence = PersistenceMap(10, t0=0.0, dt=1.0, v_range=(0.0, 1.0), persistence=1.0)
+    persistence.add(np.full(10, 0.5), now=0.0)
+    persistence.decay(now=1.0)
+    assert abs(persistence.hits.sum() - 10 * np.exp(-1.0)) < 1e-5
+    image = persistence.intensity()
+    assert image.max() == pytest.approx(1.0)
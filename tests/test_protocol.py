@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+
+from scope.acquisition import SerialReader
+from scope.protocol import DEFAULT_GAIN, FrameDecoder, encode_frame, encode_frames
+from scope.simulator import SimulatedSerial
+
+
+def feed_in_chunks(decoder, data, rng):
+    seqs, volts = [], []
+    pos = 0
+    while pos < len(data):
+        size = int(rng.integers(1, 3 * decoder.frame_size))
+        s, v = decoder.feed(data[pos:pos + size])
+        seqs.append(s)
+        volts.append(v)
+        pos += size
+    return np.concatenate(seqs), np.concatenate(volts)
+
+
+def test_round_trip():
+    codes = np.arange(4 * 16, dtype=np.uint16).reshape(4, 16)
+    decoder = FrameDecoder(samples_per_frame=16)
+    seqs, volts = decoder.feed(encode_frames(7, codes))
+    assert seqs.tolist() == [7, 8, 9, 10]
+    np.testing.assert_allclose(volts, codes.ravel() * DEFAULT_GAIN)
+    assert decoder.frames_ok == 4
+    assert decoder.frames_corrupt == decoder.frames_dropped == 0
+
+
+def test_encode_frames_matches_encode_frame():
+    codes = np.arange(3 * 8, dtype=np.uint16).reshape(3, 8)
+    assert encode_frames(5, codes) == b"".join(encode_frame(5 + i, row) for i, row in enumerate(codes))
+
+
+def test_partial_frames_are_kept_between_calls():
+    data = encode_frames(0, np.ones((2, 16), dtype=np.uint16))
+    decoder = FrameDecoder(samples_per_frame=16)
+    seqs, _ = decoder.feed(data[:10])
+    assert len(seqs) == 0
+    seqs, _ = decoder.feed(data[10:])
+    assert seqs.tolist() == [0, 1]
+
+
+def test_garbage_and_bad_crc_are_skipped():
+    codes = np.full((3, 16), 100, dtype=np.uint16)
+    frames = bytearray(encode_frames(0, codes))
+    size = len(frames) // 3
+    frames[size + 5] ^= 0xFF  # Corrupt the second frame
+    decoder = FrameDecoder(samples_per_frame=16)
+    seqs, volts = decoder.feed(b"\x00\xa5\x5a\x01garbage" + bytes(frames))
+    assert seqs.tolist() == [0, 2]
+    assert decoder.frames_corrupt == 1
+    assert decoder.frames_dropped == 1
+    assert decoder.bytes_skipped > 0
+    np.testing.assert_allclose(volts, 100 * DEFAULT_GAIN)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_fuzz_corrupted_stream_in_random_chunks(seed):
+    rng = np.random.default_rng(seed)
+    source = SimulatedSerial("square", protocol="binary", errors=rng.uniform(0.2, 1.0), realtime=False,
+                             timeout=0, seed=seed)
+    data = source.read(1 << 16)
+    decoder = FrameDecoder()
+    seqs, volts = feed_in_chunks(decoder, data, rng)
+    assert len(volts) == len(seqs) * decoder.samples_per_frame
+    assert np.all(np.diff(seqs.astype(np.int64)) > 0)
+    assert decoder.frames_ok + decoder.frames_corrupt <= len(data) // decoder.frame_size
+    assert np.all((volts >= 0) & (volts <= 4095 * DEFAULT_GAIN + 1e-9))
+
+
+class FailingSerial:
+    in_waiting = 0
+
+    def read(self, size):
+        raise TypeError("decoder failure")
+
+    def isOpen(self):
+        return False
+
+
+def test_reader_reports_unexpected_errors():
+    reader = SerialReader("sim://sine", 115200, 1000, capacity=1024, binary=True)
+    reader.ser = FailingSerial()
+    reader._running = True
+    reader._run()
+    assert isinstance(reader.error, TypeError)
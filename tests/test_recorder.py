@@ -0,0 +1,58 @@
+import threading
+import time
+
+import numpy as np
+
+from scope.capture_file import open_capture
+from scope.recorder import StreamRecorder
+
+
+def test_records_contiguous_blocks_to_one_file(tmp_path):
+    recorder = StreamRecorder(str(tmp_path), sample_rate=1000.0)
+    recorder.start()
+    for i in range(10):
+        assert recorder.submit(i * 100, np.arange(i * 100, (i + 1) * 100))
+    recorder.stop()
+    assert recorder.error is None
+    assert len(recorder.files) == 1
+    assert recorder.samples_written == 1000
+    np.testing.assert_array_equal(open_capture(recorder.files[0]).values(), np.arange(1000))
+
+
+def test_rotates_on_discontinuity(tmp_path):
+    recorder = StreamRecorder(str(tmp_path), sample_rate=1000.0)
+    recorder.start()
+    recorder.submit(0, np.zeros(100))
+    recorder.submit(500, np.ones(100))
+    recorder.stop()
+    assert len(recorder.files) == 2
+    assert open_capture(recorder.files[1]).t0 == 0.5
+
+
+def test_full_queue_drops_blocks(tmp_path):
+    recorder = StreamRecorder(str(tmp_path), sample_rate=1000.0, queue_blocks=2)
+    assert recorder.submit(0, np.zeros(10))
+    assert recorder.submit(10, np.zeros(10))
+    assert not recorder.submit(20, np.zeros(10))
+    assert recorder.blocks_dropped == 1
+
+
+def test_stop_does_not_hang_after_writer_failure(tmp_path):
+    recorder = StreamRecorder(str(tmp_path), sample_rate=1000.0, queue_blocks=4)
+    failed = threading.Event()
+
+    def fail(blocks):
+        failed.set()
+        raise MemoryError("disk full")
+
+    recorder._write_batch = fail
+    recorder.start()
+    recorder.submit(0, np.zeros(10))
+    assert failed.wait(1.0)
+    recorder._thread.join(1.0)
+    while recorder.submit(0, np.zeros(10)):
+        pass
+    started = time.monotonic()
+    recorder.stop()
+    assert time.monotonic() - started < 0.5
+    assert isinstance(recorder.error, MemoryError)
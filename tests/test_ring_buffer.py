@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from scope.ring_buffer import RingBuffer
+
+
+def test_wraparound_keeps_the_newest_items_in_order():
+    ring = RingBuffer(8)
+    for start in range(0, 30, 3):
+        ring.extend(np.arange(start, start + 3))
+    assert len(ring) == 8 and ring.total == 30 and ring.first_index == 22
+    np.testing.assert_array_equal(ring.view(), np.arange(22, 30))
+    np.testing.assert_array_equal(ring.view(3), [27, 28, 29])
+    # The view is a contiguous slice of the storage, not a copy
+    assert ring.view().base is ring._buf
+
+
+def test_append_matches_extend():
+    a, b = RingBuffer(5), RingBuffer(5)
+    for value in range(13):
+        a.append(value)
+    b.extend(np.arange(13))
+    np.testing.assert_array_equal(a.view(), b.view())
+    assert a.total == b.total == 13
+
+
+def test_extend_larger_than_capacity():
+    ring = RingBuffer(4)
+    ring.extend([1, 2])
+    ring.extend(np.arange(10))
+    np.testing.assert_array_equal(ring.view(), [6, 7, 8, 9])
+    assert ring.total == 12
+
+
+def test_read_by_absolute_index_is_clipped():
+    ring = RingBuffer(10)
+    ring.extend(np.arange(25))
+    np.testing.assert_array_equal(ring.read(17, 20), [17, 18, 19])
+    np.testing.assert_array_equal(ring.read(0, 18), np.arange(15, 18))
+    np.testing.assert_array_equal(ring.read(23, 100), [23, 24])
+    assert len(ring.read(30, 40)) == 0
+
+
+def test_clear_continues_numbering():
+    ring = RingBuffer(4)
+    ring.extend(np.arange(6))
+    ring.clear(100)
+    assert len(ring) == 0 and ring.first_index == 100
+    ring.append(1.0)
+    assert ring.read(100, 101).tolist() == [1.0]
+
+
+def test_capacity_must_be_positive():
+    with pytest.raises(ValueError):
+        RingBuffer(0)
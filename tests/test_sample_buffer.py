@@ -0,0 +1,61 @@
+import numpy as np
+
+from scope.sample_buffer import SampleBuffer, TraceBuffer
+from scope.sample_clock import SampleClock
+from scope.trace import Trace
+
+
+def test_trace_buffer_reads_and_clears():
+    buffer = TraceBuffer(Trace(1.0, 0.5, np.arange(100, dtype=np.float64)))
+    assert len(buffer) == buffer.total == 100
+    trace = buffer.read(10, 20)
+    assert trace.t0 == 6.0
+    np.testing.assert_array_equal(trace.values, np.arange(10, 20))
+    assert buffer.stats() == (0.0, 99.0, 49.5)
+
+    buffer.clear()
+    assert len(buffer) == buffer.total == 0
+    assert len(buffer.trace()) == 0
+    assert len(buffer.trace(10)) == 0
+    assert buffer.stats() is None
+
+
+def test_sample_buffer_keeps_times_and_index_across_wraps():
+    buffer = SampleBuffer(1000, dt=0.01, t0=2.0, lod=True)
+    for start in range(0, 5000, 300):
+        buffer.extend(np.arange(start, min(start + 300, 5000), dtype=np.float64))
+    assert len(buffer) == 1000 and buffer.first_index == 4000
+    trace = buffer.trace(10)
+    assert abs(trace.t0 - (2.0 + 4990 * 0.01)) < 1e-9
+    np.testing.assert_array_equal(trace.values, np.arange(4990, 5000))
+    assert buffer.stats(4100, 4900) == (4100.0, 4899.0, 4499.5)
+
+
+def test_clear_in_the_middle_of_a_stream_keeps_numbering():
+    clock = SampleClock(1000.0)
+    buffer = SampleBuffer(10000, dt=clock.dt, lod=True)
+    signal = np.arange(20000, dtype=np.float64)
+    for block in np.array_split(signal[:5003], 7):
+        buffer.extend(clock.place_samples(block)[1])
+    t_end = buffer.trace().t_end
+    buffer.clear()
+    assert len(buffer) == 0 and buffer.total == buffer.first_index == 5003
+    for block in np.array_split(signal[5003:], 11):
+        buffer.extend(clock.place_samples(block)[1])
+    assert buffer.total == clock.next_index == 20000
+    assert buffer.trace().t_end > t_end
+    assert abs(buffer.trace().t_end - clock.time_of(19999)) < 1e-9
+    # Sample values equal their absolute index, so every statistic is checkable
+    assert buffer.stats() == (10000.0, 19999.0, 14999.5)
+    assert buffer.stats(10003, 19000) == (10003.0, 18999.0, 14501.0)
+    trace = buffer.read(12000, 12010)
+    np.testing.assert_array_equal(trace.values, np.arange(12000, 12010))
+
+
+def test_clear_before_the_buffer_wraps():
+    buffer = SampleBuffer(100000, lod=True)
+    buffer.extend(np.full(777, 5.0))
+    buffer.clear()
+    buffer.extend(np.arange(777, 9000, dtype=np.float64))
+    assert buffer.stats() == (777.0, 8999.0, (777 + 8999) / 2)
+    assert buffer.stats(800, 4000) == (800.0, 3999.0, 2399.5)
@@ -0,0 +1,47 @@
+import numpy as np
+
+from scope.sample_clock import SampleClock
+
+
+def test_consecutive_samples_get_consecutive_indices():
+    clock = SampleClock(1000.0)
+    assert clock.place_samples(np.zeros(5))[0] == 0
+    assert clock.place_samples(np.zeros(3))[0] == 5
+    assert clock.next_index == 8
+    assert clock.time_of(500) == 0.5
+
+
+def test_lost_frames_become_nan_gaps():
+    clock = SampleClock(1000.0, samples_per_frame=4)
+    values = np.arange(12.0)
+    first, placed = clock.place_frames([10, 11, 14], values)
+    assert first == 0 and len(placed) == 5 * 4
+    np.testing.assert_array_equal(placed[:8], np.arange(8.0))
+    assert np.isnan(placed[8:16]).all()
+    np.testing.assert_array_equal(placed[16:], np.arange(8.0, 12.0))
+    assert list(clock.gaps) == [(8, 8)] and clock.samples_missing == 8
+    first, placed = clock.place_frames([15], np.zeros(4))
+    assert first == 20 and len(placed) == 4
+
+
+def test_interleaved_channels_keep_their_shape():
+    clock = SampleClock(1000.0, samples_per_frame=2)
+    _, placed = clock.place_frames([0, 2], np.ones((4, 2)))
+    assert placed.shape == (6, 2)
+    assert np.isnan(placed[2:4]).all()
+
+
+def test_device_restart_does_not_create_a_gap():
+    clock = SampleClock(1000.0, samples_per_frame=1)
+    clock.place_frames([100, 101], np.zeros(2))
+    first, placed = clock.place_frames([0, 1], np.zeros(2))
+    assert first == 2 and len(placed) == 2 and clock.samples_missing == 0
+
+
+def test_drift_estimate():
+    clock = SampleClock(1000.0)
+    for k in range(64):
+        clock.place_samples(np.zeros(100))
+        # The host sees 100 ppm more time pass than the device reports
+        clock.observe(5.0 + (k + 1) * 0.1 * (1 + 100e-6))
+    assert abs(clock.drift_ppm - 100.0) < 1.0
@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from scope.segments import SegmentStore
+from scope.trace import Trace
+from scope.trigger import TriggerFrame
+
+
+def test_oldest_segments_are_evicted():
+    store = SegmentStore(4, dt=0.5, pre_samples=1, max_segments=3)
+    for i in range(5):
+        store.add(np.full(4, i), index=10 * i, time=i)
+    assert len(store) == 3 and store.first_index == 2 and store.total == 5
+    np.testing.assert_array_equal(store.values()[:, 0], [2, 3, 4])
+    np.testing.assert_array_equal(store.times(), [2, 3, 4])
+    trace, meta = store.segment(3)
+    assert trace.t0 == -0.5 and meta["index"] == 30
+    with pytest.raises(IndexError):
+        store.segment(1)
+
+
+def test_capacity_limited_by_memory_budget():
+    store = SegmentStore(1000, dt=1.0, max_segments=1000, budget_bytes=40000)
+    assert store.capacity == 10
+    with pytest.raises(ValueError):
+        SegmentStore(1000, dt=1.0, budget_bytes=100)
+
+
+def test_forced_frames_are_skipped():
+    store = SegmentStore(2, dt=1.0)
+    store.add_frames([TriggerFrame(5, Trace(0, 1, np.ones(2)), False),
+                      TriggerFrame(9, Trace(0, 1, np.ones(2)), True)], t0=100.0)
+    assert len(store) == 1 and store.times().tolist() == [105.0]
+
+
+def test_save_and_load_keep_numbering(tmp_path):
+    store = SegmentStore(3, dt=0.1, pre_samples=1, max_segments=2)
+    for i in range(3):
+        store.add(np.arange(3) + i, index=i, time=i * 0.1, wall=1000.0 + i)
+    path = str(tmp_path / "segments.npz")
+    store.save(path)
+    loaded = SegmentStore.load(path)
+    assert loaded.first_index == 1 and loaded.total == 3
+    np.testing.assert_array_equal(loaded.values(), store.values())
+    assert loaded.segment(2)[1] == store.segment(2)[1]
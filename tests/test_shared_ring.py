@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from scope.shared_ring import SharedRing, SharedRingBuffer
+
+
+@pytest.fixture
+def ring():
+    ring = SharedRing(8, channels=2)
+    yield ring
+    ring.close()
+
+
+def test_write_and_read_across_the_wrap(ring):
+    for start in range(0, 20, 5):
+        ring.write(np.column_stack((np.arange(start, start + 5), -np.arange(start, start + 5))))
+    assert ring.total == 20
+    first, rows = ring.read(0, 20)
+    assert first == 12
+    np.testing.assert_array_equal(rows[:, 0], np.arange(12, 20))
+    np.testing.assert_array_equal(rows[:, 1], -np.arange(12, 20))
+    first, values = ring.read(15, 18, channel=0)
+    assert first == 15 and values.tolist() == [15, 16, 17]
+
+
+def test_attach_by_name(ring):
+    other = SharedRing(name=ring.name)
+    try:
+        ring.write(np.ones((3, 2)))
+        ring.set_stats(drift_ppm=12.5)
+        assert other.total == 3 and other.channels == 2
+        assert other.stats()["drift_ppm"] == 12.5
+    finally:
+        other.close()
+
+
+def test_ring_buffer_view_of_one_channel(ring):
+    buffer = SharedRingBuffer(ring, 1, dt=0.5)
+    ring.write(np.column_stack((np.zeros(6), np.arange(6.0))))
+    buffer.ingest(0, np.arange(6.0))
+    assert len(buffer) == 6 and buffer.total == 6
+    np.testing.assert_array_equal(buffer.trace().values, np.arange(6.0))
+    assert buffer.read(2, 4).t0 == 1.0
+    assert buffer.stats(0, 6) == (0.0, 5.0, 2.5)
@@ -0,0 +1,36 @@
+import numpy as np
+
+from scope.sample_buffer import SampleBuffer
+from scope.spectrum import SpectrumAnalyzer
+
+
+def test_sine_amplitude_and_frequency():
+    dt = 1e-3
+    values = 2.0 * np.sin(2 * np.pi * 125.0 * dt * np.arange(8192))
+    analyzer = SpectrumAnalyzer(frame_size=1024, window_name="Flat-top", averaging="None")
+    freqs, spectrum = analyzer.analyze(values, dt)
+    peak = int(np.argmax(spectrum))
+    assert freqs[peak] == 125.0
+    assert abs(spectrum[peak] - 2.0) < 0.01
+
+
+def test_exponential_average_weights_frames_in_order():
+    n = 64
+    frames = [np.full(n, level) for level in (1.0, 2.0, 3.0)]  # DC levels, one frame each
+    analyzer = SpectrumAnalyzer(frame_size=n, overlap=0.0, window_name="Rectangular", alpha=0.5)
+    _, spectrum = analyzer.update(np.concatenate(frames), 3, 1.0)
+    # Seeded with the oldest frame, then 2 and 3 folded in
+    assert abs(spectrum[0] - 2.25) < 1e-9
+
+
+def test_collect_only_takes_new_frames():
+    buffer = SampleBuffer(100000)
+    analyzer = SpectrumAnalyzer(frame_size=256, overlap=0.5, max_frames=4)
+    assert analyzer.collect(buffer) is None
+    buffer.extend(np.zeros(256))
+    block, count = analyzer.collect(buffer)
+    assert count == 1 and len(block) == 256
+    assert analyzer.collect(buffer) is None
+    buffer.extend(np.zeros(128 * 10))
+    block, count = analyzer.collect(buffer)
+    assert count == 4 and len(block) == 3 * 128 + 256
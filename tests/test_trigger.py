@@ -0,0 +1,89 @@
+import numpy as np
+
+from scope.sample_buffer import SampleBuffer
+from scope.trigger import TriggerEngine
+
+
+def square(n, period=200, start_high=False):
+    phase = (np.arange(n) % period) < period // 2
+    return np.where(phase != start_high, 0.0, 1.0)
+
+
+def test_rising_edges_across_blocks():
+    buffer = SampleBuffer(10000)
+    engine = TriggerEngine("Rising Edge", mode="Normal", level=0.5, pre_samples=50, post_samples=50)
+    frames = []
+    signal = square(2000)
+    for block in np.array_split(signal, 37):
+        buffer.extend(block)
+        frames += engine.process(buffer)
+    # Rising edges at 100, 300, ..., 1900
+    assert [f.index for f in frames] == list(range(100, 2000, 200))
+    for frame in frames:
+        assert len(frame.trace) == 100
+        assert frame.trace.values[49] == 0.0 and frame.trace.values[50] == 1.0
+        assert not frame.forced
+
+
+def test_falling_edge_and_holdoff():
+    buffer = SampleBuffer(10000)
+    buffer.extend(square(2000))
+    engine = TriggerEngine("Falling Edge", mode="Normal", level=0.5, pre_samples=10, post_samples=10, holdoff=300)
+    assert [f.index for f in engine.process(buffer)] == [200, 600, 1000, 1400, 1800]
+
+
+def test_triggers_before_pre_trigger_history_are_ignored():
+    buffer = SampleBuffer(10000)
+    buffer.extend(square(1000))
+    engine = TriggerEngine("Rising Edge", mode="Single", level=0.5, pre_samples=150, post_samples=50)
+    # The edge at 100 has no full pre-trigger history; Single must not disarm on it
+    frames = engine.process(buffer)
+    assert [f.index for f in frames] == [300]
+    assert not engine.armed
+    buffer.extend(square(1000))
+    assert engine.process(buffer) == []
+
+
+def test_auto_mode_forces_a_frame():
+    buffer = SampleBuffer(10000)
+    buffer.extend(np.zeros(1000))
+    engine = TriggerEngine("Rising Edge", mode="Auto", level=0.5, pre_samples=100, post_samples=100)
+    frames = engine.process(buffer)
+    assert len(frames) == 1 and frames[0].forced
+
+
+def test_pulse_width():
+    signal = np.zeros(1000)
+    signal[100:110] = 1.0  # 10 samples
+    signal[300:350] = 1.0  # 50 samples
+    buffer = SampleBuffer(10000)
+    buffer.extend(signal)
+    engine = TriggerEngine("Pulse Width", mode="Normal", level=0.5, pre_samples=60, post_samples=10,
+                           pulse_min=40, pulse_max=60)
+    assert [f.index for f in engine.process(buffer)] == [350]
+
+
+def test_level_fires_when_entering_the_region():
+    buffer = SampleBuffer(10000)
+    engine = TriggerEngine("Level", mode="Normal", level=0.5, pre_samples=10, post_samples=10)
+    frames = []
+    for block in np.array_split(square(1000), 7):
+        buffer.extend(block)
+        frames += engine.process(buffer)
+    assert [f.index for f in frames] == [100, 300, 500, 700, 900]
+
+
+def test_level_stays_quiet_while_inside_the_region():
+    buffer = SampleBuffer(400000)
+    buffer.extend(np.concatenate((np.zeros(100), np.ones(200000))))
+    engine = TriggerEngine("Level", mode="Normal", level=0.5, pre_samples=10, post_samples=10)
+    assert [f.index for f in engine.process(buffer)] == [100]
+    assert engine.triggers == 1
+
+
+def test_triggers_per_call_are_capped():
+    buffer = SampleBuffer(100000)
+    buffer.extend(square(100000, period=4))
+    engine = TriggerEngine("Rising Edge", mode="Normal", level=0.5, hysteresis=0.1, pre_samples=4,
+                           post_samples=4, max_frames=8)
+    assert len(engine.scan(buffer.read(0, buffer.total).values, 0)) == 8